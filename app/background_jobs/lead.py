@@ -1,14 +1,16 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
 import bson
+from rq import Queue
+from rq.job import JobStatus
 
 import app.controllers.lead as lead_controller
 
 from app.background_jobs.job import enqueue_background_job
 from app.models.lead import LeadModel
 from app.tools.async_tools import run_async
-from app.resources import rq
+from app.resources import redis, rq
 
 
 logger = logging.getLogger(__name__)
@@ -75,6 +77,44 @@ async def schedule_for_second_chance(lead: LeadModel, lead_id: str, time: int):
     return "Success"
 
 
+def process_leads_in_bulk(leads: list, second_chance_days: int):
+    """
+    Enqueues assignment and second chance jobs for many leads in a single Redis round trip.
+    `leads` is a list of (lead, lead_id) tuples. Returns the second chance task id of each lead.
+    """
+    logger.info(f"Enqueuing assignment and second chance jobs for {len(leads)} leads")
+    second_chance_time = datetime.now(timezone.utc) + timedelta(days=second_chance_days)
+    assignment_jobs = [
+        Queue.prepare_data(run_async, args=(lead_controller.assign_lead_to_agent, lead, lead_id))
+        for lead, lead_id in leads
+    ]
+    second_chance_task_ids = {}
+    with redis.pipeline() as pipeline:
+        rq.enqueue_many(assignment_jobs, pipeline=pipeline)
+        for _, lead_id in leads:
+            second_chance_task = rq.create_job(
+                run_async,
+                args=(process_second_chance_lead, lead_id),
+                status=JobStatus.SCHEDULED
+            )
+            rq.schedule_job(second_chance_task, second_chance_time, pipeline=pipeline)
+            second_chance_task_ids[lead_id] = second_chance_task.id
+        pipeline.execute()
+    return second_chance_task_ids
+
+
+def rebuild_dedup_index(campaign_id: str):
+    from app.controllers.dedup import rebuild_campaign_index
+    logger.info(f"Rebuilding dedup index for campaign {campaign_id}")
+    task_id = rq.enqueue(
+        run_async,
+        rebuild_campaign_index,
+        campaign_id
+    )
+    logger.info(f"Task ID for campaign {campaign_id} dedup index: {task_id}")
+    return "Success"
+
+
 async def delete_background_task_by_lead_ids(lead_ids: list):
     logger.info(f"Deleting background tasks for {len(lead_ids)} leads")
     lead_collection = lead_controller.get_lead_collection()
@@ -116,6 +156,18 @@ async def push_lead_to_crm(agent, lead, is_second_chance=False):
     return "Success"
 
 
+async def push_leads_to_crm(agent, leads):
+    logger.info(f"Pushing {len(leads)} leads to CRM for agent {agent.id}")
+    task_id = rq.enqueue(
+        run_async,
+        lead_controller.push_leads_to_crm,
+        agent,
+        leads
+    )
+    logger.info(f"Task ID for {len(leads)} leads of agent {agent.id}: {task_id}")
+    return "Success"
+
+
 async def reprocess_second_chance_leads(order, agent, user):
     logger.info(f"Reprocessing second chance leads for order {order.id}")
     task_id = rq.enqueue(
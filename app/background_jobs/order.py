@@ -4,6 +4,7 @@ from typing import List
 
 import bson
 
+from app.tools import constants
 from app.tools.async_tools import run_async
 from app.resources import rq
 from app.models.user import UserModel
@@ -28,3 +29,52 @@ async def schedule_order_priority_end(order_ids: List[bson.ObjectId], time: time
         )
     logger.info(f"Scheduled prioritization for orders {order_ids} with task ID {task_id.id}")
     return "Success"
+
+
+def reconcile_completed_leads(order_ids: List[bson.ObjectId] = None):
+    from app.controllers.order import reconcile_completed_leads as reconcile_completed_leads_controller
+    logger.info(f"Reconciling completed lead counters for {'open orders' if not order_ids else order_ids}")
+    task_id = rq.enqueue(
+        run_async,
+        reconcile_completed_leads_controller,
+        order_ids
+    )
+    logger.info(f"Task ID for completed lead counters reconciliation: {task_id}")
+    return "Success"
+
+
+def _next_reconcile_time() -> datetime:
+    now = datetime.utcnow()
+    next_run = now.replace(hour=constants.COMPLETED_LEADS_RECONCILE_HOUR, minute=0, second=0, microsecond=0)
+    return next_run if next_run > now else next_run + timedelta(days=1)
+
+
+def schedule_completed_leads_reconciliation():
+    """
+    Schedules the next nightly reconciliation of the completed lead counters of open orders.
+    The job id is derived from its date, so every process can call this on startup without queueing it twice.
+    """
+    if rq is None:
+        logger.warning("rq not initialized, completed lead counters will not be reconciled")
+        return None
+    next_run = _next_reconcile_time()
+    try:
+        job = rq.enqueue_at(
+            next_run,
+            run_async,
+            reconcile_open_orders,
+            job_id=f"completed-leads-reconcile-{next_run:%Y%m%d}"
+        )
+    except Exception as e:
+        logger.error(f"Error scheduling completed lead counters reconciliation: {e}")
+        return None
+    logger.info(f"Scheduled completed lead counters reconciliation at {next_run} with task ID {job.id}")
+    return job.id
+
+
+async def reconcile_open_orders():
+    from app.controllers.order import reconcile_completed_leads as reconcile_completed_leads_controller
+    try:
+        await reconcile_completed_leads_controller()
+    finally:
+        schedule_completed_leads_reconciliation()
@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime, timedelta
+
+from app.tools import constants
+from app.tools.async_tools import run_async
+from app.resources import rq
+
+
+logger = logging.getLogger(__name__)
+
+
+def _next_rebuild_time() -> datetime:
+    now = datetime.utcnow()
+    next_run = now.replace(hour=constants.ROLLUP_REBUILD_HOUR, minute=0, second=0, microsecond=0)
+    return next_run if next_run > now else next_run + timedelta(days=1)
+
+
+def schedule_rollup_rebuild():
+    """
+    Schedules the next nightly rollup rebuild. The job id is derived from its date,
+    so every process can call this on startup without queueing the same rebuild twice.
+    """
+    if rq is None:
+        logger.warning("rq not initialized, daily rollups will not be rebuilt")
+        return None
+    next_run = _next_rebuild_time()
+    try:
+        job = rq.enqueue_at(
+            next_run,
+            run_async,
+            rebuild_daily_rollups,
+            job_id=f"rollup-rebuild-{next_run:%Y%m%d}"
+        )
+    except Exception as e:
+        logger.error(f"Error scheduling daily rollup rebuild: {e}")
+        return None
+    logger.info(f"Scheduled daily rollup rebuild at {next_run} with task ID {job.id}")
+    return job.id
+
+
+def schedule_rollup_backfill():
+    """
+    Queues a backfill of the rollup history. It is a no-op once rollups exist, so every process can call this on startup.
+    """
+    if rq is None:
+        logger.warning("rq not initialized, rollups will not be backfilled")
+        return None
+    try:
+        job = rq.enqueue(run_async, backfill_rollups, job_id="rollup-backfill")
+    except Exception as e:
+        logger.error(f"Error scheduling rollup backfill: {e}")
+        return None
+    logger.info(f"Scheduled rollup backfill with task ID {job.id}")
+    return job.id
+
+
+async def backfill_rollups():
+    from app.controllers.rollup import backfill_rollups
+    await backfill_rollups()
+
+
+async def rebuild_daily_rollups():
+    from app.controllers.rollup import rebuild_rollups
+    try:
+        await rebuild_rollups()
+    finally:
+        schedule_rollup_rebuild()
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta
 import bson
 import difflib
@@ -10,13 +11,13 @@ from typing import List, Dict
 from motor.core import AgnosticCollection
 
 from app.db import Database
+from app.controllers import dashboard as dashboard_controller
+from app.controllers import routing as routing_controller
 from app.controllers.order import get_order_collection
 from app.models.agent import AgentModel, UpdateAgentModel
 from app.models.campaign import CampaignModel
-from app.models.lead import LeadModel
 from app.models.order import OrderModel
 from app.models.transaction import TransactionModel
-from app.models.user import UserModel
 from app.tools import constants
 
 
@@ -28,6 +29,10 @@ def get_agent_collection() -> AgnosticCollection:
     return db["agent"]
 
 
+# The user fields shown for the latest subscribed agents on the dashboard
+ACTIVE_AGENT_FIELDS = ("name", "email", "phone", "region", "agent_id", "campaigns", "has_subscription")
+
+
 class AgentNotFoundError(Exception):
     pass
 
@@ -88,6 +93,8 @@ async def update_campaigns_for_agent(agent_id, campaigns):
     updated_agent = await agent_collection.update_one(
         {"_id": agent_id}, {"$set": {"campaigns": campaigns}}
     )
+    routing_controller.invalidate_campaign()
+    dashboard_controller.invalidate_metrics()
     return updated_agent
 
 
@@ -97,6 +104,7 @@ async def create_agent(agent: AgentModel):
     created_agent = await agent_collection.insert_one(
         agent.model_dump(by_alias=True, exclude=["id", "full_name"], mode="python")
     )
+    dashboard_controller.invalidate_metrics()
     return created_agent
 
 
@@ -229,6 +237,8 @@ async def update_agent(id, agent: UpdateAgentModel):
             )
 
             if update_result is not None:
+                routing_controller.invalidate_campaign()
+                dashboard_controller.invalidate_metrics()
                 return update_result
             else:
                 raise AgentNotFoundError(f"Agent with id {id} not found")
@@ -244,6 +254,8 @@ async def delete_agent(id):
     agent_collection = get_agent_collection()
     try:
         result = await agent_collection.delete_one({"_id": ObjectId(id)})
+        routing_controller.invalidate_campaign()
+        dashboard_controller.invalidate_metrics()
         return result
     except bson.errors.InvalidId:
         raise AgentIdInvalidError(f"Invalid id {id} on delete agent route.")
@@ -260,6 +272,8 @@ async def get_agents(ids):
 async def delete_agents(ids):
     agent_collection = get_agent_collection()
     result = await agent_collection.delete_many({"_id": {"$in": [ObjectId(id) for id in ids if id != "null"]}})
+    routing_controller.invalidate_campaign()
+    dashboard_controller.invalidate_metrics()
     return result
 
 
@@ -340,81 +354,6 @@ async def get_agents_with_balance(campaign: ObjectId):
     return agents
 
 
-async def get_agents_with_open_orders(campaign_id: ObjectId, lead: LeadModel):
-    agent_collection = get_agent_collection()
-    pipeline = [
-        {"$match": {"campaigns": campaign_id}},
-        {"$lookup": {
-            "from": "order",
-            "localField": "_id",
-            "foreignField": "agent_id",
-            "as": "orders"
-        }},
-        {"$unwind": {
-            "path": "$orders",
-            "preserveNullAndEmptyArrays": True
-        }},
-        {"$lookup": {
-            "from": "lead",
-            "let": {"order_id": "$orders._id"},
-            "pipeline": [
-                {"$match": {
-                    "$and": [
-                        {"$expr": {"$eq": ["$lead_order_id", "$$order_id"]}},
-                    ]
-                }},
-                {"$count": "fresh_lead_completed"}
-            ],
-            "as": "fresh_leads"
-        }},
-        {"$lookup": {
-            "from": "lead",
-            "let": {"order_id": "$orders._id"},
-            "pipeline": [
-                {"$match": {
-                    "$and": [
-                        {"$expr": {"$eq": ["$second_chance_lead_order_id", "$$order_id"]}}
-                    ]
-                }},
-                {"$count": "second_chance_completed"}
-            ],
-            "as": "second_chance_leads"
-        }},
-        {"$addFields": {
-            "fresh_completed": {"$ifNull": [{"$first": "$fresh_leads.fresh_lead_completed"}, 0]},
-            "second_completed": {"$ifNull": [{"$first": "$second_chance_leads.second_chance_completed"}, 0]}
-        }},
-        {"$match": {
-            "orders.status": "open",
-            "orders.campaign_id": campaign_id,
-            "$expr": {
-                "$cond": {
-                    "if": {"$eq": [lead.is_second_chance, True]},
-                    "then": {"$lt": ["$second_completed", "$orders.second_chance_lead_amount"]},
-                    "else": {"$lt": ["$fresh_completed", "$orders.fresh_lead_amount"]}
-                }
-            }
-        }},
-        {"$project": {
-            "first_name": 1,
-            "last_name": 1,
-            "email": 1,
-            "phone": 1,
-            "states_with_license": 1,
-            "CRM": 1,
-            "fresh_completed": 1,
-            "second_completed": 1,
-            "daily_lead_limit": 1,
-            "lead_price_override": 1,
-            "second_chance_lead_price_override": 1,
-        }},
-        {"$sort": {"orders.date": 1}}
-    ]
-    agents_in_db = await agent_collection.aggregate(pipeline).to_list(None)
-    agents = [AgentModel(**agent) for agent in agents_in_db]
-    return agents
-
-
 async def get_eligible_agents_for_lead_processing(
     states,
     lead_count,
@@ -600,6 +539,18 @@ async def get_eligible_agents_for_lead_processing(
     return agents
 
 
+def _active_agent_json(user: dict) -> dict:
+    data = {"id": str(user["_id"])}
+    for field in ACTIVE_AGENT_FIELDS:
+        value = user.get(field)
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, list):
+            value = [str(v) if isinstance(v, ObjectId) else v for v in value]
+        data[field] = value
+    return data
+
+
 async def get_agent_metrics(campaigns: List[bson.ObjectId]) -> Dict[str, int]:
     from app.controllers.user import get_user_collection
 
@@ -609,23 +560,38 @@ async def get_agent_metrics(campaigns: List[bson.ObjectId]) -> Dict[str, int]:
     query = {
         "campaigns": {"$in": campaigns}
     }
-    total_agents = await agent_collection.count_documents(query)
-    agents_in_db = await agent_collection.find(query).limit(10).sort([("created_time", -1)]).to_list(None)
-    agents = [AgentModel(**agent).to_json() for agent in agents_in_db]
-
     active_query = {
         **query,
         "has_subscription": True
     }
-    active_agents_total = await user_collection.count_documents(active_query)
-    active_agents_in_db = await user_collection.find(active_query).sort([("created_time", -1)]).to_list(None)
-    active_agents = [UserModel(**agent).to_json() for agent in active_agents_in_db]
+    agent_pipeline = [
+        {"$match": query},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "latest": [{"$sort": {"created_time": -1}}, {"$limit": constants.DASHBOARD_LATEST_AGENTS}]
+        }}
+    ]
+    active_pipeline = [
+        {"$match": active_query},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "latest": [
+                {"$sort": {"created_time": -1}},
+                {"$limit": constants.DASHBOARD_LATEST_AGENTS},
+                {"$project": {field: 1 for field in ACTIVE_AGENT_FIELDS}}
+            ]
+        }}
+    ]
+    (agent_result,), (active_result,) = await asyncio.gather(
+        agent_collection.aggregate(agent_pipeline).to_list(None),
+        user_collection.aggregate(active_pipeline).to_list(None)
+    )
 
     return {
-        "agents": agents,
-        "total_agents": total_agents,
-        "active_agents": active_agents,
-        "active_agents_total": active_agents_total,
+        "agents": [AgentModel(**agent).to_json() for agent in agent_result["latest"]],
+        "total_agents": agent_result["total"][0]["count"] if agent_result["total"] else 0,
+        "active_agents": [_active_agent_json(agent) for agent in active_result["latest"]],
+        "active_agents_total": active_result["total"][0]["count"] if active_result["total"] else 0,
     }
 
 
@@ -662,6 +628,8 @@ async def enroll_agent_in_campaign(agent_id: bson.ObjectId, campaign_id: bson.Ob
     )
     if updated_agent.modified_count == 0:
         raise AgentNotFoundError(f"Agent with id {agent_id} not found.")
+    routing_controller.invalidate_campaign(campaign_id)
+    dashboard_controller.invalidate_metrics()
     return updated_agent
 
 
@@ -679,40 +647,3 @@ async def get_sign_ups_in_time_frame(campaign_id, created_time_gte, created_time
     }
     sign_ups = await agent_collection.find(query).to_list(None)
     return sign_ups
-
-
-async def get_agents_with_prioritized_orders(campaign_id):
-    agent_collection = get_agent_collection()
-    pipeline = [
-        {"$match": {"campaigns": campaign_id}},
-        {"$lookup": {
-            "from": "order",
-            "localField": "_id",
-            "foreignField": "agent_id",
-            "as": "orders"
-        }},
-        {"$unwind": {
-            "path": "$orders",
-            "preserveNullAndEmptyArrays": True
-        }},
-        {"$match": {
-            "orders.status": "open",
-            "orders.campaign_id": campaign_id,
-            "orders.priority.active": True
-        }},
-        {"$project": {
-            "first_name": 1,
-            "last_name": 1,
-            "email": 1,
-            "phone": 1,
-            "states_with_license": 1,
-            "CRM": 1,
-            "campaigns": 1,
-            "daily_lead_limit": 1,
-            "lead_price_override": 1,
-            "second_chance_lead_price_override": 1,
-        }}
-    ]
-    agents_in_db = await agent_collection.aggregate(pipeline).to_list(None)
-    agents = [AgentModel(**agent) for agent in agents_in_db]
-    return agents
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+
+from bson import json_util
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.resources import async_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+CHANNEL = "balance:updates"
+LEADER_KEY = "balance:change-stream:leader"
+RESUME_TOKEN_KEY = "balance:change-stream:resume-token"
+LEADER_ID = f"{socket.gethostname()}-{os.getpid()}"
+LEADER_TTL = 15
+LEADER_RENEW_INTERVAL = 5
+
+SEND_QUEUE_SIZE = 16
+SEND_TIMEOUT = 10
+RECONNECT_DELAY = 5
+BASE_BACKOFF = 1
+MAX_BACKOFF = 60
+
+# InvalidResumeToken, ChangeStreamFatalError and ChangeStreamHistoryLost: the saved token can never be resumed from
+RESUME_TOKEN_LOST_ERROR_CODES = {260, 280, 286}
+
+# Only extends or releases the lock while this process still holds it
+RENEW_LEADER_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEADER_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Send queues of the websockets connected to this process, by user id
+_subscribers: Dict[str, List[asyncio.Queue]] = defaultdict(list)
+
+
+def subscribe(user_id: str) -> asyncio.Queue:
+    queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+    _subscribers[user_id].append(queue)
+    return queue
+
+
+def unsubscribe(user_id: str, queue: asyncio.Queue):
+    queues = _subscribers.get(user_id, [])
+    if queue in queues:
+        queues.remove(queue)
+    if not queues:
+        _subscribers.pop(user_id, None)
+
+
+def deliver(user_id: str, data: Dict[str, Any]):
+    """
+    Queues an update for every socket of the user on this process without waiting on any of them.
+    Updates are full balance snapshots, so a socket that falls behind drops its oldest pending one.
+    """
+    for queue in _subscribers.get(user_id, []):
+        if queue.full():
+            queue.get_nowait()
+            logger.debug(f"Send queue of a socket of user {user_id} is full, dropped its oldest update")
+        queue.put_nowait(data)
+
+
+async def send_updates(websocket, queue: asyncio.Queue):
+    """
+    Forwards queued updates to one websocket. Returns once a send fails or takes longer than SEND_TIMEOUT,
+    so a stuck client is disconnected instead of holding up the others.
+    """
+    while True:
+        data = await queue.get()
+        try:
+            await asyncio.wait_for(websocket.send_json(data), SEND_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error sending balance update to websocket {websocket}: {type(e).__name__} {e}")
+            return
+
+
+async def publish(user_id: str, data: Dict[str, Any]):
+    """
+    Fans a balance update out to every API process, or delivers it locally when Redis is not available.
+    """
+    if async_redis is None:
+        deliver(user_id, data)
+        return
+    await async_redis.publish(CHANNEL, json.dumps({"user_id": user_id, "data": data}))
+
+
+async def run_fan_out():
+    """
+    Delivers the balance updates published by the change stream consumer to the sockets of this process.
+    """
+    if async_redis is None:
+        return
+    while True:
+        try:
+            async with async_redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(CHANNEL)
+                logger.info(f"Subscribed to {CHANNEL}")
+                async for message in pubsub.listen():
+                    update = json.loads(message["data"])
+                    deliver(update["user_id"], update["data"])
+        except asyncio.CancelledError:
+            logger.info("Balance fan-out cancelled")
+            break
+        except Exception as e:
+            logger.error(f"Balance fan-out error: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+async def acquire_leadership() -> bool:
+    if async_redis is None:
+        return True
+    return bool(await async_redis.set(LEADER_KEY, LEADER_ID, nx=True, ex=LEADER_TTL))
+
+
+async def keep_leadership():
+    """
+    Extends the lock for as long as this process holds it and returns as soon as it is lost.
+    """
+    if async_redis is None:
+        await asyncio.Event().wait()
+    while True:
+        await asyncio.sleep(LEADER_RENEW_INTERVAL)
+        if not await async_redis.eval(RENEW_LEADER_SCRIPT, 1, LEADER_KEY, LEADER_ID, LEADER_TTL):
+            logger.warning("Lost the balance change stream lock")
+            return
+
+
+async def release_leadership():
+    if async_redis is None:
+        return
+    try:
+        await async_redis.eval(RELEASE_LEADER_SCRIPT, 1, LEADER_KEY, LEADER_ID)
+    except Exception as e:
+        logger.error(f"Error releasing the balance change stream lock: {e}")
+
+
+async def load_resume_token() -> Optional[Dict[str, Any]]:
+    if async_redis is None:
+        return None
+    token = await async_redis.get(RESUME_TOKEN_KEY)
+    return json_util.loads(token) if token else None
+
+
+async def save_resume_token(token: Dict[str, Any]):
+    if async_redis is not None:
+        await async_redis.set(RESUME_TOKEN_KEY, json_util.dumps(token))
+
+
+async def clear_resume_token():
+    if async_redis is not None:
+        await async_redis.delete(RESUME_TOKEN_KEY)
+
+
+def backoff_delay(failures: int) -> float:
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** failures))
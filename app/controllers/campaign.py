@@ -6,8 +6,14 @@ from motor.core import AgnosticCollection
 
 import app.integrations.stripe as stripe_integration
 
+from app.controllers import dedup as dedup_controller
 from app.db import Database
 from app.models import campaign as campaign_models
+from app.tools import constants
+from app.tools.cache import SharedCache
+
+
+campaign_cache = SharedCache("campaign", maxsize=512, ttl=constants.CAMPAIGN_CACHE_TTL)
 
 
 def get_campaign_collection() -> AgnosticCollection:
@@ -60,6 +66,11 @@ async def get_all_campaigns(page, limit, sort, filter):
 
 
 async def get_one_campaign(id):
+    campaign = await campaign_cache.get_or_load(str(id), lambda: _load_campaign(id))
+    return campaign.model_copy(deep=True)
+
+
+async def _load_campaign(id):
     campaign_collection = get_campaign_collection()
     if (
         campaign_in_db := await campaign_collection.find_one({"_id": ObjectId(id)})
@@ -115,6 +126,7 @@ async def update_campaign(id, campaign: campaign_models.UpdateCampaignModel):
                         {"$set": agency_admin_campaign.model_dump(by_alias=True, exclude=["id"], mode="python")},
                         return_document=ReturnDocument.AFTER
                     )
+                    campaign_cache.invalidate(str(agency_admin_campaign.id))
 
     if len(campaign) >= 1:
         update_result = await campaign_collection.find_one_and_update(
@@ -124,6 +136,12 @@ async def update_campaign(id, campaign: campaign_models.UpdateCampaignModel):
         )
 
         if update_result is not None:
+            campaign_cache.invalidate(str(id))
+            await dedup_controller.update_campaign_window(
+                id,
+                previous_cutoff_days=campaign_in_db.duplication_cutoff_days,
+                cutoff_days=update_result.get("duplication_cutoff_days")
+            )
             return update_result
 
         else:
@@ -138,6 +156,7 @@ async def update_campaign(id, campaign: campaign_models.UpdateCampaignModel):
 async def delete_campaign(id):
     campaign_collection = get_campaign_collection()
     delete_result = await campaign_collection.delete_one({"_id": ObjectId(id)})
+    campaign_cache.invalidate(str(id))
     return delete_result
 
 
@@ -151,6 +170,8 @@ async def get_campaigns(ids):
 async def delete_campaigns(ids):
     campaign_collection = get_campaign_collection()
     result = await campaign_collection.delete_many({"_id": {"$in": [ObjectId(id) for id in ids if id != "null"]}})
+    for id in ids:
+        campaign_cache.invalidate(str(id))
     return result
 
 
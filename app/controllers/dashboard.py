@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+from bson import ObjectId
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.tools import constants
+from app.tools.cache import SharedCache
+
+
+logger = logging.getLogger(__name__)
+
+
+dashboard_cache = SharedCache("dashboard", maxsize=256, ttl=constants.DASHBOARD_CACHE_TTL)
+
+
+def _campaigns_key(campaigns: List[ObjectId]) -> str:
+    return ",".join(sorted(str(campaign) for campaign in campaigns or []))
+
+
+def _date_ranges_key(date_ranges: Dict[str, Any]) -> str:
+    """
+    Buckets the requested ranges to the minute, so dashboards opened within the same minute share an entry.
+    """
+    def bucket(value: datetime) -> str:
+        return value.replace(second=0, microsecond=0).isoformat()
+    return "|".join(
+        f"{period}:{bucket(date_range['start'])}:{bucket(date_range['end'])}"
+        for period, date_range in sorted(date_ranges.items())
+    )
+
+
+async def get_metrics(date_ranges: Dict[str, Any], campaigns: List[ObjectId]) -> Dict[str, Any]:
+    from app.controllers import agent as agent_controller
+    from app.controllers import order as order_controller
+    from app.controllers import rollup as rollup_controller
+    campaigns_key = _campaigns_key(campaigns)
+    order_metrics, lead_metrics, agent_metrics = await asyncio.gather(
+        dashboard_cache.get_or_load(
+            f"orders:{campaigns_key}",
+            lambda: order_controller.get_order_metrics(campaigns)
+        ),
+        dashboard_cache.get_or_load(
+            f"leads:{campaigns_key}:{_date_ranges_key(date_ranges)}",
+            lambda: rollup_controller.get_lead_counts(date_ranges, campaigns)
+        ),
+        dashboard_cache.get_or_load(
+            f"agents:{campaigns_key}",
+            lambda: agent_controller.get_agent_metrics(campaigns)
+        )
+    )
+    return {
+        "orders": order_metrics,
+        "leads": lead_metrics,
+        "agents": agent_metrics
+    }
+
+
+def invalidate_metrics():
+    """
+    Drops every cached dashboard after an order or agent is created, changed, closed or removed.
+    Lead inserts and completed lead counters are too frequent to invalidate on, those numbers
+    catch up within DASHBOARD_CACHE_TTL.
+    """
+    dashboard_cache.invalidate()
@@ -0,0 +1,233 @@
+import datetime
+import logging
+
+from bson import ObjectId
+from redis.exceptions import RedisError
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.models.lead import LeadModel
+from app.resources import async_redis
+from app.tools import constants
+
+
+logger = logging.getLogger(__name__)
+
+
+DEDUP_FIELDS = ("phone", "email")
+
+# Leads store the phone as received, next to its normalized form for exact indexed lookups
+STORED_FIELDS = {"phone": "phone_normalized", "email": "email"}
+
+REBUILD_BATCH_SIZE = 1000
+
+
+class DedupIndexUnavailableError(Exception):
+    pass
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    if not phone:
+        return None
+    digits_only = "".join(filter(str.isdigit, str(phone)))
+    if len(digits_only) == 11 and digits_only.startswith("1"):
+        digits_only = digits_only[1:]
+    return digits_only or None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    return email.strip().lower() or None
+
+
+def _normalize(field: str, value: Optional[str]) -> Optional[str]:
+    return normalize_phone(value) if field == "phone" else normalize_email(value)
+
+
+def _index_key(campaign_id, field: str) -> str:
+    return f"dedup:{campaign_id}:{field}"
+
+
+def _ready_key(campaign_id) -> str:
+    return f"dedup:{campaign_id}:ready"
+
+
+def _rebuild_lock_key(campaign_id) -> str:
+    return f"dedup:{campaign_id}:rebuilding"
+
+
+def _to_score(time: datetime.datetime) -> float:
+    return time.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _window_start(window_days: int) -> float:
+    return _to_score(datetime.datetime.utcnow() - datetime.timedelta(days=window_days))
+
+
+def window_days(duplication_cutoff_days: Optional[int]) -> int:
+    """
+    Days of leads kept in a campaign's index, enough for both its own cutoff and the public email check.
+    """
+    return max(duplication_cutoff_days or 0, constants.PUBLIC_DUPLICATE_WINDOW_DAYS)
+
+
+async def get_window_days(campaign_id) -> int:
+    from app.controllers.campaign import get_one_campaign
+    campaign = await get_one_campaign(campaign_id)
+    return window_days(campaign.duplication_cutoff_days)
+
+
+async def get_latest_created_times(campaign_id, field: str, values: Iterable[Optional[str]]) -> Dict[str, Optional[datetime.datetime]]:
+    """
+    Returns the creation time of the newest lead in the campaign with each normalized phone or email.
+    Raises DedupIndexUnavailableError when the campaign has not been indexed yet or Redis cannot be reached,
+    so callers can fall back to find_latest_created_times.
+    """
+    normalized_values = list(dict.fromkeys(filter(None, (_normalize(field, value) for value in values))))
+    if async_redis is None:
+        raise DedupIndexUnavailableError("Redis is not initialized")
+    try:
+        async with async_redis.pipeline(transaction=False) as pipeline:
+            pipeline.ttl(_ready_key(campaign_id))
+            for normalized_value in normalized_values:
+                pipeline.zscore(_index_key(campaign_id, field), normalized_value)
+            ready_ttl, *scores = await pipeline.execute()
+    except RedisError as e:
+        raise DedupIndexUnavailableError(str(e))
+    if ready_ttl == -2:
+        await _schedule_rebuild(campaign_id)
+        raise DedupIndexUnavailableError(f"Dedup index for campaign {campaign_id} is not built yet")
+    if ready_ttl < constants.DEDUP_INDEX_REFRESH:
+        # Rebuilt ahead of expiry so entries the incremental updates missed do not outlive a day
+        await _schedule_rebuild(campaign_id)
+    return {
+        normalized_value: datetime.datetime.utcfromtimestamp(score) if score is not None else None
+        for normalized_value, score in zip(normalized_values, scores)
+    }
+
+
+async def get_latest_created_time(campaign_id, field: str, value: Optional[str]) -> Optional[datetime.datetime]:
+    return (await get_latest_created_times(campaign_id, field, [value])).get(_normalize(field, value))
+
+
+async def find_latest_created_times(
+    campaign_id,
+    field: str,
+    values: Iterable[Optional[str]],
+    since: datetime.datetime
+) -> Dict[str, datetime.datetime]:
+    """
+    Mongo fallback of get_latest_created_times, an exact lookup on the stored normalized field.
+    Values without a lead created since the given time are left out.
+    """
+    from app.controllers.lead import get_lead_collection
+    normalized_values = list(set(filter(None, (_normalize(field, value) for value in values))))
+    if not normalized_values:
+        return {}
+    stored_field = STORED_FIELDS[field]
+    pipeline = [
+        {"$match": {
+            "campaign_id": ObjectId(campaign_id),
+            stored_field: {"$in": normalized_values},
+            "created_time": {"$gte": since}
+        }},
+        {"$group": {"_id": f"${stored_field}", "created_time": {"$max": "$created_time"}}}
+    ]
+    latest = await get_lead_collection().aggregate(pipeline).to_list(None)
+    return {group["_id"]: group["created_time"] for group in latest}
+
+
+def _index_entries(leads: List[LeadModel]) -> Iterator[Tuple[str, str, float]]:
+    for lead in leads:
+        for field in DEDUP_FIELDS:
+            normalized_value = _normalize(field, getattr(lead, field))
+            if normalized_value:
+                yield _index_key(lead.campaign_id, field), normalized_value, _to_score(lead.created_time)
+
+
+async def record_leads(leads: List[LeadModel]):
+    """
+    Adds newly inserted leads to the dedup index and evicts entries older than each campaign's window.
+    ZADD GT keeps the newest creation time of a value and needs Redis 6.2 or later.
+    """
+    if async_redis is None or not leads:
+        return
+    try:
+        window_by_campaign = {}
+        for campaign_id in dict.fromkeys(lead.campaign_id for lead in leads):
+            window_by_campaign[campaign_id] = await get_window_days(campaign_id)
+        async with async_redis.pipeline(transaction=False) as pipeline:
+            for key, normalized_value, score in _index_entries(leads):
+                pipeline.zadd(key, {normalized_value: score}, gt=True)
+            for campaign_id, window_days in window_by_campaign.items():
+                for field in DEDUP_FIELDS:
+                    pipeline.zremrangebyscore(_index_key(campaign_id, field), "-inf", f"({_window_start(window_days)}")
+            await pipeline.execute()
+    except Exception as e:
+        logger.error(f"Error adding {len(leads)} leads to the dedup index: {e}")
+
+
+async def rebuild_campaign_index(campaign_id) -> int:
+    """
+    Rebuilds the dedup index of a campaign from the lead collection and marks it ready for lookups.
+    """
+    from app.controllers.lead import get_lead_collection
+    campaign_id = ObjectId(campaign_id)
+    window_days = await get_window_days(campaign_id)
+    window_start = datetime.datetime.utcnow() - datetime.timedelta(days=window_days)
+    lead_collection = get_lead_collection()
+    cursor = lead_collection.find(
+        {"campaign_id": campaign_id, "created_time": {"$gte": window_start}},
+        {"phone": 1, "email": 1, "created_time": 1},
+        batch_size=REBUILD_BATCH_SIZE
+    )
+
+    indexed = 0
+    async with async_redis.pipeline(transaction=False) as pipeline:
+        async for lead in cursor:
+            for field in DEDUP_FIELDS:
+                normalized_value = _normalize(field, lead.get(field))
+                if normalized_value:
+                    pipeline.zadd(_index_key(campaign_id, field), {normalized_value: _to_score(lead["created_time"])}, gt=True)
+            indexed += 1
+            if indexed % REBUILD_BATCH_SIZE == 0:
+                await pipeline.execute()
+        for field in DEDUP_FIELDS:
+            pipeline.zremrangebyscore(_index_key(campaign_id, field), "-inf", f"({_to_score(window_start)}")
+        pipeline.set(_ready_key(campaign_id), 1, ex=constants.DEDUP_INDEX_TTL)
+        pipeline.delete(_rebuild_lock_key(campaign_id))
+        await pipeline.execute()
+    logger.info(f"Rebuilt dedup index for campaign {campaign_id} with {indexed} leads")
+    return indexed
+
+
+async def invalidate_campaign_index(campaign_id):
+    """
+    Sends lookups to Mongo and rebuilds the campaign's index, for when its window grows past the indexed leads.
+    """
+    if async_redis is None:
+        return
+    try:
+        await async_redis.delete(_ready_key(campaign_id), _rebuild_lock_key(campaign_id))
+    except RedisError as e:
+        logger.error(f"Error invalidating dedup index for campaign {campaign_id}: {e}")
+        return
+    await _schedule_rebuild(campaign_id)
+
+
+async def update_campaign_window(campaign_id, previous_cutoff_days: Optional[int], cutoff_days: Optional[int]):
+    """
+    Rebuilds the campaign's index after its duplication cutoff changed, when the new window reaches
+    further back than the leads that were indexed.
+    """
+    if window_days(cutoff_days) > window_days(previous_cutoff_days):
+        await invalidate_campaign_index(campaign_id)
+
+
+async def _schedule_rebuild(campaign_id):
+    from app.background_jobs.lead import rebuild_dedup_index
+    try:
+        if await async_redis.set(_rebuild_lock_key(campaign_id), 1, nx=True, ex=constants.DEDUP_REBUILD_LOCK_TTL):
+            rebuild_dedup_index(str(campaign_id))
+    except Exception as e:
+        logger.error(f"Error scheduling dedup index rebuild for campaign {campaign_id}: {e}")
@@ -0,0 +1,122 @@
+import datetime
+import logging
+import random
+
+from bson import ObjectId
+from redis.exceptions import RedisError
+from typing import Dict, List, Optional
+
+from app.models.agent import AgentModel
+from app.resources import async_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+RANDOM = "random"
+ROUND_ROBIN = "round_robin"
+WEIGHTED = "weighted"
+
+STRATEGIES = (RANDOM, ROUND_ROBIN, WEIGHTED)
+
+# Orders this old or older get twice the share of an order placed today with the same remaining capacity
+MAX_AGE_BOOST_DAYS = 30
+
+WEIGHTS_TTL = 24 * 60 * 60
+
+# Smooth weighted round-robin: every candidate gains its weight, the highest wins and pays back the total.
+# Picks follow the weights closely while spreading each agent's turns out, and the state is one hash per pool.
+WEIGHTED_PICK_SCRIPT = """
+local total = 0
+local best_index = nil
+local best_weight = nil
+local current = {}
+for index = 2, #ARGV - 1, 2 do
+    local weight = tonumber(ARGV[index + 1])
+    local value = tonumber(redis.call("hget", KEYS[1], ARGV[index]) or "0") + weight
+    current[index] = value
+    total = total + weight
+    if best_weight == nil or value > best_weight then
+        best_weight = value
+        best_index = index
+    end
+end
+for index = 2, #ARGV - 1, 2 do
+    local value = current[index]
+    if index == best_index then
+        value = value - total
+    end
+    redis.call("hset", KEYS[1], ARGV[index], value)
+end
+redis.call("expire", KEYS[1], ARGV[1])
+return ARGV[best_index]
+"""
+
+
+def _pool_key(campaign_id, is_second_chance: bool, strategy: str) -> str:
+    pool = "second_chance" if is_second_chance else "fresh"
+    return f"distribution:{campaign_id}:{pool}:{strategy}"
+
+
+def _unique_agents(agents: List[AgentModel]) -> List[AgentModel]:
+    # Candidates are listed once per open order; each agent should get a single turn or share of the pool
+    return list({str(agent.id): agent for agent in agents}.values())
+
+
+async def _round_robin(agents: List[AgentModel], campaign_id, is_second_chance: bool) -> AgentModel:
+    # Sorted by id so every worker walks the pool in the same order whatever the candidates' order is
+    agents = sorted(_unique_agents(agents), key=lambda agent: str(agent.id))
+    position = await async_redis.incr(_pool_key(campaign_id, is_second_chance, ROUND_ROBIN))
+    return agents[(position - 1) % len(agents)]
+
+
+async def _weighted(agents: List[AgentModel], campaign_id, is_second_chance: bool, weights: Dict[str, float]) -> AgentModel:
+    agents = _unique_agents(agents)
+    arguments = []
+    for agent in agents:
+        arguments += [str(agent.id), max(weights.get(str(agent.id), 0), 0) or 1]
+    agent_id = await async_redis.eval(WEIGHTED_PICK_SCRIPT, 1, _pool_key(campaign_id, is_second_chance, WEIGHTED), WEIGHTS_TTL, *arguments)
+    agent_id = agent_id.decode() if isinstance(agent_id, bytes) else agent_id
+    return next(agent for agent in agents if str(agent.id) == agent_id)
+
+
+async def choose_agent(
+    agents: List[AgentModel],
+    distribution_type: str,
+    campaign_id: Optional[ObjectId] = None,
+    is_second_chance: bool = False,
+    weights: Optional[Dict[str, float]] = None
+) -> AgentModel:
+    """
+    Picks the agent that gets the next lead of a campaign's fresh or second chance pool.
+    The round-robin cursor and the weighted state are kept in Redis, so every worker shares them
+    and a pick is a single atomic round trip. Without Redis the pick falls back to random.
+    """
+    if distribution_type not in STRATEGIES:
+        raise ValueError(f"Invalid distribution type {distribution_type}")
+    if len({agent.id for agent in agents}) == 1 or distribution_type == RANDOM or campaign_id is None:
+        return random.choice(agents)
+    try:
+        if async_redis is None:
+            raise RedisError("Redis is not initialized")
+        if distribution_type == ROUND_ROBIN:
+            return await _round_robin(agents, campaign_id, is_second_chance)
+        return await _weighted(agents, campaign_id, is_second_chance, weights or {})
+    except RedisError as e:
+        logger.error(f"Error choosing agent with {distribution_type} for campaign {campaign_id}, picking at random: {e}")
+        return random.choice(agents)
+
+
+async def get_capacity_weights(campaign_id: ObjectId, is_second_chance: bool) -> Dict[str, float]:
+    """
+    Weighs every agent of the campaign's routing index by the leads left on their open orders,
+    boosted by up to 2x for the age of their oldest open order.
+    """
+    from app.controllers import routing as routing_controller
+    index = await routing_controller.get_campaign_index(campaign_id)
+    now = datetime.datetime.utcnow()
+    weights = {}
+    for agent_id, entry in index.entries.items():
+        age_days = min(max((now - entry.oldest_order_date).days, 0), MAX_AGE_BOOST_DAYS)
+        weights[agent_id] = entry.remaining(is_second_chance) * (1 + age_days / MAX_AGE_BOOST_DAYS)
+    return weights
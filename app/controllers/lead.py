@@ -1,11 +1,14 @@
 import bson
+import csv
+import io
+import json
 import logging
-import random
 from enum import Enum
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
-from pymongo import ReturnDocument
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from motor.core import AgnosticCollection
 
 
@@ -19,13 +22,63 @@ from app.models.order import OrderModel
 from app.models.transaction import TransactionModel
 from app.models.user import UserModel
 from app.controllers import campaign as campaign_controller
+from app.controllers import dedup as dedup_controller
+from app.controllers import distribution as distribution_controller
+from app.controllers import rollup as rollup_controller
 from app.tools import formatters as formatter
+from app.tools import pagination
+from app.tools import serializers
+from app.tools import totals
 from app.tools import constants
 from app.tools import validators as validator
+from settings import get_settings
 
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+LEAD_LIST_PROJECTION = serializers.model_projection(lead_model.LeadModel)
+
+# Lead fields that count towards an order's fresh and second chance completed counters
+ORDER_FIELDS = (("lead_order_id", False), ("second_chance_lead_order_id", True))
+
+LEAD_EXPORT_FIELDS = [
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "state",
+    "origin",
+    "campaign_id",
+    "buyer_id",
+    "second_chance_buyer_id",
+    "created_time",
+    "lead_sold_time",
+    "second_chance_lead_sold_time",
+    "is_second_chance",
+    "custom_fields",
+]
+
+LEAD_EXPORT_PROJECTION = {field: 1 for field in LEAD_EXPORT_FIELDS if field != "id"}
+
+EXPORT_CHUNK_SIZE = 1000
+
+LEAD_DELIVERY_PROJECTION = {
+    "first_name": 1,
+    "last_name": 1,
+    "email": 1,
+    "phone": 1,
+    "state": 1,
+    "origin": 1,
+    "campaign_id": 1,
+    "is_second_chance": 1,
+    "lead_type": 1,
+    "custom_fields": 1,
+    "created_time": 1,
+}
+
 
 class DateField(Enum):
     CREATED = "created_time"
@@ -33,6 +86,17 @@ class DateField(Enum):
     SECOND_CHANCE_SOLD = "second_chance_lead_sold_time"
 
 
+INDEXES = [
+    IndexModel([("lead_order_id", ASCENDING)]),
+    IndexModel([("second_chance_lead_order_id", ASCENDING)]),
+    IndexModel([("phone", ASCENDING), ("campaign_id", ASCENDING), ("created_time", DESCENDING)]),
+    IndexModel([("campaign_id", ASCENDING), ("phone_normalized", ASCENDING), ("created_time", DESCENDING)]),
+    IndexModel([("buyer_id", ASCENDING), ("campaign_id", ASCENDING), ("created_time", DESCENDING)]),
+    IndexModel([("email", ASCENDING)]),
+    IndexModel([("campaign_id", ASCENDING), ("created_time", DESCENDING)]),
+]
+
+
 def get_lead_collection() -> AgnosticCollection:
     db = Database.get_db()
     return db["lead"]
@@ -50,6 +114,38 @@ class LeadEmptyError(Exception):
     pass
 
 
+def _completed_lead_counts(leads: List[dict]) -> Dict[tuple, int]:
+    counts = {}
+    for lead in leads:
+        for field, is_second_chance in ORDER_FIELDS:
+            if lead.get(field):
+                key = (lead[field], is_second_chance)
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+async def _move_completed_leads(stored_leads: List[dict], updated_leads: List[dict] = ()):
+    """
+    Applies the change in order assignment between the stored and the updated leads to the completed lead
+    counters of the orders involved. Deleted leads are passed without updated leads.
+    """
+    from app.controllers import order as order_controller
+    changes = _completed_lead_counts(updated_leads)
+    for key, count in _completed_lead_counts(stored_leads).items():
+        changes[key] = changes.get(key, 0) - count
+    for (order_id, is_second_chance), amount in changes.items():
+        await order_controller.increment_completed_leads(order_id, amount, is_second_chance=is_second_chance)
+
+
+def _with_normalized_phone(document: dict) -> dict:
+    """
+    Adds the normalized phone that duplicate checks look leads up by, when the document sets a phone.
+    """
+    if "phone" in document:
+        return {**document, "phone_normalized": dedup_controller.normalize_phone(document["phone"])}
+    return document
+
+
 async def update_lead(id, lead: lead_model.UpdateLeadModel):
     if all(v is None for v in lead.model_dump(mode="python").values()):
         raise LeadEmptyError("No values to update")
@@ -58,13 +154,15 @@ async def update_lead(id, lead: lead_model.UpdateLeadModel):
         lead = {k: v for k, v in lead.model_dump(by_alias=True, mode="python").items() if v is not None}
 
         if len(lead) >= 1:
-            update_result = await lead_collection.find_one_and_update(
+            stored_lead = await lead_collection.find_one_and_update(
                 {"_id": ObjectId(id)},
-                {"$set": lead},
-                return_document=ReturnDocument.AFTER,
+                {"$set": _with_normalized_phone(lead)},
+                return_document=ReturnDocument.BEFORE,
             )
 
-            if update_result is not None:
+            if stored_lead is not None:
+                update_result = {**stored_lead, **lead}
+                await _move_completed_leads([stored_lead], [update_result])
                 return update_result
 
             else:
@@ -88,13 +186,15 @@ async def update_lead_from_ghl(id, lead: lead_model.UpdateLeadModel):
         if "created_time" in lead:
             lead["created_time"] = formatter.format_time(lead["created_time"])
         if len(lead) >= 1:
-            update_result = await lead_collection.find_one_and_update(
+            stored_lead = await lead_collection.find_one_and_update(
                 {"_id": ObjectId(id)},
-                {"$set": lead},
-                return_document=ReturnDocument.AFTER,
+                {"$set": _with_normalized_phone(lead)},
+                return_document=ReturnDocument.BEFORE,
             )
 
-            if update_result is not None:
+            if stored_lead is not None:
+                update_result = {**stored_lead, **lead}
+                await _move_completed_leads([stored_lead], [update_result])
                 return update_result
 
             else:
@@ -138,8 +238,10 @@ async def create_lead(lead: lead_model.LeadModel):
     else:
         lead.custom_fields["invalid"] = "no"
     new_lead = await lead_collection.insert_one(
-        lead.model_dump(by_alias=True, exclude=["id", "campaign_name"], mode="python")
+        _with_normalized_phone(lead.model_dump(by_alias=True, exclude=["id", "campaign_name"], mode="python"))
     )
+    await dedup_controller.record_leads([lead])
+    await rollup_controller.record_leads_created([lead])
     if lead.custom_fields.get("invalid") == "yes":
         return new_lead
     if str(lead.campaign_id) not in constants.OG_CAMPAIGNS:
@@ -154,7 +256,114 @@ async def create_lead(lead: lead_model.LeadModel):
     return new_lead
 
 
-async def get_all_leads(page, limit, sort, filter):
+async def create_leads_bulk(leads: List[lead_model.LeadModel]) -> Dict[str, Any]:
+    lead_collection = get_lead_collection()
+    rejection_reasons_by_lead = []
+    for lead in leads:
+        lead.custom_fields = lead.custom_fields or {}
+        rejection_reasons_by_lead.append(_validate_lead_fields(lead))
+    valid_indexes = [index for index, rejection_reasons in enumerate(rejection_reasons_by_lead) if not rejection_reasons]
+    duplicates = await find_duplicate_leads([leads[index] for index in valid_indexes])
+    for position in duplicates:
+        rejection_reasons_by_lead[valid_indexes[position]].append("Duplicate lead")
+
+    documents = []
+    for lead, rejection_reasons in zip(leads, rejection_reasons_by_lead):
+        if rejection_reasons:
+            lead.custom_fields["rejection_reasons"] = rejection_reasons
+            lead.custom_fields["invalid"] = "yes"
+        else:
+            lead.custom_fields["invalid"] = "no"
+        lead.id = ObjectId()
+        documents.append(_with_normalized_phone(lead.model_dump(by_alias=True, exclude=["campaign_name"], mode="python")))
+
+    failed_indexes = set()
+    if documents:
+        try:
+            await lead_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+            logger.error(f"{len(failed_indexes)} leads failed to insert in bulk: {e.details.get('writeErrors', [])[:5]}")
+
+    inserted_leads = [lead for index, lead in enumerate(leads) if index not in failed_indexes]
+    await dedup_controller.record_leads(inserted_leads)
+    await rollup_controller.record_leads_created(inserted_leads)
+    leads_to_process = [
+        (lead, str(lead.id)) for lead in inserted_leads
+        if lead.custom_fields.get("invalid") == "no"
+        and str(lead.campaign_id) not in constants.OG_CAMPAIGNS
+        and not lead.second_chance_buyer_id
+    ]
+    if leads_to_process:
+        second_chance_task_ids = lead_background_jobs.process_leads_in_bulk(
+            leads_to_process,
+            second_chance_days=constants.TIME_FOR_SECOND_CHANCE
+        )
+        if second_chance_task_ids:
+            await lead_collection.bulk_write([
+                UpdateOne({"_id": ObjectId(lead_id)}, {"$set": {"second_chance_task_id": task_id}})
+                for lead_id, task_id in second_chance_task_ids.items()
+            ], ordered=False)
+
+    return {
+        "inserted_ids": [str(lead.id) for lead in inserted_leads],
+        "invalid": sum(1 for lead in inserted_leads if lead.custom_fields.get("invalid") == "yes"),
+        "failed": len(failed_indexes)
+    }
+
+
+async def find_duplicate_leads(leads: List[lead_model.LeadModel]) -> set:
+    """
+    Returns the positions of the leads that duplicate an existing lead, or an earlier lead of the same batch,
+    within their campaign's duplication window. Phones are compared normalized, the same way as single inserts,
+    and existing leads are looked up once per campaign. Campaigns without a duplication window never have
+    duplicates, and only leads that are not duplicates themselves count against later leads of the batch.
+    """
+    phones_by_campaign = {}
+    for lead in leads:
+        if lead.phone:
+            phones_by_campaign.setdefault(lead.campaign_id, set()).add(lead.phone)
+
+    now = datetime.utcnow()
+    seen = set()
+    checked_campaigns = set()
+    for campaign_id, phones in phones_by_campaign.items():
+        try:
+            campaign = await campaign_controller.get_one_campaign(campaign_id)
+        except campaign_controller.CampaignNotFoundError:
+            logger.warning(f"Campaign {campaign_id} not found while checking bulk leads for duplicates")
+            continue
+        if not campaign.duplication_cutoff_days:
+            continue
+        checked_campaigns.add(campaign_id)
+        cutoff = now - timedelta(days=campaign.duplication_cutoff_days)
+        recent_phones = await _find_recent_phones(campaign_id, phones, cutoff)
+        seen.update((campaign_id, phone) for phone in recent_phones)
+
+    duplicates = set()
+    for index, lead in enumerate(leads):
+        key = (lead.campaign_id, dedup_controller.normalize_phone(lead.phone))
+        if key[1] is None or lead.campaign_id not in checked_campaigns:
+            continue
+        if key in seen:
+            duplicates.add(index)
+        else:
+            seen.add(key)
+    return duplicates
+
+
+async def _find_recent_phones(campaign_id: str, phones: set, cutoff: datetime) -> set:
+    try:
+        latest_created_times = await dedup_controller.get_latest_created_times(campaign_id, "phone", phones)
+    except dedup_controller.DedupIndexUnavailableError:
+        latest_created_times = await dedup_controller.find_latest_created_times(campaign_id, "phone", phones, cutoff)
+    return {
+        phone for phone, created_time in latest_created_times.items()
+        if created_time is not None and created_time >= cutoff
+    }
+
+
+def _prepare_list_filter(filter):
     if not filter:
         filter = {}
 
@@ -165,29 +374,116 @@ async def get_all_leads(page, limit, sort, filter):
         filter["first_name"] = {"$regex": str.capitalize(filter["first_name"]), "$options": "i"}
     if "last_name" in filter:
         filter["last_name"] = {"$regex": str.capitalize(filter["last_name"]), "$options": "i"}
+    return filter, date_gte, date_lte
+
+
+def _scope_filter_to_agent(filter):
+    agent_id = filter.pop("agent_id")
+    filter["$or"] = [
+        {"buyer_id": ObjectId(agent_id)},
+        {"second_chance_buyer_id": ObjectId(agent_id)}
+    ]
+    return agent_id
+
+
+async def get_all_leads(page, limit, sort, filter, cursor=None):
+    filter, date_gte, date_lte = _prepare_list_filter(filter)
     if "agent_id" in filter:
         if not filter["agent_id"]:
-            return [], 0
-        agent_id = filter.pop("agent_id")
-        filter["$or"] = [
-            {"buyer_id": ObjectId(agent_id)},
-            {"second_chance_buyer_id": ObjectId(agent_id)}
-        ]
-        pipeline = _build_aggregation_pipeline(filter, sort, page, limit, agent_id, date_gte, date_lte)
+            return [], totals.ListTotal(0), None
+        agent_id = _scope_filter_to_agent(filter)
+        pipeline = _build_aggregation_pipeline(filter, sort, page, limit, agent_id, date_gte, date_lte, cursor)
     else:
         pipeline = []
 
     lead_collection = get_lead_collection()
     if pipeline:
-        result = await lead_collection.aggregate(pipeline).to_list(None)
-        leads = result[0]["data"]
-        total = result[0]["total"][0]["count"] if result[0]["total"] else 0
+        leads_in_db = await lead_collection.aggregate(pipeline).to_list(None)
+        total = await totals.count_documents(lead_collection, pipeline[0]["$match"])
+        next_cursor = pagination.next_cursor(leads_in_db, limit, sort)
+        leads = [lead_model.LeadModel.raw_json(lead) for lead in leads_in_db]
+    else:
+        query = pagination.apply_cursor(filter, cursor, sort)
+        skip = 0 if cursor else (page - 1) * limit
+        leads_in_db = await lead_collection.find(query, LEAD_LIST_PROJECTION).sort(
+            pagination.sort_with_tiebreaker(sort)
+        ).skip(skip).limit(limit).to_list(limit)
+        next_cursor = pagination.next_cursor(leads_in_db, limit, sort)
+        leads = [lead_model.LeadModel.raw_json(lead) for lead in leads_in_db]
+        total = await totals.count_documents(lead_collection, filter)
+
+    return leads, total, next_cursor
+
+
+async def export_leads(
+    filter,
+    sort,
+    export_format: str = "csv",
+    hidden_custom_fields: tuple = ()
+) -> AsyncIterator[str]:
+    """
+    Streams the leads matching the list filters as CSV or NDJSON, EXPORT_CHUNK_SIZE rows at a time.
+    Documents are read from a projected cursor and never held in memory all at once.
+    """
+    filter, date_gte, date_lte = _prepare_list_filter(filter)
+    lead_collection = get_lead_collection()
+    if "agent_id" in filter:
+        if not filter["agent_id"]:
+            cursor = None
+        else:
+            agent_id = _scope_filter_to_agent(filter)
+            pipeline = _build_aggregation_pipeline(filter, sort, 1, None, agent_id, date_gte, date_lte)
+            cursor = lead_collection.aggregate(pipeline, allowDiskUse=True, batchSize=EXPORT_CHUNK_SIZE)
     else:
-        leads_in_db = await lead_collection.find(filter).sort([sort]).skip((page - 1) * limit).limit(limit).to_list(limit)
-        leads = [lead_model.LeadModel(**lead).to_json() for lead in leads_in_db]
-        total = await lead_collection.count_documents(filter) if filter else await lead_collection.count_documents({})
+        cursor = lead_collection.find(
+            filter,
+            LEAD_EXPORT_PROJECTION,
+            sort=pagination.sort_with_tiebreaker(sort),
+            batch_size=EXPORT_CHUNK_SIZE
+        )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(LEAD_EXPORT_FIELDS)
+    rows = 0
+    if cursor is not None:
+        async for lead in cursor:
+            row = _lead_export_row(lead, hidden_custom_fields)
+            if export_format == "csv":
+                writer.writerow([_csv_value(row[field]) for field in LEAD_EXPORT_FIELDS])
+            else:
+                buffer.write(json.dumps(row, default=str) + "\n")
+            rows += 1
+            if rows % EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+    logger.info(f"Exported {rows} leads as {export_format}")
+
+
+def _lead_export_row(lead: dict, hidden_custom_fields: tuple) -> Dict[str, Any]:
+    custom_fields = {
+        key: value for key, value in (lead.get("custom_fields") or {}).items() if key not in hidden_custom_fields
+    }
+    row = {}
+    for field in LEAD_EXPORT_FIELDS:
+        value = custom_fields if field == "custom_fields" else lead.get("_id" if field == "id" else field)
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        row[field] = value
+    return row
+
 
-    return leads, total
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return json.dumps(value, default=str) if value else ""
+    return value
 
 
 async def get_one_lead(id):
@@ -207,7 +503,10 @@ async def get_one_lead(id):
 async def delete_lead(id):
     lead_collection = get_lead_collection()
     try:
+        stored_lead = await lead_collection.find_one({"_id": ObjectId(id)}, {field: 1 for field, _ in ORDER_FIELDS})
         delete_result = await lead_collection.delete_one({"_id": ObjectId(id)})
+        if stored_lead and delete_result.deleted_count:
+            await _move_completed_leads([stored_lead])
         return delete_result
     except bson.errors.InvalidId:
         raise LeadIdInvalidError(f"Invalid id {id} on delete lead route")
@@ -215,7 +514,10 @@ async def delete_lead(id):
 
 async def delete_leads(ids):
     lead_collection = get_lead_collection()
-    result = await lead_collection.delete_many({"_id": {"$in": [ObjectId(id) for id in ids if id != "null"]}})
+    query = {"_id": {"$in": [ObjectId(id) for id in ids if id != "null"]}}
+    stored_leads = await lead_collection.find(query, {field: 1 for field, _ in ORDER_FIELDS}).to_list(None)
+    result = await lead_collection.delete_many(query)
+    await _move_completed_leads(stored_leads)
     return result
 
 
@@ -305,7 +607,7 @@ def _handle_lead_received_date_filter(filter):
     return filter, None, None
 
 
-def _build_aggregation_pipeline(filter, sort, page, limit, agent_id, date_gte, date_lte):
+def _build_aggregation_pipeline(filter, sort, page, limit, agent_id, date_gte, date_lte, cursor=None):
     match_conditions = []
 
     if filter:
@@ -338,19 +640,9 @@ def _build_aggregation_pipeline(filter, sort, page, limit, agent_id, date_gte, d
         date_expr_conditions.append({"$lte": [lead_received_date_expr, date_lte]})
 
     if date_expr_conditions:
-        if len(date_expr_conditions) == 1:
-            date_condition = date_expr_conditions[0]
-        else:
-            date_condition = {"$and": date_expr_conditions}
-        match_conditions.append({"$expr": date_condition})
+        match_conditions.append({"$expr": _all_of(date_expr_conditions)})
 
-    if match_conditions:
-        if len(match_conditions) == 1:
-            match_stage = {"$match": match_conditions[0]}
-        else:
-            match_stage = {"$match": {"$and": match_conditions}}
-    else:
-        match_stage = {"$match": {}}
+    match_stage = {"$match": _all_of(match_conditions) if match_conditions else {}}
 
     pipeline = [
         match_stage,
@@ -391,23 +683,31 @@ def _build_aggregation_pipeline(filter, sort, page, limit, agent_id, date_gte, d
                 "is_second_chance": 1
             }
         },
-        {
-            "$facet": {
-                "data": [
-                    {"$sort": {sort[0]: sort[1]}},
-                    {"$skip": (page - 1) * limit},
-                    {"$limit": limit}
-                ],
-                "total": [
-                    {"$count": "count"}
-                ]
-            }
-        }
+        *_page_stages(sort, page, limit, cursor)
     ]
 
     return pipeline
 
 
+def _all_of(conditions):
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def _page_stages(sort, page, limit, cursor=None):
+    """
+    Sorts with the id tiebreaker and selects the requested page, after the cursor when one is given
+    and by skipping the previous pages otherwise.
+    """
+    stages = [{"$match": pagination.keyset_filter(cursor, sort)}] if cursor else []
+    stages.append({"$sort": dict(pagination.sort_with_tiebreaker(sort))})
+    if limit:
+        stages.extend([
+            {"$skip": 0 if cursor else (page - 1) * limit},
+            {"$limit": limit}
+        ])
+    return stages
+
+
 async def get_leads(ids: List[ObjectId], user: UserModel):
     lead_collection = get_lead_collection()
     if user.is_agent():
@@ -466,21 +766,21 @@ async def get_leads(ids: List[ObjectId], user: UserModel):
         ]
         leads_in_db = await lead_collection.aggregate(pipeline).to_list(None)
     else:
-        leads_in_db = await lead_collection.find({"_id": {"$in": [ObjectId(id) for id in ids]}}).to_list(None)
-    leads = [lead_model.LeadModel(**lead).to_json() for lead in leads_in_db]
+        leads_in_db = await lead_collection.find({"_id": {"$in": [ObjectId(id) for id in ids]}}, LEAD_LIST_PROJECTION).to_list(None)
+    leads = [lead_model.LeadModel.raw_json(lead) for lead in leads_in_db]
     return leads
 
 
 async def assign_lead_to_agent(lead: lead_model.LeadModel, lead_id: str):
-    from app.controllers import agent as agent_controller
     from app.controllers import campaign as campaign_controller
     from app.controllers import order as order_controller
+    from app.controllers import routing as routing_controller
     from app.controllers import transaction as transaction_controller
     from app.controllers import user as user_controller
     lead_collection = get_lead_collection()
     campaign = await campaign_controller.get_one_campaign(lead.campaign_id)
     lead_price = campaign.price_per_lead
-    agents_with_prioritized_orders = await agent_controller.get_agents_with_prioritized_orders(campaign_id=lead.campaign_id)
+    agents_with_prioritized_orders = await routing_controller.get_agents_with_prioritized_orders(campaign_id=lead.campaign_id, lead=lead)
     if not agents_with_prioritized_orders:
         logger.warning(f"No agents with prioritized orders found for lead {lead_id}")
     logger.info(f"Agents with prioritized orders: {[agent.first_name + ' ' + agent.last_name for agent in agents_with_prioritized_orders]}")
@@ -494,7 +794,7 @@ async def assign_lead_to_agent(lead: lead_model.LeadModel, lead_id: str):
         eligible_agents = eligible_prioritized_agents
         logger.info(f"Using prioritized agents pool for lead {lead_id}")
     else:
-        agents_with_open_orders = await agent_controller.get_agents_with_open_orders(campaign_id=lead.campaign_id, lead=lead)
+        agents_with_open_orders = await routing_controller.get_agents_with_open_orders(campaign_id=lead.campaign_id, lead=lead)
         if not agents_with_open_orders:
             logger.warning(f"No agents with open orders found for lead {lead_id}")
             return
@@ -506,16 +806,13 @@ async def assign_lead_to_agent(lead: lead_model.LeadModel, lead_id: str):
             return
 
     logger.info(f"Final eligible agents: {[agent.first_name + ' ' + agent.last_name for agent in eligible_agents]}")
-    agent_to_distribute: AgentModel = choose_agent(agents=eligible_agents, distribution_type="random")
+    agent_to_distribute, current_lead_order = await _choose_agent_with_open_order(
+        eligible_agents, lead, distribution_type=settings.fresh_distribution_type
+    )
 
     if agent_to_distribute:
         if agent_to_distribute.lead_price_override:
             lead_price = agent_to_distribute.lead_price_override
-        current_lead_order = await order_controller.get_oldest_open_order_by_agent_and_campaign(
-            agent_id=agent_to_distribute.id,
-            campaign_id=lead.campaign_id,
-            is_second_chance=False
-        )
         if current_lead_order:
             lead.lead_order_id = current_lead_order.id
         if agent_to_distribute.CRM.name:
@@ -532,6 +829,8 @@ async def assign_lead_to_agent(lead: lead_model.LeadModel, lead_id: str):
             user = await user_controller.get_user_by_field(agent_id=agent_to_distribute.id)
             user_id = user.id
             if current_lead_order:
+                await order_controller.increment_completed_leads(current_lead_order.id)
+                routing_controller.record_assignment(lead.campaign_id, agent_to_distribute.id)
                 await order_controller.check_order_amounts_and_close(current_lead_order)
             await transaction_controller.create_transaction(
                 TransactionModel(
@@ -544,6 +843,7 @@ async def assign_lead_to_agent(lead: lead_model.LeadModel, lead_id: str):
                     campaign_id=lead.campaign_id
                 )
             )
+            await rollup_controller.record_sales(lead.campaign_id, agent_to_distribute.id, 1, lead_price)
             logger.info(f"Lead {lead_id} assigned to agent {agent_to_distribute.id}")
     else:
         logger.info(f"Lead {lead_id} not assigned to any agent")
@@ -573,7 +873,8 @@ async def push_lead_to_crm(agent: AgentModel, lead: lead_model.LeadModel):
             ringy_detail = next((d for d in integration_details if d.type == lead_type), None)
             if ringy_detail:
                 ringy_crm_instance = crm(integration_details=ringy_detail.model_dump())
-                ringy_crm_instance.push_lead(lead.crm_json())
+                delivery = await ringy_crm_instance.push_lead(lead.crm_json())
+                await record_crm_delivery(lead.id, delivery)
             else:
                 logger.warning(f"No Ringy integration details found for agent {agent.id} and campaign {lead.campaign_id}. Skipping CRM push for lead {lead.id}.")
         
@@ -598,18 +899,105 @@ async def push_second_chance_lead_to_crm(agent_to_distribute: AgentModel, lead:
     await push_lead_to_crm(agent_to_distribute, lead)
 
 
-def choose_agent(agents, distribution_type):
-    if distribution_type == "round_robin":
-        return agents[0]
-    elif distribution_type == "random":
-        return random.choice(agents)
+async def push_leads_to_crm(agent: AgentModel, leads: List[lead_model.LeadModel]):
+    """
+    Pushes a batch of leads to the agent's configured CRM.
+    GoHighLevel contacts are sent concurrently over the shared connection pool; other CRMs go lead by lead.
+    """
+    if not (agent.CRM and agent.CRM.name) or not leads:
+        return
+    if agent.CRM.name != "GoHighLevel":
+        for lead in leads:
+            await push_lead_to_crm(agent, lead)
+        return
+
+    leads_by_campaign = {}
+    for lead in leads:
+        leads_by_campaign.setdefault(lead.campaign_id, []).append(lead)
+    crm = crm_chooser(agent.CRM.name)
+    for campaign_id, campaign_leads in leads_by_campaign.items():
+        try:
+            integration_details = agent.CRM.get_campaign_integration_details(str(campaign_id)) or []
+            gohighlevel_detail = next((d for d in integration_details if isinstance(d, GoHighLevelIntegration)), None)
+            if not (gohighlevel_detail and gohighlevel_detail.api_key):
+                logger.warning(
+                    f"No GoHighLevel API key found for agent {agent.id} and campaign {campaign_id}. "
+                    f"Skipping CRM push for {len(campaign_leads)} leads."
+                )
+                continue
+            campaign = await campaign_controller.get_one_campaign(campaign_id)
+            campaign_name_for_tag = campaign.name if campaign else "Unknown Campaign"
+            await crm.send_leads(campaign_leads, gohighlevel_detail.api_key, campaign_name_for_tag)
+        except Exception as e:
+            logger.error(f"Error in push_leads_to_crm for agent {agent.id}, campaign {campaign_id}: {e}", exc_info=True)
+
+
+async def record_crm_delivery(lead_id, delivery: lead_model.CRMDeliveryModel):
+    """
+    Appends the outcome of a CRM push to the lead's delivery history.
+    """
+    lead_collection = get_lead_collection()
+    try:
+        await lead_collection.update_one(
+            {"_id": ObjectId(lead_id)},
+            {"$push": {"crm_deliveries": delivery.model_dump()}}
+        )
+    except Exception as e:
+        logger.error(f"Error recording CRM delivery for lead {lead_id}: {e}")
+
+
+async def choose_agent(agents, distribution_type, campaign_id=None, is_second_chance=False, weights=None):
+    return await distribution_controller.choose_agent(
+        agents,
+        distribution_type,
+        campaign_id=campaign_id,
+        is_second_chance=is_second_chance,
+        weights=weights
+    )
 
 
-async def _is_second_chance_lead(lead_id: str):
-    lead = await get_one_lead(lead_id)
-    if lead.is_second_chance:
-        return True
-    return False
+async def _choose_agent_with_open_order(agents: List[AgentModel], lead: lead_model.LeadModel, distribution_type: str):
+    """
+    Picks an agent from the routing candidates along with the order the lead will fill.
+    An agent without an open order means the routing index is stale, so it is dropped and rebuilt.
+    """
+    from app.controllers import order as order_controller
+    from app.controllers import routing as routing_controller
+    weights = None
+    if distribution_type == distribution_controller.WEIGHTED:
+        weights = await distribution_controller.get_capacity_weights(lead.campaign_id, lead.is_second_chance)
+    while agents:
+        agent = await choose_agent(
+            agents=agents,
+            distribution_type=distribution_type,
+            campaign_id=lead.campaign_id,
+            is_second_chance=lead.is_second_chance,
+            weights=weights
+        )
+        order = await order_controller.get_oldest_open_order_by_agent_and_campaign(
+            agent_id=agent.id,
+            campaign_id=lead.campaign_id,
+            is_second_chance=lead.is_second_chance
+        )
+        if order:
+            return agent, order
+        logger.warning(f"Agent {agent.id} has no open order for campaign {lead.campaign_id}. Refreshing routing index.")
+        routing_controller.invalidate_campaign(lead.campaign_id)
+        agents = [candidate for candidate in agents if candidate.id != agent.id]
+    return None, None
+
+
+async def get_leads_for_delivery(lead_ids: list) -> Dict[str, lead_model.LeadModel]:
+    """
+    Loads the leads with the fields needed to classify and deliver them, in a single query.
+    Returns them keyed by the string lead id; ids that do not exist are left out.
+    """
+    lead_collection = get_lead_collection()
+    leads_in_db = await lead_collection.find(
+        {"_id": {"$in": [ObjectId(id) for id in lead_ids]}},
+        LEAD_DELIVERY_PROJECTION
+    ).to_list(None)
+    return {str(lead["_id"]): lead_model.LeadModel(**lead) for lead in leads_in_db}
 
 
 async def send_leads_to_agent(lead_ids: list, agent_id: str, campaign_id: str):
@@ -626,20 +1014,33 @@ async def send_leads_to_agent(lead_ids: list, agent_id: str, campaign_id: str):
     if not agent:
         logger.warning(f"Agent {agent_id} not found")
         return
-    second_chance_leads = [lead for lead in lead_ids if await _is_second_chance_lead(lead)]
-    fresh_leads = [lead for lead in lead_ids if not await _is_second_chance_lead(lead)]
+    leads_by_id = await get_leads_for_delivery(lead_ids)
+    missing_leads = [str(lead_id) for lead_id in lead_ids if str(lead_id) not in leads_by_id]
+    if missing_leads:
+        logger.warning(f"Leads {missing_leads} not found, they will not be sent to agent {agent_id}")
+    second_chance_leads, fresh_leads = [], []
+    for lead_id in lead_ids:
+        lead = leads_by_id.get(str(lead_id))
+        if lead:
+            (second_chance_leads if lead.is_second_chance else fresh_leads).append(lead_id)
     try:
         if fresh_leads:
-            await send_fresh_leads_to_agent(fresh_leads, agent, campaign, user=user)
+            await send_fresh_leads_to_agent(fresh_leads, agent, campaign, user=user, leads_by_id=leads_by_id)
         if second_chance_leads:
-            await send_second_chance_leads_to_agent(second_chance_leads, agent, campaign, user=user)
+            await send_second_chance_leads_to_agent(second_chance_leads, agent, campaign, user=user, leads_by_id=leads_by_id)
         return True
     except Exception as e:
         logger.error(f"Error sending leads to agent {agent_id}: {str(e)}")
         return False
 
 
-async def send_fresh_leads_to_agent(lead_ids: list, agent: AgentModel, campaign: CampaignModel, user: UserModel):
+async def send_fresh_leads_to_agent(
+    lead_ids: list,
+    agent: AgentModel,
+    campaign: CampaignModel,
+    user: UserModel,
+    leads_by_id: Optional[Dict[str, lead_model.LeadModel]] = None
+):
     from app.controllers import order as order_controller
     from app.controllers import transaction as transaction_controller
 
@@ -658,10 +1059,11 @@ async def send_fresh_leads_to_agent(lead_ids: list, agent: AgentModel, campaign:
             "lead_order_id": oldest_open_order.id
         }}
     )
+    await order_controller.increment_completed_leads(oldest_open_order.id, result.modified_count)
     if agent.CRM.name:
-        for lead_id in lead_ids:
-            lead = await get_one_lead(lead_id)
-            await lead_background_jobs.push_lead_to_crm(agent, lead)
+        leads_by_id = leads_by_id or await get_leads_for_delivery(lead_ids)
+        leads = [leads_by_id[str(lead_id)] for lead_id in lead_ids if str(lead_id) in leads_by_id]
+        await lead_background_jobs.push_leads_to_crm(agent, leads)
     else:
         logger.warning(f"No CRM found for agent {agent.id}")
     if agent.lead_price_override:
@@ -681,15 +1083,21 @@ async def send_fresh_leads_to_agent(lead_ids: list, agent: AgentModel, campaign:
             campaign_id=campaign.id
         )
     )
+    await rollup_controller.record_sales(campaign.id, agent.id, result.modified_count, lead_price * len(lead_ids))
 
     await order_controller.check_order_amounts_and_close(oldest_open_order)
-    await order_controller.update_order(oldest_open_order.id, oldest_open_order)
     if result.modified_count == len(lead_ids):
         return True
     return False
 
 
-async def send_second_chance_leads_to_agent(lead_ids: list, agent: AgentModel, campaign: CampaignModel, user: UserModel):
+async def send_second_chance_leads_to_agent(
+    lead_ids: list,
+    agent: AgentModel,
+    campaign: CampaignModel,
+    user: UserModel,
+    leads_by_id: Optional[Dict[str, lead_model.LeadModel]] = None
+):
     from app.controllers import order as order_controller
     from app.controllers import transaction as transaction_controller
 
@@ -726,11 +1134,12 @@ async def send_second_chance_leads_to_agent(lead_ids: list, agent: AgentModel, c
             "second_chance_lead_order_id": oldest_open_order.id
         }}
     )
+    await order_controller.increment_completed_leads(oldest_open_order.id, result.modified_count, is_second_chance=True)
 
     if agent.CRM.name:
-        for lead_id in current_batch:
-            lead = await get_one_lead(lead_id)
-            await lead_background_jobs.push_lead_to_crm(agent, lead, is_second_chance=True)
+        leads_by_id = leads_by_id or await get_leads_for_delivery(lead_ids)
+        leads = [leads_by_id[str(lead_id)] for lead_id in current_batch if str(lead_id) in leads_by_id]
+        await lead_background_jobs.push_leads_to_crm(agent, leads)
     else:
         logger.warning(f"No CRM found for agent {agent.id}")
 
@@ -750,13 +1159,15 @@ async def send_second_chance_leads_to_agent(lead_ids: list, agent: AgentModel, c
             campaign_id=campaign.id
         )
     )
+    await rollup_controller.record_sales(
+        campaign.id, agent.id, result.modified_count, lead_price * len(current_batch), is_second_chance=True
+    )
 
     await order_controller.check_order_amounts_and_close(oldest_open_order)
-    await order_controller.update_order(oldest_open_order.id, oldest_open_order)
 
     if remaining_leads:
         logger.info(f"Processed {len(current_batch)} leads for order {oldest_open_order.id}. Checking for more orders to fill with {len(remaining_leads)} remaining leads.")
-        return await send_second_chance_leads_to_agent(remaining_leads, agent, campaign, user)
+        return await send_second_chance_leads_to_agent(remaining_leads, agent, campaign, user, leads_by_id=leads_by_id)
 
     if result.modified_count == len(current_batch):
         return True
@@ -767,12 +1178,16 @@ async def get_eligible_agents_for_lead(agents: List[AgentModel], lead: lead_mode
     formatted_lead_state = formatter.format_state_to_abbreviation(lead.state)
     eligible_agents = []
     daily_cap_blacklist = ["6668b634a88f8e5a8dde197c", "6668b634a88f8e5a8dde197d"]
+    apply_daily_cap = not lead.is_second_chance and str(lead.campaign_id) not in daily_cap_blacklist
+    todays_lead_counts = {}
+    if apply_daily_cap:
+        todays_lead_counts = await todays_lead_counts_by_agents([agent.id for agent in agents], lead.campaign_id)
     for agent in agents:
-        if not lead.is_second_chance and str(lead.campaign_id) not in daily_cap_blacklist:
+        if apply_daily_cap:
             daily_limit = await agent.campaign_daily_limit(lead.campaign_id)
             if not daily_limit:
                 continue
-            if await agent.todays_lead_count(lead.campaign_id) >= daily_limit:
+            if todays_lead_counts.get(agent.id, 0) >= daily_limit:
                 continue
         if formatted_lead_state in agent.states_with_license:
             if lead.is_second_chance:
@@ -796,72 +1211,6 @@ async def get_eligible_prioritized_agents_for_lead(agents: List[AgentModel], lea
     return eligible_agents
 
 
-def _build_date_range_query(date_range: Dict[str, datetime],
-                            date_field: str,
-                            campaigns: List[bson.ObjectId],
-                            is_second_chance: Optional[bool] = None) -> Dict:
-    base_query = {
-        date_field: {
-            "$gte": date_range["start"],
-            "$lte": date_range["end"]
-        }
-    }
-
-    if campaigns:
-        base_query["campaign_id"] = {"$in": campaigns}
-
-    if is_second_chance is not None:
-        if is_second_chance:
-            base_query["$or"] = [
-                {"is_second_chance": True},
-                {"second_chance_buyer_id": {"$exists": True}}
-            ]
-        else:
-            base_query["$and"] = [
-                {"is_second_chance": False},
-                {"buyer_id": {"$exists": True}}
-            ]
-
-    return base_query
-
-
-async def get_lead_counts(date_ranges: Dict[str, Any], campaigns: List[bson.ObjectId]) -> Dict[str, Dict[str, int]]:
-    if not date_ranges:
-        return {}
-
-    lead_collection = get_lead_collection()
-    result = {
-        "created": {},
-        "fresh_sold": {},
-        "second_chance_sold": {}
-    }
-
-    for period in ["thisWeek", "lastWeek", "thisMonth", "lastMonth"]:
-        if period in date_ranges:
-            created_query = _build_date_range_query(
-                date_ranges[period],
-                DateField.CREATED.value,
-                campaigns
-            )
-            result["created"][period] = await lead_collection.count_documents(created_query)
-            fresh_query = _build_date_range_query(
-                date_ranges[period],
-                DateField.SOLD.value,
-                campaigns,
-                False
-            )
-            result["fresh_sold"][period] = await lead_collection.count_documents(fresh_query)
-            second_chance_query = _build_date_range_query(
-                date_ranges[period],
-                DateField.SECOND_CHANCE_SOLD.value,
-                campaigns,
-                True
-            )
-            result["second_chance_sold"][period] = await lead_collection.count_documents(second_chance_query)
-
-    return result
-
-
 async def get_unsold_leads(campaigns):
     lead_collection = get_lead_collection()
     now = datetime.utcnow()
@@ -900,11 +1249,11 @@ async def get_unsold_leads(campaigns):
     #     "custom_fields.invalid": "yes"
     # }
 
-    fresh_unsold_in_db = await lead_collection.find(fresh_unsold_query).to_list(None)
-    fresh_unsold = [lead_model.LeadModel(**lead).to_json() for lead in fresh_unsold_in_db]
+    fresh_unsold_in_db = await lead_collection.find(fresh_unsold_query, LEAD_LIST_PROJECTION).to_list(None)
+    fresh_unsold = [lead_model.LeadModel.raw_json(lead) for lead in fresh_unsold_in_db]
     fresh_unsold_total = await lead_collection.count_documents(fresh_unsold_query)
-    second_chance_unsold_in_db = await lead_collection.find(second_chance_query).to_list(None)
-    second_chance_unsold = [lead_model.LeadModel(**lead).to_json() for lead in second_chance_unsold_in_db]
+    second_chance_unsold_in_db = await lead_collection.find(second_chance_query, LEAD_LIST_PROJECTION).to_list(None)
+    second_chance_unsold = [lead_model.LeadModel.raw_json(lead) for lead in second_chance_unsold_in_db]
 
     second_chance_unsold_total = await lead_collection.count_documents(second_chance_query)
 
@@ -916,15 +1265,18 @@ async def get_unsold_leads(campaigns):
     }
 
 
-async def validate_lead(lead: lead_model.LeadModel) -> tuple:
-    rejection_reasons = []
+def _validate_lead_fields(lead: lead_model.LeadModel) -> List[str]:
     if not lead.phone or not lead.email:
-        rejection_reasons.append("Missing phone or email")
-        return False, rejection_reasons
+        return ["Missing phone or email"]
     format_number = formatter.format_phone_number(lead.phone)
-    is_valid_phone = validator.validate_phone_number(format_number)
-    if not is_valid_phone:
-        rejection_reasons.append("Invalid phone number")
+    if not validator.validate_phone_number(format_number):
+        return ["Invalid phone number"]
+    return []
+
+
+async def validate_lead(lead: lead_model.LeadModel) -> tuple:
+    rejection_reasons = _validate_lead_fields(lead)
+    if rejection_reasons:
         return False, rejection_reasons
     is_duplicate = await validator.validate_duplicate(lead, lead.campaign_id)
     if is_duplicate:
@@ -934,15 +1286,15 @@ async def validate_lead(lead: lead_model.LeadModel) -> tuple:
 
 
 async def assign_second_chance_lead_to_agent(lead: lead_model.LeadModel, lead_id: str):
-    from app.controllers import agent as agent_controller
     from app.controllers import campaign as campaign_controller
     from app.controllers import order as order_controller
+    from app.controllers import routing as routing_controller
     from app.controllers import transaction as transaction_controller
     from app.controllers import user as user_controller
     lead_collection = get_lead_collection()
     campaign = await campaign_controller.get_one_campaign(lead.campaign_id)
     lead_price = campaign.price_per_second_chance_lead
-    agents_with_open_orders = await agent_controller.get_agents_with_open_orders(campaign_id=lead.campaign_id, lead=lead)
+    agents_with_open_orders = await routing_controller.get_agents_with_open_orders(campaign_id=lead.campaign_id, lead=lead)
     if not agents_with_open_orders:
         logger.warning(f"No agents with balance found for lead {lead_id}")
         return
@@ -950,15 +1302,12 @@ async def assign_second_chance_lead_to_agent(lead: lead_model.LeadModel, lead_id
     if not eligible_agents:
         logger.warning(f"No agents licensed in {lead.state} with balance found for second chance lead {lead_id}")
         return
-    agent_to_distribute: AgentModel = choose_agent(agents=eligible_agents, distribution_type="round_robin")
+    agent_to_distribute, current_lead_order = await _choose_agent_with_open_order(
+        eligible_agents, lead, distribution_type=settings.second_chance_distribution_type
+    )
     if agent_to_distribute:
         if agent_to_distribute.second_chance_lead_price_override:
             lead_price = agent_to_distribute.second_chance_lead_price_override
-        current_lead_order = await order_controller.get_oldest_open_order_by_agent_and_campaign(
-            agent_id=agent_to_distribute.id,
-            campaign_id=lead.campaign_id,
-            is_second_chance=True
-        )
         if current_lead_order:
             lead.second_chance_lead_order_id = current_lead_order.id
         if agent_to_distribute.CRM.name:
@@ -980,8 +1329,11 @@ async def assign_second_chance_lead_to_agent(lead: lead_model.LeadModel, lead_id
                         agent_crm = agent_crm(
                             integration_details=second_chance_creds
                         )
-                        agent_crm.push_lead(lead.crm_json())
-                        logger.info(f"Second chance lead {lead_id} pushed to CRM for agent {agent_to_distribute.id}")
+                        delivery = await agent_crm.push_lead(lead.crm_json())
+                        await record_crm_delivery(lead_id, delivery)
+                        logger.info(
+                            f"Second chance lead {lead_id} pushed to CRM for agent {agent_to_distribute.id}: {delivery.status}"
+                        )
         result = await lead_collection.update_one(
             {"_id": ObjectId(lead_id)},
             {"$set": {
@@ -994,6 +1346,8 @@ async def assign_second_chance_lead_to_agent(lead: lead_model.LeadModel, lead_id
             user = await user_controller.get_user_by_field(agent_id=agent_to_distribute.id)
             user_id = user.id
             if current_lead_order:
+                await order_controller.increment_completed_leads(current_lead_order.id, is_second_chance=True)
+                routing_controller.record_assignment(lead.campaign_id, agent_to_distribute.id, is_second_chance=True)
                 await order_controller.check_order_amounts_and_close(current_lead_order)
             await transaction_controller.create_transaction(
                 TransactionModel(
@@ -1006,6 +1360,9 @@ async def assign_second_chance_lead_to_agent(lead: lead_model.LeadModel, lead_id
                     campaign_id=lead.campaign_id
                 )
             )
+            await rollup_controller.record_sales(
+                lead.campaign_id, agent_to_distribute.id, 1, lead_price, is_second_chance=True
+            )
 
 
 async def todays_lead_count_by_agent(agent_id: str, campaign_id: str) -> int:
@@ -1020,6 +1377,24 @@ async def todays_lead_count_by_agent(agent_id: str, campaign_id: str) -> int:
     return await lead_collection.count_documents(query)
 
 
+async def todays_lead_counts_by_agents(agent_ids: List[ObjectId], campaign_id: str) -> Dict[ObjectId, int]:
+    if not agent_ids:
+        return {}
+    lead_collection = get_lead_collection()
+    today = datetime.combine(datetime.utcnow(), datetime.min.time())
+    tomorrow = today + timedelta(days=1)
+    pipeline = [
+        {"$match": {
+            "created_time": {"$gte": today, "$lt": tomorrow},
+            "buyer_id": {"$in": [ObjectId(agent_id) for agent_id in agent_ids]},
+            "campaign_id": ObjectId(campaign_id)
+        }},
+        {"$group": {"_id": "$buyer_id", "count": {"$sum": 1}}}
+    ]
+    counts = await lead_collection.aggregate(pipeline).to_list(None)
+    return {count["_id"]: count["count"] for count in counts}
+
+
 async def mark_leads_as_sold(lead_ids):
     lead_collection = get_lead_collection()
     await lead_background_jobs.delete_background_task_by_lead_ids(lead_ids)
@@ -1106,7 +1481,14 @@ async def check_lead_duplication_public(email: str, campaign_id_str: str) -> dic
         campaign_obj_id = ObjectId(campaign_id_str)
     except Exception:
         return {"duplicate": False}
-    
+
+    try:
+        latest_created_time = await dedup_controller.get_latest_created_time(campaign_obj_id, "email", email)
+        thirty_days_ago = datetime.utcnow() - timedelta(days=constants.PUBLIC_DUPLICATE_WINDOW_DAYS)
+        return {"duplicate": latest_created_time is not None and latest_created_time >= thirty_days_ago}
+    except dedup_controller.DedupIndexUnavailableError:
+        pass
+
     query = {
         "email": email.lower(),
         "campaign_id": campaign_obj_id
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import socket
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+from pymongo.results import InsertOneResult
+from redis.exceptions import ResponseError
+from typing import List, Set, Tuple
+
+from app.models.transaction import TransactionModel
+from app.resources import async_redis
+from settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+STREAM_KEY = "ledger:transactions"
+DEAD_LETTER_KEY = "ledger:transactions:dead"
+CONSUMER_GROUP = "ledger-flushers"
+CONSUMER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+
+FLUSH_BATCH_SIZE = 500
+CLAIM_IDLE_MS = 60 * 1000
+MAX_DELIVERIES = 5
+
+DUPLICATE_KEY_ERROR = 11000
+
+_group_ready = False
+
+
+def is_enabled(transaction: TransactionModel) -> bool:
+    return settings.ledger_enabled and async_redis is not None and transaction.type == "debit"
+
+
+async def append(transaction: TransactionModel) -> InsertOneResult:
+    """
+    Durably queues the insert of a debit transaction on the ledger stream. The caller applies the amount
+    to the balance itself, so only the transaction history lags behind by up to LEDGER_MAX_LATENCY.
+    The transaction id is assigned here, so it is known to the caller right away and lets the flusher
+    skip entries it already wrote.
+    """
+    document = transaction.model_dump(by_alias=True, exclude=["id"], mode="python")
+    document["_id"] = ObjectId()
+    await async_redis.xadd(STREAM_KEY, {"transaction": json_util.dumps(document)})
+    return InsertOneResult(document["_id"], True)
+
+
+async def _ensure_group():
+    global _group_ready
+    if _group_ready:
+        return
+    try:
+        await async_redis.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    _group_ready = True
+
+
+async def _read_entries() -> List[Tuple[bytes, dict]]:
+    """
+    Reads the entries this flusher still has pending together with new ones, so entries that keep
+    failing are retried without holding back the rest of the stream.
+    """
+    # Entries left pending by a flusher that died are taken over once they have been idle long enough
+    await async_redis.xautoclaim(STREAM_KEY, CONSUMER_GROUP, CONSUMER_NAME, CLAIM_IDLE_MS, count=FLUSH_BATCH_SIZE)
+    entries = []
+    for stream_id in ("0", ">"):
+        response = await async_redis.xreadgroup(CONSUMER_GROUP, CONSUMER_NAME, {STREAM_KEY: stream_id}, count=FLUSH_BATCH_SIZE)
+        entries += response[0][1] if response else []
+    return entries
+
+
+async def _delivery_counts(entry_ids: List[bytes]) -> List[int]:
+    async with async_redis.pipeline(transaction=False) as pipeline:
+        for entry_id in entry_ids:
+            pipeline.xpending_range(STREAM_KEY, CONSUMER_GROUP, min=entry_id, max=entry_id, count=1)
+        pending = await pipeline.execute()
+    return [entry[0]["times_delivered"] if entry else 0 for entry in pending]
+
+
+async def _acknowledge(entry_ids: List[bytes], dead_letters: List[Tuple[bytes, dict]] = ()):
+    """
+    Removes written entries from the stream, moving the ones that can never be written to the dead-letter stream.
+    """
+    async with async_redis.pipeline(transaction=False) as pipeline:
+        for entry_id, fields in dead_letters:
+            pipeline.xadd(DEAD_LETTER_KEY, {**fields, "entry_id": entry_id})
+        pipeline.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+        pipeline.xdel(STREAM_KEY, *entry_ids)
+        await pipeline.execute()
+
+
+async def _write(documents: List[dict]) -> Set[int]:
+    """
+    Inserts the transactions and returns the positions of the ones that could not be written.
+    Transactions already in the collection count as written, which makes replaying an unacknowledged batch safe.
+    """
+    from app.controllers.transaction import get_transaction_collection
+    try:
+        await get_transaction_collection().insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return {error["index"] for error in e.details.get("writeErrors", []) if error["code"] != DUPLICATE_KEY_ERROR}
+    return set()
+
+
+def _decode(entries: List[Tuple[bytes, dict]]) -> Tuple[List[Tuple[bytes, dict, dict]], List[bytes], List[Tuple[bytes, dict]]]:
+    """
+    Splits the entries into the transactions to write, the entries with nothing left to write and the ones that can not be decoded.
+    """
+    documents, empty, undecodable = [], [], []
+    for entry_id, fields in entries:
+        if not fields:
+            # Deleted from the stream while still pending, there is nothing left to write
+            empty.append(entry_id)
+            continue
+        try:
+            documents.append((entry_id, fields, json_util.loads(fields[b"transaction"])))
+        except Exception as e:
+            logger.error(f"Ledger entry {entry_id} can not be decoded: {e}")
+            undecodable.append((entry_id, fields))
+    return documents, empty, undecodable
+
+
+async def _write_entries(documents: List[Tuple[bytes, dict, dict]]) -> Tuple[List[bytes], List[Tuple[bytes, dict]]]:
+    """
+    Writes the decoded transactions and returns the ids of the entries that were written along with
+    the entries that have failed MAX_DELIVERIES times and should be dead-lettered.
+    """
+    if not documents:
+        return [], []
+    failed_indexes = await _write([document for _, _, document in documents])
+    written, failed = [], []
+    for index, (entry_id, fields, _) in enumerate(documents):
+        if index in failed_indexes:
+            failed.append((entry_id, fields))
+        else:
+            written.append(entry_id)
+    if not failed:
+        return written, []
+    deliveries = await _delivery_counts([entry_id for entry_id, _ in failed])
+    return written, [entry for entry, count in zip(failed, deliveries) if count >= MAX_DELIVERIES]
+
+
+async def flush() -> int:
+    """
+    Writes one batch of queued debit transactions and acknowledges the entries that were written.
+    Entries that cannot be decoded, or fail to insert MAX_DELIVERIES times, go to the dead-letter stream.
+    Returns the number of entries taken off the stream.
+    """
+    await _ensure_group()
+    entries = await _read_entries()
+    if not entries:
+        return 0
+
+    documents, written, dead_letters = _decode(entries)
+    written_entries, failed_entries = await _write_entries(documents)
+    written += written_entries
+    dead_letters += failed_entries
+    if written or dead_letters:
+        await _acknowledge(written + [entry_id for entry_id, _ in dead_letters], dead_letters)
+    if dead_letters:
+        logger.error(f"Moved {len(dead_letters)} ledger entries to {DEAD_LETTER_KEY}")
+    logger.info(f"Flushed {len(written)}/{len(entries)} ledger transactions")
+    return len(written) + len(dead_letters)
+
+
+async def run_flusher():
+    """
+    Flushes the ledger every LEDGER_MAX_LATENCY seconds, draining full batches back to back
+    and waiting for the next tick as soon as a pass takes less than a batch off the stream.
+    """
+    logger.info(f"Ledger flusher started with a max latency of {settings.ledger_max_latency}s")
+    while True:
+        try:
+            await asyncio.sleep(settings.ledger_max_latency)
+            while await flush() >= FLUSH_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            logger.info("Ledger flusher cancelled")
+            break
+        except Exception as e:
+            logger.error(f"Ledger flusher error: {e}")
@@ -5,24 +5,32 @@ import datetime
 
 from bson import ObjectId
 import bson.errors
-from pymongo import ReturnDocument
-from typing import List, Dict, Optional
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from typing import List, Dict, Optional, Tuple
 from motor.core import AgnosticCollection
 
 from app.background_jobs.order import schedule_order_priority_end
 from app.background_jobs.job import cancel_job
+from app.controllers import dashboard as dashboard_controller
+from app.controllers import routing as routing_controller
 from app.db import Database
 from app.models.agent import AgentModel
 from app.models.campaign import CampaignModel
 from app.models.order import OrderModel, UpdateOrderModel, OrderPriorityDetails
 from app.models.transaction import TransactionModel
 from app.models.user import UserModel
-from app.tools import emails, constants
+from app.tools import emails, constants, pagination, totals
 
 
 logger = logging.getLogger(__name__)
 
 
+INDEXES = [
+    IndexModel([("agent_id", ASCENDING), ("campaign_id", ASCENDING), ("status", ASCENDING), ("date", ASCENDING)]),
+    IndexModel([("campaign_id", ASCENDING), ("status", ASCENDING), ("date", ASCENDING)]),
+]
+
+
 def get_order_collection() -> AgnosticCollection:
     db = Database.get_db()
     return db["order"]
@@ -40,6 +48,10 @@ class OrderIdInvalidError(Exception):
     pass
 
 
+# Maintained with $inc only, so full-document $set updates must never overwrite them.
+COMPLETED_COUNTER_FIELDS = {"fresh_completed", "second_chance_completed"}
+
+
 async def create_order(order: OrderModel, user: UserModel, products: list = None, leftover_balance: float = 0):
     from app.controllers.campaign import get_one_campaign, get_campaign_agency_users
     from app.controllers.agent import get_agent_by_field, recalculate_daily_limit, update_daily_lead_limit
@@ -65,6 +77,8 @@ async def create_order(order: OrderModel, user: UserModel, products: list = None
     created_order = await order_collection.insert_one(
         order.model_dump(by_alias=True, exclude=["id"], mode="python")
     )
+    routing_controller.invalidate_campaign(order.campaign_id)
+    dashboard_controller.invalidate_metrics()
     if campaign_last_open_order_fresh or campaign_last_open_order_second_chance:
         new_limit = await recalculate_daily_limit(agent=agent, order=order)
         campaign_limit = next(
@@ -95,7 +109,7 @@ async def create_order(order: OrderModel, user: UserModel, products: list = None
     return created_order
 
 
-async def get_all_orders(page, limit, sort, filter):
+async def get_all_orders(page, limit, sort, filter, cursor=None):
     # Extract date filters first
     date_gte = None
     date_lte = None
@@ -117,15 +131,15 @@ async def get_all_orders(page, limit, sort, filter):
         if date_lte:
             filter["date"]["$lte"] = date_lte
 
+    sort = tuple(sort)
     order_collection = get_order_collection()
-    orders = await order_collection.find(filter).sort([sort]).skip((page - 1) * limit).limit(limit).to_list(limit)
+    query = pagination.apply_cursor(filter, cursor, sort)
+    skip = 0 if cursor else (page - 1) * limit
+    orders = await order_collection.find(query).sort(pagination.sort_with_tiebreaker(sort)).skip(skip).limit(limit).to_list(limit)
 
-    if filter:
-        total = await order_collection.count_documents(filter)
-    else:
-        total = await order_collection.count_documents({})
+    total = await totals.count_documents(order_collection, filter)
 
-    return orders, total
+    return orders, total, pagination.next_cursor(orders, limit, sort)
 
 
 async def get_one_order(id):
@@ -142,7 +156,10 @@ async def get_one_order(id):
 async def update_order(id, order: UpdateOrderModel):
     order_collection = get_order_collection()
     try:
-        order = {k: v for k, v in order.model_dump(by_alias=True, mode="python").items() if v is not None}
+        order = {
+            k: v for k, v in order.model_dump(by_alias=True, mode="python", exclude=COMPLETED_COUNTER_FIELDS).items()
+            if v is not None
+        }
 
         if len(order) >= 1:
             update_result = await order_collection.find_one_and_update(
@@ -152,6 +169,8 @@ async def update_order(id, order: UpdateOrderModel):
             )
 
             if update_result is not None:
+                routing_controller.invalidate_campaign(update_result["campaign_id"])
+                dashboard_controller.invalidate_metrics()
                 return update_result
 
             else:
@@ -167,6 +186,8 @@ async def delete_order(id):
     order_collection = get_order_collection()
     try:
         result = await order_collection.delete_one({"_id": ObjectId(id)})
+        routing_controller.invalidate_campaign()
+        dashboard_controller.invalidate_metrics()
         return result
     except bson.errors.InvalidId:
         raise OrderIdInvalidError(f"Invalid id {id} on delete order route.")
@@ -187,81 +208,22 @@ async def get_oldest_open_order_by_agent_and_campaign(
     is_second_chance: bool = False
 ) -> Optional[OrderModel]:
     order_collection = get_order_collection()
+    if is_second_chance:
+        completed_field, amount_field = "second_chance_completed", "second_chance_lead_amount"
+    else:
+        completed_field, amount_field = "fresh_completed", "fresh_lead_amount"
 
-    pipeline = [
-        {
-            "$match": {
-                "agent_id": ObjectId(agent_id),
-                "campaign_id": ObjectId(campaign_id),
-                "status": "open"
-            }
-        },
-        # Lookup for how many fresh leads are associated with each order
-        {
-            "$lookup": {
-                "from": "lead",
-                "let": {"order_id": "$_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": ["$lead_order_id", "$$order_id"]
-                            }
-                        }
-                    },
-                    {"$count": "fresh_count"}
-                ],
-                "as": "fresh_leads"
-            }
-        },
-        # Lookup for how many second-chance leads are associated with each order
-        {
-            "$lookup": {
-                "from": "lead",
-                "let": {"order_id": "$_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": ["$second_chance_lead_order_id", "$$order_id"]
-                            }
-                        }
-                    },
-                    {"$count": "second_chance_count"}
-                ],
-                "as": "second_chance_leads"
-            }
-        },
-        {
-            "$addFields": {
-                "fresh_completed": {
-                    "$ifNull": [{"$first": "$fresh_leads.fresh_count"}, 0]
-                },
-                "second_completed": {
-                    "$ifNull": [{"$first": "$second_chance_leads.second_chance_count"}, 0]
-                }
-            }
-        },
+    order_in_db = await order_collection.find_one(
         {
+            "agent_id": ObjectId(agent_id),
+            "campaign_id": ObjectId(campaign_id),
+            "status": "open",
             # Only keep orders that haven't fulfilled their needed leads
-            "$match": {
-                "$expr": {
-                    "$cond": {
-                        "if": {"$eq": [is_second_chance, True]},
-                        "then": {"$lt": ["$second_completed", "$second_chance_lead_amount"]},
-                        "else": {"$lt": ["$fresh_completed", "$fresh_lead_amount"]}
-                    }
-                }
-            }
+            "$expr": {"$lt": [{"$ifNull": [f"${completed_field}", 0]}, f"${amount_field}"]}
         },
-        # Sort by date ascending
-        {"$sort": {"date": 1}},
-        # Limit to the oldest single match
-        {"$limit": 1}
-    ]
-
-    docs = await order_collection.aggregate(pipeline).to_list(None)
-    return OrderModel(**docs[0]) if docs else None
+        sort=[("date", 1)]
+    )
+    return OrderModel(**order_in_db) if order_in_db else None
 
 
 async def get_most_recent_closed_order_by_agent_and_campaign(agent_id: str, campaign_id: str):
@@ -287,6 +249,86 @@ async def get_second_chance_lead_count(order_id: str):
     return lead_count
 
 
+async def get_completed_lead_counts(order_ids: List[ObjectId]) -> Dict[ObjectId, Tuple[int, int]]:
+    """
+    Counts the fresh and second chance leads of a set of orders in a single aggregation.
+    Returns (fresh, second chance) by order id; orders without leads are left out.
+    Order listings use it for exact numbers and reconcile_completed_leads to correct the counters.
+    """
+    from app.controllers.lead import get_lead_collection
+    order_ids = [ObjectId(order_id) for order_id in order_ids if order_id]
+    if not order_ids:
+        return {}
+    pipeline = [
+        {"$match": {"$or": [
+            {"lead_order_id": {"$in": order_ids}},
+            {"second_chance_lead_order_id": {"$in": order_ids}}
+        ]}},
+        {"$facet": {
+            "fresh": [
+                {"$match": {"lead_order_id": {"$in": order_ids}}},
+                {"$group": {"_id": "$lead_order_id", "count": {"$sum": 1}}}
+            ],
+            "second_chance": [
+                {"$match": {"second_chance_lead_order_id": {"$in": order_ids}}},
+                {"$group": {"_id": "$second_chance_lead_order_id", "count": {"$sum": 1}}}
+            ]
+        }}
+    ]
+    result = await get_lead_collection().aggregate(pipeline).to_list(None)
+    result = result[0] if result else {"fresh": [], "second_chance": []}
+    fresh = {group["_id"]: group["count"] for group in result["fresh"]}
+    second_chance = {group["_id"]: group["count"] for group in result["second_chance"]}
+    return {
+        order_id: (fresh.get(order_id, 0), second_chance.get(order_id, 0))
+        for order_id in set(fresh) | set(second_chance)
+    }
+
+
+async def increment_completed_leads(order_id, amount: int = 1, is_second_chance: bool = False):
+    """
+    Adds amount to the order's fresh or second chance completed counter, or takes it off when it is negative.
+    """
+    if not order_id or not amount:
+        return
+    order_collection = get_order_collection()
+    counter_field = "second_chance_completed" if is_second_chance else "fresh_completed"
+    await order_collection.update_one(
+        {"_id": ObjectId(order_id)},
+        {"$inc": {counter_field: amount}}
+    )
+
+
+async def reconcile_completed_leads(order_ids: Optional[List[ObjectId]] = None) -> int:
+    """
+    Recomputes the completed lead counters from the lead collection and fixes any drift.
+    Defaults to every open order when no ids are given. Returns the number of orders corrected.
+    """
+    order_collection = get_order_collection()
+    order_filter = {"_id": {"$in": [ObjectId(id) for id in order_ids]}} if order_ids else {"status": "open"}
+    orders_in_db = await order_collection.find(
+        order_filter,
+        {"fresh_completed": 1, "second_chance_completed": 1}
+    ).to_list(None)
+    if not orders_in_db:
+        return 0
+    completed_counts = await get_completed_lead_counts([order["_id"] for order in orders_in_db])
+
+    updates = []
+    for order in orders_in_db:
+        fresh_completed, second_chance_completed = completed_counts.get(order["_id"], (0, 0))
+        if order.get("fresh_completed") != fresh_completed or order.get("second_chance_completed") != second_chance_completed:
+            updates.append(UpdateOne(
+                {"_id": order["_id"]},
+                {"$set": {"fresh_completed": fresh_completed, "second_chance_completed": second_chance_completed}}
+            ))
+
+    if updates:
+        await order_collection.bulk_write(updates, ordered=False)
+        logger.info(f"Reconciled completed lead counters on {len(updates)} orders")
+    return len(updates)
+
+
 def determine_distribution_type(order: OrderModel, agent: AgentModel) -> str:
     """Determine distribution type based on order type and lead amounts."""
     if order.type == "one_time":
@@ -377,19 +419,36 @@ def calculate_extra_leads_for_leftover_balance(
     return fresh_leads, second_chance_leads
 
 
-async def check_order_amounts_and_close(order: OrderModel):
-    if await order.fresh_lead_completed >= order.fresh_lead_amount and await order.second_chance_lead_completed >= order.second_chance_lead_amount:
-        order.status = "closed"
-        order.completed_date = datetime.datetime.utcnow()
-        if order.priority.active:
-            orders_after_cancel_prioritization = await cancel_orders_prioritization([order.id])
-            order_not_prioritized = orders_after_cancel_prioritization[0]
-            order.priority = order_not_prioritized.priority
-            await update_order(str(order.id), order)
-        else:
-            await update_order(str(order.id), order)
-    else:
-        await update_order(str(order.id), order)
+async def check_order_amounts_and_close(order: OrderModel) -> bool:
+    """
+    Closes the order in a single conditional write once its completed counters reach the ordered amounts.
+    Returns whether this call closed it; prioritization is only cancelled then.
+    """
+    order_collection = get_order_collection()
+    completed_date = datetime.datetime.utcnow()
+    closed_order = await order_collection.find_one_and_update(
+        {
+            "_id": ObjectId(order.id),
+            "status": "open",
+            "$expr": {"$and": [
+                {"$gte": [{"$ifNull": ["$fresh_completed", 0]}, "$fresh_lead_amount"]},
+                {"$gte": [{"$ifNull": ["$second_chance_completed", 0]}, "$second_chance_lead_amount"]}
+            ]}
+        },
+        {"$set": {"status": "closed", "completed_date": completed_date}},
+        projection={"campaign_id": 1, "priority.active": 1}
+    )
+    if closed_order is None:
+        return False
+    order.status = "closed"
+    order.completed_date = completed_date
+    routing_controller.invalidate_campaign(closed_order["campaign_id"])
+    dashboard_controller.invalidate_metrics()
+    if closed_order.get("priority", {}).get("active"):
+        orders_after_cancel_prioritization = await cancel_orders_prioritization([order.id])
+        order.priority = orders_after_cancel_prioritization[0].priority
+    logger.info(f"Order {order.id} closed")
+    return True
 
 
 async def get_order_metrics(campaigns: List[bson.ObjectId]) -> Dict[str, int]:
@@ -403,59 +462,15 @@ async def get_order_metrics(campaigns: List[bson.ObjectId]) -> Dict[str, int]:
                 "status": "open"
             }
         },
-        {
-            "$lookup": {
-                "from": "lead",
-                "let": {"order_id": "$_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": ["$lead_order_id", "$$order_id"]
-                            }
-                        }
-                    },
-                    {"$count": "fresh_count"}
-                ],
-                "as": "fresh_leads"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "lead",
-                "let": {"order_id": "$_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": ["$second_chance_lead_order_id", "$$order_id"]
-                            }
-                        }
-                    },
-                    {"$count": "second_chance_count"}
-                ],
-                "as": "second_chance_leads"
-            }
-        },
         {
             "$group": {
                 "_id": None,
                 "total_open_orders": {"$sum": 1},
                 "fresh_leads_remaining": {
-                    "$sum": {
-                        "$subtract": [
-                            "$fresh_lead_amount",
-                            {"$ifNull": [{"$first": "$fresh_leads.fresh_count"}, 0]}
-                        ]
-                    }
+                    "$sum": {"$subtract": ["$fresh_lead_amount", {"$ifNull": ["$fresh_completed", 0]}]}
                 },
                 "second_chance_leads_remaining": {
-                    "$sum": {
-                        "$subtract": [
-                            "$second_chance_lead_amount",
-                            {"$ifNull": [{"$first": "$second_chance_leads.second_chance_count"}, 0]}
-                        ]
-                    }
+                    "$sum": {"$subtract": ["$second_chance_lead_amount", {"$ifNull": ["$second_chance_completed", 0]}]}
                 }
             }
         }
@@ -582,12 +597,15 @@ async def reallocate_credit(
     old_order.fresh_lead_amount = max(0, old_order.fresh_lead_amount)
     old_order.second_chance_lead_amount = max(0, old_order.second_chance_lead_amount)
 
-    order = await check_order_amounts_and_close(old_order)
+    await update_order(str(old_order.id), old_order)
+    await check_order_amounts_and_close(old_order)
 
     order_collection = get_order_collection()
     created_order = await order_collection.insert_one(
         new_order.model_dump(by_alias=True, exclude=["id"], mode="python")
     )
+    routing_controller.invalidate_campaign(new_order.campaign_id)
+    dashboard_controller.invalidate_metrics()
     new_campaign_transaction = await create_transaction(
         TransactionModel(
             user_id=user.id,
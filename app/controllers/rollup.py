@@ -0,0 +1,237 @@
+import logging
+
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, IndexModel, ReplaceOne
+from motor.core import AgnosticCollection
+from typing import Any, Dict, List, Optional
+
+from app.db import Database
+
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES = [
+    IndexModel([("date", ASCENDING), ("campaign_id", ASCENDING), ("agent_id", ASCENDING)], unique=True),
+]
+
+METRICS = ("leads_created", "fresh_sold", "second_chance_sold", "revenue", "refunds")
+
+DASHBOARD_METRICS = {
+    "created": "leads_created",
+    "fresh_sold": "fresh_sold",
+    "second_chance_sold": "second_chance_sold",
+}
+
+DASHBOARD_PERIODS = ["thisWeek", "lastWeek", "thisMonth", "lastMonth"]
+
+REBUILD_DAYS = 3
+
+
+def get_rollup_collection() -> AgnosticCollection:
+    db = Database.get_db()
+    return db["daily_rollup"]
+
+
+def to_day(value: datetime) -> datetime:
+    """
+    Returns the UTC day a datetime falls in, as a naive midnight datetime like the rest of the stored dates.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime.combine(value.date(), datetime.min.time())
+
+
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def _day_expression(date_field: str) -> Dict[str, Any]:
+    return {"$dateToString": {"format": DAY_FORMAT, "date": f"${date_field}"}}
+
+
+async def _increment(campaign_id, agent_id, increments: Dict[str, float], day: Optional[datetime] = None):
+    """
+    Adds to the counters of one rollup row, creating it on its first write of the day.
+    Errors are only logged; the scheduled rebuild corrects any increment that was lost.
+    """
+    increments = {metric: value for metric, value in increments.items() if value}
+    if not campaign_id or not increments:
+        return
+    try:
+        await get_rollup_collection().update_one(
+            {"date": to_day(day or datetime.utcnow()), "campaign_id": ObjectId(campaign_id), "agent_id": agent_id},
+            {"$inc": increments},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Error updating rollup of campaign {campaign_id} and agent {agent_id} with {increments}: {e}")
+
+
+async def record_leads_created(leads: list):
+    counts = {}
+    for lead in leads:
+        key = (to_day(lead.created_time), lead.campaign_id)
+        counts[key] = counts.get(key, 0) + 1
+    for (day, campaign_id), count in counts.items():
+        await _increment(campaign_id, None, {"leads_created": count}, day=day)
+
+
+async def record_sales(campaign_id, agent_id, amount: int, revenue: float, is_second_chance: bool = False):
+    """
+    Counts leads sold to an agent and the revenue of their lead sale debit, so every caller passes
+    the number of leads it actually assigned and charged for.
+    """
+    counter = "second_chance_sold" if is_second_chance else "fresh_sold"
+    await _increment(campaign_id, agent_id, {counter: amount, "revenue": revenue})
+
+
+async def record_refund(campaign_id, agent_id, amount: float):
+    await _increment(campaign_id, agent_id, {"refunds": amount})
+
+
+def _rollup_key(row: Dict[str, Any]) -> tuple:
+    return datetime.strptime(row["_id"]["date"], DAY_FORMAT), row["_id"]["campaign_id"], row["_id"].get("agent_id")
+
+
+async def _aggregate_leads(start: datetime, end: datetime) -> List[tuple]:
+    from app.controllers.lead import DateField, get_lead_collection
+    lead_collection = get_lead_collection()
+    # A sale is counted on the day it happened, like record_sales does, even if the lead is later flagged second chance
+    sources = [
+        ("leads_created", DateField.CREATED.value, None),
+        ("fresh_sold", DateField.SOLD.value, "buyer_id"),
+        ("second_chance_sold", DateField.SECOND_CHANCE_SOLD.value, "second_chance_buyer_id"),
+    ]
+    rows = []
+    for metric, date_field, agent_field in sources:
+        match = {date_field: {"$gte": start, "$lt": end}}
+        group_id = {"date": _day_expression(date_field), "campaign_id": "$campaign_id"}
+        if agent_field:
+            match[agent_field] = {"$ne": None}
+            group_id["agent_id"] = f"${agent_field}"
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": group_id, "value": {"$sum": 1}}}
+        ]
+        async for row in lead_collection.aggregate(pipeline):
+            rows.append((_rollup_key(row), metric, row["value"]))
+    return rows
+
+
+async def _aggregate_transactions(start: datetime, end: datetime) -> List[tuple]:
+    from app.controllers.transaction import get_transaction_collection
+    pipeline = [
+        {"$match": {
+            "date": {"$gte": start, "$lt": end},
+            "campaign_id": {"$ne": None},
+            # Only lead sale debits carry a lead_id, manual adjustments are not revenue
+            "$or": [{"type": "debit", "lead_id": {"$ne": None}}, {"type": "credit", "notes": "Refund"}]
+        }},
+        {"$group": {
+            "_id": {"date": _day_expression("date"), "campaign_id": "$campaign_id", "user_id": "$user_id"},
+            "revenue": {"$sum": {"$cond": [{"$eq": ["$type", "debit"]}, {"$multiply": ["$amount", -1]}, 0]}},
+            "refunds": {"$sum": {"$cond": [{"$eq": ["$type", "credit"]}, "$amount", 0]}}
+        }},
+        {"$lookup": {"from": "user", "localField": "_id.user_id", "foreignField": "_id", "as": "user"}},
+        {"$set": {"_id.agent_id": {"$arrayElemAt": ["$user.agent_id", 0]}}}
+    ]
+    rows = []
+    async for row in get_transaction_collection().aggregate(pipeline):
+        for metric in ("revenue", "refunds"):
+            rows.append((_rollup_key(row), metric, row[metric]))
+    return rows
+
+
+async def rebuild_rollups(start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+    """
+    Recomputes the rollup rows of the days in [start, end) from the lead and transaction collections.
+    Defaults to the last REBUILD_DAYS closed days, leaving today to the incremental updates.
+    Returns the number of rows written.
+    """
+    end = to_day(end or datetime.utcnow())
+    start = to_day(start or end - timedelta(days=REBUILD_DAYS))
+    rollups = {}
+    for key, metric, value in await _aggregate_leads(start, end) + await _aggregate_transactions(start, end):
+        rollup = rollups.setdefault(key, {metric: 0 for metric in METRICS})
+        rollup[metric] += value
+
+    rollup_collection = get_rollup_collection()
+    operations = [
+        ReplaceOne(
+            {"date": day, "campaign_id": campaign_id, "agent_id": agent_id},
+            {"date": day, "campaign_id": campaign_id, "agent_id": agent_id, **metrics},
+            upsert=True
+        )
+        for (day, campaign_id, agent_id), metrics in rollups.items()
+    ]
+    if operations:
+        await rollup_collection.bulk_write(operations, ordered=False)
+    stale_rows = {"date": {"$gte": start, "$lt": end}}
+    if rollups:
+        stale_rows["$nor"] = [
+            {"date": day, "campaign_id": campaign_id, "agent_id": agent_id}
+            for day, campaign_id, agent_id in rollups
+        ]
+    await rollup_collection.delete_many(stale_rows)
+    logger.info(f"Rebuilt {len(operations)} rollup rows from {start} to {end}")
+    return len(operations)
+
+
+async def get_history_start() -> Optional[datetime]:
+    """
+    Returns the creation time of the oldest lead, where the rollup history starts.
+    """
+    from app.controllers.lead import get_lead_collection
+    oldest_lead = await get_lead_collection().find_one(
+        {"created_time": {"$ne": None}}, {"created_time": 1}, sort=[("created_time", ASCENDING)]
+    )
+    return oldest_lead["created_time"] if oldest_lead else None
+
+
+async def backfill_rollups() -> int:
+    """
+    Builds the whole rollup history, up to and including today, when there are no rollups yet.
+    The dashboard only reads rollups, so without this it would show zeros before the first rows are built.
+    Returns the number of rows written.
+    """
+    if await get_rollup_collection().find_one({}, {"_id": 1}) is not None:
+        return 0
+    start = await get_history_start()
+    if start is None:
+        return 0
+    logger.info(f"No rollups found, backfilling them from {start}")
+    return await rebuild_rollups(start, to_day(datetime.utcnow()) + timedelta(days=1))
+
+
+async def get_lead_counts(date_ranges: Dict[str, Any], campaigns: List[ObjectId]) -> Dict[str, Dict[str, int]]:
+    """
+    Sums the daily rollups of every requested dashboard period in a single aggregation.
+    """
+    periods = [period for period in DASHBOARD_PERIODS if period in (date_ranges or {})]
+    result = {metric: {} for metric in DASHBOARD_METRICS}
+    if not periods:
+        return result
+
+    days = {
+        period: (to_day(date_ranges[period]["start"]), to_day(date_ranges[period]["end"]))
+        for period in periods
+    }
+    match = {"date": {
+        "$gte": min(start for start, _ in days.values()),
+        "$lte": max(end for _, end in days.values())
+    }}
+    if campaigns:
+        match["campaign_id"] = {"$in": campaigns}
+    group = {"_id": None}
+    for metric, field in DASHBOARD_METRICS.items():
+        for period, (start, end) in days.items():
+            in_period = {"$and": [{"$gte": ["$date", start]}, {"$lte": ["$date", end]}]}
+            group[f"{metric}:{period}"] = {"$sum": {"$cond": [in_period, f"${field}", 0]}}
+    totals = await get_rollup_collection().aggregate([{"$match": match}, {"$group": group}]).to_list(None)
+    totals = totals[0] if totals else {}
+
+    for metric in DASHBOARD_METRICS:
+        for period in periods:
+            result[metric][period] = int(totals.get(f"{metric}:{period}", 0))
+    return result
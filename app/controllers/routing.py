@@ -0,0 +1,179 @@
+import datetime
+import logging
+
+from bson import ObjectId
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+from app.models.agent import AgentModel
+from app.models.lead import LeadModel
+from app.tools import constants
+from app.tools import formatters as formatter
+from app.tools.cache import SharedCache
+
+
+logger = logging.getLogger(__name__)
+
+
+AGENT_ROUTING_PROJECTION = {
+    "first_name": 1,
+    "last_name": 1,
+    "email": 1,
+    "phone": 1,
+    "states_with_license": 1,
+    "CRM": 1,
+    "campaigns": 1,
+    "daily_lead_limit": 1,
+    "lead_price_override": 1,
+    "second_chance_lead_price_override": 1,
+}
+
+ORDER_ROUTING_PROJECTION = {
+    "agent_id": 1,
+    "date": 1,
+    "fresh_lead_amount": 1,
+    "second_chance_lead_amount": 1,
+    "fresh_completed": 1,
+    "second_chance_completed": 1,
+    "priority.active": 1,
+}
+
+routing_index_cache = SharedCache("routing_index", maxsize=256, ttl=constants.ROUTING_INDEX_TTL)
+
+
+class RoutingEntry(BaseModel):
+    """
+    An agent with open orders in a campaign, the lead capacity left across those orders
+    and how many of them can still take a fresh or second chance lead, or are prioritized.
+    """
+    agent: AgentModel
+    oldest_order_date: datetime.datetime
+    fresh_remaining: int = Field(default=0)
+    second_chance_remaining: int = Field(default=0)
+    fresh_orders: int = Field(default=0)
+    second_chance_orders: int = Field(default=0)
+    prioritized_orders: int = Field(default=0)
+
+    def remaining(self, is_second_chance: bool) -> int:
+        return self.second_chance_remaining if is_second_chance else self.fresh_remaining
+
+    def open_orders(self, is_second_chance: bool, prioritized_only: bool = False) -> int:
+        if prioritized_only:
+            return self.prioritized_orders
+        return self.second_chance_orders if is_second_chance else self.fresh_orders
+
+
+class CampaignRoutingIndex(BaseModel):
+    """
+    Agents with open, unfilled orders in a campaign, grouped by licensed state and sorted by oldest open order.
+    """
+    campaign_id: ObjectId
+    entries: Dict[str, RoutingEntry] = Field(default_factory=dict)
+    agents_by_state: Dict[str, List[str]] = Field(default_factory=dict)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def candidates(self, state: str, is_second_chance: bool, prioritized_only: bool = False) -> List[RoutingEntry]:
+        entries = (self.entries[agent_id] for agent_id in self.agents_by_state.get(state, []))
+        return [
+            entry for entry in entries
+            if entry.remaining(is_second_chance) > 0 and (entry.prioritized_orders or not prioritized_only)
+        ]
+
+    def weighted_candidates(self, state: str, is_second_chance: bool, prioritized_only: bool = False) -> List[AgentModel]:
+        """
+        Lists each candidate agent once per matching open order, so agents with more open orders
+        are proportionally more likely to be picked.
+        """
+        return [
+            entry.agent
+            for entry in self.candidates(state, is_second_chance, prioritized_only)
+            for _ in range(max(entry.open_orders(is_second_chance, prioritized_only), 1))
+        ]
+
+
+async def build_campaign_index(campaign_id: ObjectId) -> CampaignRoutingIndex:
+    from app.controllers.agent import get_agent_collection
+    from app.controllers.order import get_order_collection
+    campaign_id = ObjectId(campaign_id)
+    orders_in_db = await get_order_collection().find(
+        {"campaign_id": campaign_id, "status": "open"},
+        ORDER_ROUTING_PROJECTION
+    ).sort([("date", 1)]).to_list(None)
+
+    capacity = {}
+    for order in orders_in_db:
+        agent_capacity = capacity.setdefault(order["agent_id"], {
+            "oldest_order_date": order["date"],
+            "fresh_remaining": 0,
+            "second_chance_remaining": 0,
+            "fresh_orders": 0,
+            "second_chance_orders": 0,
+            "prioritized_orders": 0
+        })
+        fresh_remaining = max(0, order.get("fresh_lead_amount", 0) - order.get("fresh_completed", 0))
+        second_chance_remaining = max(0, order.get("second_chance_lead_amount", 0) - order.get("second_chance_completed", 0))
+        agent_capacity["fresh_remaining"] += fresh_remaining
+        agent_capacity["second_chance_remaining"] += second_chance_remaining
+        agent_capacity["fresh_orders"] += 1 if fresh_remaining else 0
+        agent_capacity["second_chance_orders"] += 1 if second_chance_remaining else 0
+        agent_capacity["prioritized_orders"] += 1 if order.get("priority", {}).get("active", False) else 0
+
+    index = CampaignRoutingIndex(campaign_id=campaign_id)
+    if not capacity:
+        return index
+
+    agents_in_db = await get_agent_collection().find(
+        {"_id": {"$in": list(capacity.keys())}, "campaigns": campaign_id},
+        AGENT_ROUTING_PROJECTION
+    ).to_list(None)
+    agents = sorted(
+        (AgentModel(**agent) for agent in agents_in_db),
+        key=lambda agent: capacity[agent.id]["oldest_order_date"]
+    )
+    for agent in agents:
+        index.entries[str(agent.id)] = RoutingEntry(agent=agent, **capacity[agent.id])
+        for state in agent.states_with_license:
+            index.agents_by_state.setdefault(state, []).append(str(agent.id))
+    logger.info(f"Built routing index for campaign {campaign_id} with {len(index.entries)} agents")
+    return index
+
+
+async def get_campaign_index(campaign_id: ObjectId) -> CampaignRoutingIndex:
+    return await routing_index_cache.get_or_load(str(campaign_id), lambda: build_campaign_index(campaign_id))
+
+
+async def get_agents_with_open_orders(campaign_id: ObjectId, lead: LeadModel) -> List[AgentModel]:
+    index = await get_campaign_index(campaign_id)
+    state = formatter.format_state_to_abbreviation(lead.state)
+    return index.weighted_candidates(state, lead.is_second_chance)
+
+
+async def get_agents_with_prioritized_orders(campaign_id: ObjectId, lead: LeadModel) -> List[AgentModel]:
+    index = await get_campaign_index(campaign_id)
+    state = formatter.format_state_to_abbreviation(lead.state)
+    return index.weighted_candidates(state, lead.is_second_chance, prioritized_only=True)
+
+
+def record_assignment(campaign_id: ObjectId, agent_id: ObjectId, amount: int = 1, is_second_chance: bool = False):
+    """
+    Takes assigned leads off the agent's remaining capacity in this process' index.
+    Other processes only need to hear about it once the agent runs out of capacity.
+    """
+    index = routing_index_cache.peek(str(campaign_id))
+    entry = index.entries.get(str(agent_id)) if index else None
+    if entry is None:
+        return
+    if is_second_chance:
+        entry.second_chance_remaining -= amount
+    else:
+        entry.fresh_remaining -= amount
+    if entry.remaining(is_second_chance) <= 0:
+        invalidate_campaign(campaign_id)
+
+
+def invalidate_campaign(campaign_id: Optional[ObjectId] = None):
+    """
+    Drops the routing index of a campaign, or of every campaign when no id is given.
+    """
+    routing_index_cache.invalidate(str(campaign_id) if campaign_id else None)
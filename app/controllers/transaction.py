@@ -1,14 +1,25 @@
 import bson
 import bson.errors
+import logging
 
 from bson import ObjectId
-from pymongo import ReturnDocument
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
 from motor.core import AgnosticCollection
+from redis.exceptions import RedisError
 
 from app.db import Database
 from app.models.transaction import TransactionModel, UpdateTransactionModel
 
 import app.controllers.user as user_controller
+from app.controllers import ledger as ledger_controller
+
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES = [
+    IndexModel([("user_id", ASCENDING), ("date", DESCENDING)]),
+]
 
 
 def get_transaction_collection() -> AgnosticCollection:
@@ -26,6 +37,16 @@ class TransactionIdInvalidError(Exception):
 
 async def create_transaction(transaction: TransactionModel):
     transaction_collection = get_transaction_collection()
+    if ledger_controller.is_enabled(transaction):
+        # The balance is always charged right away so the next purchase sees it, only the history insert is deferred
+        await user_controller.update_user_balance(transaction.user_id, transaction.campaign_id, transaction.amount)
+        try:
+            return await ledger_controller.append(transaction)
+        except RedisError as e:
+            logger.error(f"Error queueing transaction on the ledger, writing it directly: {e}")
+            return await transaction_collection.insert_one(
+                transaction.model_dump(by_alias=True, exclude=["id"], mode="python")
+            )
     created_transaction = await transaction_collection.insert_one(
         transaction.model_dump(by_alias=True, exclude=["id"], mode="python")
     )
@@ -7,6 +7,8 @@ import logging
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBasicCredentials, HTTPBasic
 from motor.core import AgnosticCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import OperationFailure
 
 
 
@@ -14,9 +16,10 @@ from app.auth import jwt_handler
 from app.db import Database
 from app.models.order import OrderModel
 from app.models.transaction import TransactionModel
-from app.resources import user_connections
 from app.controllers import agent as agent_controller
+from app.controllers import balance_stream
 from app.controllers import campaign as campaign_controller
+from app.controllers import rollup as rollup_controller
 from app.integrations import stripe as stripe_controller
 from app.models.agent import AgentModel, RingyFreshIntegration, RingySecondChanceIntegration, GoHighLevelIntegration
 from app.models.campaign import CampaignModel
@@ -29,6 +32,12 @@ from app.tools.constants import OTP_EXPIRATION
 logger = logging.getLogger(__name__)
 
 
+INDEXES = [
+    IndexModel([("email", ASCENDING)]),
+    IndexModel([("agent_id", ASCENDING)]),
+]
+
+
 def get_user_collection() -> AgnosticCollection:
     db = Database.get_db()
     return db["user"]
@@ -165,69 +174,126 @@ async def activate_user(email):
     return user
 
 
-async def update_user_balance(user_id, campaign_id, amount):
+async def update_user_balance(user_id, campaign_id, amount) -> float:
+    """
+    Atomically adds amount to the user's balance for the campaign and returns the updated balance.
+    The campaign's first balance entry is incremented in place, or pushed if the user has no balance
+    for it yet, so concurrent transactions never overwrite each other.
+    """
     user_collection = get_user_collection()
-    user = await user_collection.find_one({"_id": bson.ObjectId(user_id)})
-    if not user:
-        raise UserNotFoundError(f"User with id {user_id} not found")
-    balance = user.get("balance", [])
-    transaction_campaign = None
-    for campaign in balance:
-        if campaign["campaign_id"] == campaign_id:
-            campaign["balance"] += amount
-            transaction_campaign = campaign
+    user_id = bson.ObjectId(user_id)
+    balance_projection = {"name": 1, "balance": {"$elemMatch": {"campaign_id": campaign_id}}}
+    user = None
+    for _ in range(2):
+        user = await user_collection.find_one_and_update(
+            {"_id": user_id, "balance.campaign_id": campaign_id},
+            {"$inc": {"balance.$.balance": amount}},
+            projection=balance_projection,
+            return_document=ReturnDocument.AFTER
+        )
+        if user:
+            break
+        user = await user_collection.find_one_and_update(
+            {"_id": user_id, "balance.campaign_id": {"$ne": campaign_id}},
+            {"$push": {"balance": {"campaign_id": campaign_id, "balance": amount}}},
+            projection=balance_projection,
+            return_document=ReturnDocument.AFTER
+        )
+        if user:
             break
-    if not transaction_campaign:
-        new_campaign = {"campaign_id": campaign_id, "balance": amount}
-        balance.append(new_campaign)
-        transaction_campaign = new_campaign
-    if transaction_campaign["balance"] < 0:
+        # Either the user does not exist or a concurrent transaction just pushed the campaign entry
+        if not await user_collection.count_documents({"_id": user_id}, limit=1):
+            raise UserNotFoundError(f"User with id {user_id} not found")
+    if not user:
+        raise UserNotFoundError(f"Could not update balance of user {user_id} for campaign {campaign_id}")
+    new_balance = user["balance"][0]["balance"]
+    if new_balance < 0:
         admin_emails = await get_users_by_field(permissions=["admin"])
         emails.send_negative_balance_email(
             emails=[user.email for user in admin_emails],
             user_name=user["name"],
-            amount=transaction_campaign["balance"]
+            amount=new_balance
         )
-    await user_collection.update_one({"_id": bson.ObjectId(user_id)}, {"$set": {"balance": balance}})
+    return new_balance
 
 
 async def user_change_stream_listener():
+    """
+    Runs the balance change stream on the one API process holding the leader lock and publishes every
+    balance change to all processes. The other processes keep retrying the lock so one of them takes over
+    within LEADER_TTL seconds if the leader goes away.
+    """
+    failures = 0
+    while True:
+        started = asyncio.get_running_loop().time()
+        try:
+            if not await balance_stream.acquire_leadership():
+                await asyncio.sleep(balance_stream.LEADER_RENEW_INTERVAL)
+                continue
+            logger.info("Acquired the balance change stream lock")
+            consumer = asyncio.create_task(_publish_balance_changes())
+            leadership = asyncio.create_task(balance_stream.keep_leadership())
+            try:
+                done, _ = await asyncio.wait({consumer, leadership}, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+                failures = 0
+            finally:
+                consumer.cancel()
+                leadership.cancel()
+                await balance_stream.release_leadership()
+        except asyncio.CancelledError:
+            logger.info("Change stream listener cancelled")
+            break
+        except Exception as e:
+            # A stream that ran for a while before failing starts the backoff over
+            if asyncio.get_running_loop().time() - started > balance_stream.MAX_BACKOFF:
+                failures = 0
+            delay = balance_stream.backoff_delay(failures)
+            failures += 1
+            logger.error(f"Change stream listener error: {e}. Reconnecting in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+async def _publish_balance_changes():
     user_collection = get_user_collection()
+    # Balance updates are in-place $inc/$push on array entries, so updatedFields only holds
+    # keys like "balance.2.balance"; match on the key prefix and read the whole array from fullDocument.
     pipeline = [
         {
             '$match': {
                 'operationType': 'update',
-                'updateDescription.updatedFields.balance': {'$exists': True}
+                '$expr': {
+                    '$gt': [
+                        {'$size': {'$filter': {
+                            'input': {'$objectToArray': '$updateDescription.updatedFields'},
+                            'cond': {'$regexMatch': {'input': '$$this.k', 'regex': '^balance(\\.|$)'}}
+                        }}},
+                        0
+                    ]
+                }
             }
-        }
+        },
+        {'$project': {'documentKey': 1, 'fullDocument.balance': 1}}
     ]
-    while True:
-        try:
-            async with user_collection.watch(pipeline) as stream:
-                logger.info("Change stream listener started")
-                async for change in stream:
-                    user_id = str(change['documentKey']['_id'])
-                    updated_fields = change['updateDescription']['updatedFields']
-                    balance = updated_fields.get('balance')
-                    if balance is not None:
-                        for campaign in balance:
-                            campaign['campaign_id'] = str(campaign['campaign_id'])
-                        data = {'balance': balance}
-                        if user_id in user_connections:
-                            logger.info(f"Sending data to user {user_id}: {data}")
-                            for client in user_connections[user_id][:]:
-                                try:
-                                    await client.send_json(data)
-                                except Exception as e:
-                                    logger.error(f"Error sending data to client {client}: {e}")
-                                    user_connections[user_id].remove(client)
-                                    logger.info(f"Removed client {client} from user_connections[{user_id}]")
-        except asyncio.CancelledError:
-            logger.info("Change stream listener cancelled")
-            break
-        except Exception as e:
-            logger.error(f"Change stream listener error: {e}")
-            await asyncio.sleep(5)
+    # Resume after the last published event, so changes made while no process was listening are replayed
+    resume_token = await balance_stream.load_resume_token()
+    try:
+        async with user_collection.watch(pipeline, full_document='updateLookup', start_after=resume_token) as stream:
+            logger.info(f"Change stream listener started {'after the last published event' if resume_token else 'from now'}")
+            async for change in stream:
+                user_id = str(change['documentKey']['_id'])
+                balance = (change.get('fullDocument') or {}).get('balance')
+                if balance is not None:
+                    for campaign in balance:
+                        campaign['campaign_id'] = str(campaign['campaign_id'])
+                    await balance_stream.publish(user_id, {'balance': balance})
+                await balance_stream.save_resume_token(change['_id'])
+    except OperationFailure as e:
+        if resume_token and e.code in balance_stream.RESUME_TOKEN_LOST_ERROR_CODES:
+            logger.warning(f"Balance change stream cannot resume from its saved token, the next start is from now: {e}")
+            await balance_stream.clear_resume_token()
+        raise
 
 
 async def check_user_is_verified_and_delete(user_id):
@@ -490,6 +556,7 @@ async def refund_credit(
         )
         campaign = await campaign_controller.get_one_campaign(campaign_id)
         created_transaction = await create_transaction(transaction)
+        await rollup_controller.record_refund(campaign_id, user.agent_id, amount)
         agent = await agent_controller.get_agent(user.agent_id)
         lead_price = agent.lead_price_override if agent.lead_price_override else campaign.price_per_lead
         second_chance_lead_price = agent.second_chance_lead_price_override if agent.second_chance_lead_price_override else campaign.price_per_second_chance_lead
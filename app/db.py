@@ -25,3 +25,9 @@ class Database:
         if cls._instance is None:
             cls()
         return cls._instance.db
+
+    @classmethod
+    def get_client(cls):
+        if cls._instance is None:
+            cls()
+        return cls._instance.client
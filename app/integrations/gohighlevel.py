@@ -1,16 +1,19 @@
-import httpx
+import asyncio
 import logging
+from typing import List
+
+from app.integrations import http_client
 from app.models.lead import LeadModel
 
 logger = logging.getLogger(__name__)
 
+
 class GoHighLevel:
     """
     Handles sending leads to the GoHighLevel API.
     """
     BASE_URL = "https://rest.gohighlevel.com/v1/contacts/"
 
-
     @staticmethod
     async def send_lead(lead: LeadModel, api_key: str, campaign_name: str):
         """
@@ -47,17 +50,37 @@ class GoHighLevel:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url=GoHighLevel.BASE_URL, headers=headers, json=payload)
-                if response.status_code in [200, 201]:
-                    logger.info(f"Successfully sent lead {lead.id} to GoHighLevel.")
-                    return response.json()
-                else:
-                    logger.error(
-                        f"Failed to send lead {lead.id} to GHL. Status: {response.status_code}, Response: {response.text}. "
-                        "This is most likely due to an invalid or incorrect API Key for this location."
-                    )
-                    return None
+            response, attempts, error = await http_client.post_with_retry(
+                GoHighLevel.BASE_URL, headers=headers, json=payload
+            )
+            if response is not None and response.status_code in [200, 201]:
+                logger.info(f"Successfully sent lead {lead.id} to GoHighLevel.")
+                return response.json()
+            else:
+                logger.error(
+                    f"Failed to send lead {lead.id} to GHL after {attempts} attempts. Error: {error}. "
+                    "This is most likely due to an invalid or incorrect API Key for this location."
+                )
+                return None
         except Exception as e:
             logger.error(f"An exception occurred while sending lead {lead.id} to GoHighLevel: {e}")
             return None
+
+    @staticmethod
+    async def send_leads(leads: List[LeadModel], api_key: str, campaign_name: str):
+        """
+        Sends many leads to the GoHighLevel API concurrently over the shared connection pool.
+        Requests in flight are bounded by the client's per-host limit only, so a batch waits on the same
+        slots as every other call to GoHighLevel and is never throttled twice.
+
+        Args:
+            leads (list): The leads to create as contacts.
+            api_key (str): The GoHighLevel API key for the agent's location.
+            campaign_name (str): The campaign name used to tag the contacts.
+
+        Returns:
+            list: The API response for each lead, in order, or None for the ones that failed.
+        """
+        results = await asyncio.gather(*(GoHighLevel.send_lead(lead, api_key, campaign_name) for lead in leads))
+        logger.info(f"Sent {sum(1 for result in results if result is not None)}/{len(leads)} leads to GoHighLevel.")
+        return results
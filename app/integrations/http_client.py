@@ -0,0 +1,124 @@
+import asyncio
+import importlib.util
+import logging
+import random
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# CRM POSTs create contacts and are not idempotent, so a request is only retried when the server
+# cannot have acted on it: it was never sent, or the server asked to be called again later.
+RETRYABLE_STATUS_CODES = {429, 503}
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# HTTP/2 multiplexes concurrent requests to one host over a single connection; it needs the optional h2 package.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# httpx clients and asyncio semaphores are bound to the loop they were created on, so keep one set per loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide pooled client for outbound CRM calls on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.crm_max_connections,
+                max_keepalive_connections=settings.crm_max_connections
+            ),
+            timeout=httpx.Timeout(settings.crm_timeout),
+            http2=HTTP2_AVAILABLE
+        )
+        _clients[loop] = client
+    return client
+
+
+def get_host_semaphore(url: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores = _host_semaphores.setdefault(loop, {})
+    host = urlparse(url).netloc
+    if host not in semaphores:
+        semaphores[host] = asyncio.Semaphore(settings.crm_max_connections_per_host)
+    return semaphores[host]
+
+
+async def close_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Returns the seconds to wait from a Retry-After header given either as seconds or as an HTTP date.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def post_with_retry(
+    url: str,
+    json: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None,
+    max_attempts: Optional[int] = None
+) -> Tuple[Optional[httpx.Response], int, Optional[str]]:
+    """
+    POSTs through the shared client, bounded by the per-host concurrency limit.
+    Only failures that guarantee the request was not processed are retried: connection errors, pool timeouts
+    and 429/503 responses. Retry-After is honoured up to CRM_MAX_BACKOFF, otherwise the delay is full-jitter
+    exponential backoff. Read timeouts and server errors are returned as they are, since the contact may
+    already have been created.
+
+    Returns:
+        tuple: The last response (None if no response was received), the number of attempts and the last error.
+    """
+    max_attempts = max_attempts or settings.crm_max_attempts
+    client = get_client()
+    semaphore = get_host_semaphore(url)
+    response, error = None, None
+    for attempt in range(1, max_attempts + 1):
+        retry_after = None
+        try:
+            async with semaphore:
+                response = await client.post(url, headers=headers, json=json)
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                return response, attempt, None if response.is_success else f"HTTP {response.status_code}: {response.text[:500]}"
+            error = f"HTTP {response.status_code}"
+            retry_after = _retry_after(response)
+        except RETRYABLE_ERRORS as e:
+            response, error = None, f"{type(e).__name__}: {e}"
+        except httpx.TransportError as e:
+            return None, attempt, f"{type(e).__name__}: {e}"
+        if attempt < max_attempts:
+            if retry_after is not None:
+                delay = min(retry_after, settings.crm_max_backoff)
+            else:
+                delay = random.uniform(0, min(settings.crm_max_backoff, settings.crm_base_backoff * 2 ** (attempt - 1)))
+            logger.warning(f"Attempt {attempt} to {url} failed with {error}. Retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+    return response, max_attempts, error
@@ -1,7 +1,9 @@
 import logging
-import requests
 from typing import Dict, Any
 
+from app.integrations import http_client
+from app.models.lead import CRMDeliveryModel
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,15 +38,18 @@ class Ringy:
         """
         return f"Ringy(auth_token={self.auth_token}, sid={self.sid})"
 
-    def push_lead(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def push_lead(self, lead_data: Dict[str, Any]) -> CRMDeliveryModel:
         """
         Push/insert new lead data to Ringy.
 
+        The request goes through the shared pooled client and is retried with backoff only when
+        it cannot have reached Ringy (connection errors) or Ringy asked for a retry (429/503).
+
         Args:
             lead_data (dict): The lead information you want to create or update in Ringy.
 
         Returns:
-            dict: The API response, possibly containing the new lead ID or an error.
+            CRMDeliveryModel: The delivery outcome, including the API response or the last error.
         """
         custom_fields = lead_data.pop('custom_fields', {}) or {}
         normalized_custom_fields = {}
@@ -56,19 +61,27 @@ class Ringy:
             "sid": self.sid,
             "authToken": self.auth_token
         })
+        response, attempts, error = await http_client.post_with_retry(
+            f"{self.BASE_URL}/leads/new-lead",
+            headers=self._get_headers(),
+            json=lead_data
+        )
+        delivery = CRMDeliveryModel(
+            crm="Ringy",
+            status="failed" if error else "delivered",
+            attempts=attempts,
+            status_code=response.status_code if response is not None else None,
+            error=error
+        )
+        if error:
+            logger.error(f"Error pushing lead to Ringy after {attempts} attempts: {error}")
+            return delivery
         try:
-            response = requests.post(
-                f"{self.BASE_URL}/leads/new-lead",
-                headers=self._get_headers(),
-                json=lead_data,
-                timeout=10
-            )
-            response.raise_for_status()
-            logger.info(f"Ringy response: {response.json()}")
-            return response.json()
-        except requests.RequestException as exc:
-            logger.error(f"Error pushing lead to Ringy: {exc}")
-            return {"error": str(exc)}
+            delivery.response = response.json()
+        except ValueError:
+            delivery.response = {"body": response.text}
+        logger.info(f"Ringy response: {delivery.response}")
+        return delivery
 
     def _get_headers(self) -> Dict[str, str]:
         """
@@ -6,6 +6,10 @@ from typing import List, Optional
 from dateutil import parser
 
 from app.tools.modifiers import PyObjectId
+from app.tools.serializers import raw_model_json, scrub_nan
+
+
+STRIPPED_FIELDS = ('first_name', 'last_name', 'phone', 'email')
 
 
 class LeadModel(BaseModel):
@@ -56,8 +60,7 @@ class LeadModel(BaseModel):
 
     @root_validator(pre=True)
     def strip_fields(cls, values):
-        fields_to_strip = ['first_name', 'last_name', 'phone', 'email']
-        for field in fields_to_strip:
+        for field in STRIPPED_FIELDS:
             if field in values and isinstance(values[field], str):
                 values[field] = values[field].strip()
         return values
@@ -101,6 +104,23 @@ class LeadModel(BaseModel):
                 data[key] = [str(v) if isinstance(v, ObjectId) else v for v in value]
         return data
 
+    @classmethod
+    def raw_json(cls, document: dict) -> dict:
+        """
+        Same output as LeadModel(**document).to_json() for read-only responses, applying the validators'
+        cleanup by hand instead of building the model.
+        """
+        data = raw_model_json(document, cls)
+        if isinstance(data["phone"], int):
+            data["phone"] = str(data["phone"])
+        for field in STRIPPED_FIELDS:
+            if isinstance(data[field], str):
+                data[field] = data[field].strip()
+        custom_fields = document.get("custom_fields", {})
+        data["custom_fields"] = scrub_nan(custom_fields) if isinstance(custom_fields, dict) else custom_fields
+        data["full_name"] = str(data["first_name"] + " " + data["last_name"])
+        return data
+
     def crm_json(self):
         json_body = {
             "full_name": self.full_name,
@@ -114,6 +134,23 @@ class LeadModel(BaseModel):
         return json_body
 
 
+class CRMDeliveryModel(BaseModel):
+    """
+    Outcome of pushing a lead to an agent's CRM.
+    """
+    crm: str = Field(...)
+    status: str = Field(...)
+    attempts: int = Field(default=1)
+    status_code: Optional[int] = Field(default=None)
+    error: Optional[str] = Field(default=None)
+    response: Optional[dict] = Field(default=None)
+    delivered_time: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "delivered"
+
+
 class UpdateLeadModel(BaseModel):
     """
     A set of optional updates to be made to a Lead document in the database.
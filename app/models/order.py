@@ -1,7 +1,7 @@
 import datetime
 from bson import ObjectId
 from pydantic import BaseModel, Field
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
 from app.tools.modifiers import PyObjectId
 
@@ -31,6 +31,8 @@ class OrderModel(BaseModel):
     agent_id: PyObjectId = Field(...)
     fresh_lead_amount: int = Field(default=0)
     second_chance_lead_amount: int = Field(default=0)
+    fresh_completed: int = Field(default=0)
+    second_chance_completed: int = Field(default=0)
     priority: OrderPriorityDetails = Field(default_factory=OrderPriorityDetails)
     past_prioritizations: List[OrderPriorityDetails] = Field(default_factory=list)
     rules: dict = Field(default={})
@@ -46,7 +48,7 @@ class OrderModel(BaseModel):
         from app.controllers.order import get_second_chance_lead_count
         return await get_second_chance_lead_count(self.id)
 
-    async def to_json(self):
+    async def to_json(self, completed_counts: Optional[Tuple[int, int]] = None):
         data = self.model_dump()
 
         def convert_object_ids(item):
@@ -60,10 +62,20 @@ class OrderModel(BaseModel):
                 return item
 
         data = convert_object_ids(data)
-        data["fresh_lead_completed"] = await self.fresh_lead_completed
-        data["second_chance_lead_completed"] = await self.second_chance_lead_completed
+        if completed_counts is None:
+            completed_counts = (await self.fresh_lead_completed, await self.second_chance_lead_completed)
+        data["fresh_lead_completed"], data["second_chance_lead_completed"] = completed_counts
         return data
 
+    @staticmethod
+    async def bulk_to_json(orders: List["OrderModel"]) -> List[dict]:
+        """
+        Serializes a page of orders with the lead counts of all of them fetched in one query.
+        """
+        from app.controllers.order import get_completed_lead_counts
+        completed_counts = await get_completed_lead_counts([order.id for order in orders])
+        return [await order.to_json(completed_counts.get(order.id, (0, 0))) for order in orders]
+
 
 class UpdateOrderModel(BaseModel):
     """
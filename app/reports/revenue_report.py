@@ -0,0 +1,153 @@
+import logging
+
+import orjson
+import pandas as pd
+
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+
+REPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+REPORT_CHUNK_SIZE = 1000
+
+GROUP_COLUMNS = ["period", "campaign_id", "agent_id"]
+
+COUNT_COLUMNS = ["fresh_sold", "second_chance_sold", "orders"]
+
+SUM_COLUMNS = COUNT_COLUMNS + ["revenue", "refunds", "orders_total"]
+
+REPORT_COLUMNS = [
+    "period",
+    "campaign_id",
+    "campaign_name",
+    "agent_id",
+    "agent_name",
+    "fresh_sold",
+    "second_chance_sold",
+    "leads_sold",
+    "orders",
+    "orders_total",
+    "revenue",
+    "refunds",
+    "net_revenue",
+    "average_lead_price",
+    "lead_cost",
+    "margin",
+    "margin_percentage",
+]
+
+
+async def _load_rollups(start: datetime, end: datetime, campaigns: List[ObjectId], agent_id=None) -> pd.DataFrame:
+    from app.controllers.rollup import get_rollup_collection
+    filter = {"date": {"$gte": start, "$lt": end}, "campaign_id": {"$in": campaigns}, "agent_id": {"$ne": None}}
+    if agent_id:
+        filter["agent_id"] = agent_id
+    rows = await get_rollup_collection().find(
+        filter,
+        {"_id": 0, "date": 1, "campaign_id": 1, "agent_id": 1, "fresh_sold": 1, "second_chance_sold": 1, "revenue": 1, "refunds": 1}
+    ).to_list(None)
+    return pd.DataFrame(rows, columns=["date", "campaign_id", "agent_id", "fresh_sold", "second_chance_sold", "revenue", "refunds"])
+
+
+async def _load_orders(start: datetime, end: datetime, campaigns: List[ObjectId], agent_id=None) -> pd.DataFrame:
+    from app.controllers.order import get_order_collection
+    filter = {"date": {"$gte": start, "$lt": end}, "campaign_id": {"$in": campaigns}, "type": "standard"}
+    if agent_id:
+        filter["agent_id"] = agent_id
+    rows = await get_order_collection().find(
+        filter,
+        {"_id": 0, "date": 1, "campaign_id": 1, "agent_id": 1, "order_total": 1}
+    ).to_list(None)
+    orders = pd.DataFrame(rows, columns=["date", "campaign_id", "agent_id", "order_total"])
+    orders["date"] = pd.to_datetime(orders["date"]).dt.normalize()
+    orders["orders"] = 1
+    return orders.rename(columns={"order_total": "orders_total"})
+
+
+async def _load_names(campaign_ids: list, agent_ids: list) -> tuple:
+    from app.controllers.agent import get_agent_collection
+    from app.controllers.campaign import get_campaign_collection
+    campaigns = await get_campaign_collection().find({"_id": {"$in": campaign_ids}}, {"name": 1}).to_list(None)
+    agents = await get_agent_collection().find({"_id": {"$in": agent_ids}}, {"first_name": 1, "last_name": 1}).to_list(None)
+    campaign_names = {campaign["_id"]: campaign.get("name") for campaign in campaigns}
+    agent_names = {
+        agent["_id"]: f"{agent.get('first_name') or ''} {agent.get('last_name') or ''}".strip()
+        for agent in agents
+    }
+    return campaign_names, agent_names
+
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    return numerator.div(denominator.where(denominator > 0)).fillna(0).round(2)
+
+
+async def build_revenue_report(
+    start: datetime,
+    end: datetime,
+    campaigns: List[ObjectId],
+    period: str = "day",
+    cost_per_lead: float = 0,
+    cost_per_second_chance_lead: float = 0,
+    agent_id: Optional[ObjectId] = None
+) -> pd.DataFrame:
+    """
+    Builds the revenue, lead cost and margin table of every campaign and agent for the UTC days from start through end,
+    grouped by day or month. Sales, revenue and refunds come from the daily rollups and orders from the order collection.
+    The cost of a lead is not stored anywhere, so it is passed in; margins are net revenue when it is left at 0.
+    """
+    from app.controllers.rollup import to_day
+    start, end = to_day(start), to_day(end) + timedelta(days=1)
+    campaigns = [ObjectId(campaign) for campaign in campaigns or []]
+    rollups = await _load_rollups(start, end, campaigns, agent_id)
+    orders = await _load_orders(start, end, campaigns, agent_id)
+
+    frames = [frame for frame in (rollups, orders) if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    data = pd.concat(frames, ignore_index=True)
+    data[SUM_COLUMNS] = data.reindex(columns=SUM_COLUMNS).fillna(0)
+    data["period"] = pd.to_datetime(data["date"]).dt.strftime(PERIOD_FORMATS[period])
+    report = data.groupby(GROUP_COLUMNS, sort=True)[SUM_COLUMNS].sum().reset_index()
+    report[COUNT_COLUMNS] = report[COUNT_COLUMNS].astype(int)
+
+    report["leads_sold"] = report["fresh_sold"] + report["second_chance_sold"]
+    report["net_revenue"] = (report["revenue"] - report["refunds"]).round(2)
+    report["average_lead_price"] = _ratio(report["revenue"], report["leads_sold"])
+    report["lead_cost"] = (
+        report["fresh_sold"] * cost_per_lead + report["second_chance_sold"] * cost_per_second_chance_lead
+    ).round(2)
+    report["margin"] = (report["net_revenue"] - report["lead_cost"]).round(2)
+    report["margin_percentage"] = _ratio(report["margin"] * 100, report["net_revenue"])
+
+    campaign_names, agent_names = await _load_names(report["campaign_id"].unique().tolist(), report["agent_id"].unique().tolist())
+    report["campaign_name"] = report["campaign_id"].map(campaign_names)
+    report["agent_name"] = report["agent_id"].map(agent_names)
+    report["campaign_id"] = report["campaign_id"].astype(str)
+    report["agent_id"] = report["agent_id"].astype(str)
+    report = report[REPORT_COLUMNS]
+    logger.info(f"Built revenue report with {len(report)} rows from {start} to {end}")
+    return report
+
+
+async def stream_revenue_report(report: pd.DataFrame, report_format: str = "csv") -> AsyncIterator[str]:
+    """
+    Writes the report out in chunks of CSV rows, or as one JSON object holding a list per column.
+    """
+    if report_format == "json":
+        yield orjson.dumps({column: report[column].tolist() for column in report.columns}).decode()
+        return
+    for offset in range(0, max(len(report), 1), REPORT_CHUNK_SIZE):
+        yield report.iloc[offset:offset + REPORT_CHUNK_SIZE].to_csv(index=False, header=offset == 0)
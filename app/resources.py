@@ -1,7 +1,7 @@
 import logging
 
-from collections import defaultdict
 from redis import Redis
+from redis import asyncio as aioredis
 from rq import Queue
 from rq_scheduler import Scheduler
 
@@ -11,16 +11,15 @@ settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
-
-user_connections = defaultdict(list)
-
 try:
     redis = Redis(host=settings.redis_api_address, port=settings.redis_api_port)
+    async_redis = aioredis.Redis(host=settings.redis_api_address, port=settings.redis_api_port)
     rq = Queue(connection=redis)
     scheduler = Scheduler(connection=redis)
     logger.info("Connected to Redis and RQ Scheduler")
 except Exception as e:
     logger.error(f"Error connecting to Redis: {e}")
     redis = None
+    async_redis = None
     rq = None
     scheduler = None
@@ -1,14 +1,15 @@
-import asyncio
 from pydantic import BaseModel
 from datetime import datetime
 from fastapi import APIRouter, status, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 
-import app.controllers.agent as agent_controller
+import app.controllers.dashboard as dashboard_controller
 import app.controllers.lead as lead_controller
-import app.controllers.order as order_controller
+import app.reports.revenue_report as revenue_report
 
 from app.auth.jwt_bearer import get_current_user
 from app.models.user import UserModel
+from app.tools.serializers import RawJSONResponse
 
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
@@ -38,17 +39,7 @@ async def get_dashboard_metrics(date_ranges: DateRangesRequest, user: UserModel
         )
 
     campaigns = user.campaigns
-    order_metrics, lead_metrics, agent_metrics = await asyncio.gather(
-        order_controller.get_order_metrics(campaigns),
-        lead_controller.get_lead_counts(date_ranges.model_dump(), campaigns),
-        agent_controller.get_agent_metrics(campaigns)
-    )
-
-    return {
-        "orders": order_metrics,
-        "leads": lead_metrics,
-        "agents": agent_metrics
-    }
+    return await dashboard_controller.get_metrics(date_ranges.model_dump(), campaigns)
 
 
 @router.get(
@@ -60,4 +51,43 @@ async def get_unsold_leads(user: UserModel = Depends(get_current_user)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     campaigns = user.campaigns
     result = await lead_controller.get_unsold_leads(campaigns=campaigns)
-    return result
+    return RawJSONResponse(result)
+
+
+@router.get(
+    "/revenue-report",
+    status_code=status.HTTP_200_OK,
+    response_description="Revenue, lead cost and margin by campaign and agent"
+)
+async def get_revenue_report(
+    start: datetime,
+    end: datetime,
+    period: str = "day",
+    format: str = "csv",
+    cost_per_lead: float = 0,
+    cost_per_second_chance_lead: float = 0,
+    user: UserModel = Depends(get_current_user)
+):
+    """
+    Stream the revenue report of the user's campaigns from start through end, by day or month, as CSV or columnar JSON.
+    """
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if period not in revenue_report.PERIOD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid report period {period}")
+    if format not in revenue_report.REPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid report format {format}")
+    report = await revenue_report.build_revenue_report(
+        start,
+        end,
+        user.campaigns,
+        period=period,
+        cost_per_lead=cost_per_lead,
+        cost_per_second_chance_lead=cost_per_second_chance_lead,
+        agent_id=user.agent_id if user.is_agent() else None
+    )
+    return StreamingResponse(
+        revenue_report.stream_revenue_report(report, format),
+        media_type=revenue_report.REPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=revenue_report.{format}"}
+    )
@@ -2,20 +2,26 @@ import bson
 import json
 
 from fastapi import APIRouter, Body, Query, status, HTTPException, Depends
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from typing import Optional, Dict, List
 
 import app.controllers.lead as lead_controller
 
 from app.auth.jwt_bearer import get_current_user
 from app.background_jobs import lead as lead_background_jobs
-from app.models.lead import LeadModel, UpdateLeadModel, LeadCollection, DuplicateCheckResponse
+from app.models.lead import LeadModel, UpdateLeadModel, DuplicateCheckResponse
 from app.models.user import UserModel
 from app.tools import mappings, formatters
+from app.tools.serializers import RawJSONResponse
 
 
 router = APIRouter(prefix="/api/lead", tags=["lead"])
 
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
 public_lead_router = APIRouter(
     prefix="/api/lead",
     tags=["lead"]
@@ -99,7 +105,7 @@ async def get_multiple_leads(ids: List[str] = Body(...), user: UserModel = Depen
     """
     try:
         leads = await lead_controller.get_leads(ids=ids, user=user)
-        return {"data": list(lead.to_json() for lead in LeadCollection(data=leads).data)}
+        return RawJSONResponse({"data": leads})
     except lead_controller.LeadNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -164,6 +170,39 @@ async def update_lead_from_ghl(id: str, lead: UpdateLeadModel = Body(...)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get(
+    "/export",
+    response_description="Export leads as CSV or NDJSON"
+)
+async def export_leads(
+    format: str = "csv",
+    sort: str = "created_time=DESC",
+    filter: str = None,
+    user: UserModel = Depends(get_current_user)
+):
+    """
+    Stream every lead matching the same filters as the lead list, as CSV or NDJSON.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid export format {format}")
+    try:
+        filter = _parse_filter(filter)
+        if filter:
+            filter = _handle_buyer_filters(filter)
+            if "state" in filter:
+                filter = _handle_state_filters(filter)
+        sort = _build_sort_tuple(sort)
+        filter = _handle_user_filters(filter, user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    hidden_custom_fields = ("invalid", "invalid_reason", "trustedform_url") if user.is_agent() else ()
+    return StreamingResponse(
+        lead_controller.export_leads(filter, sort, format, hidden_custom_fields),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=leads.{format}"}
+    )
+
+
 @router.get(
     "/{id}",
     response_description="Get a single lead",
@@ -243,6 +282,22 @@ async def delete_lead(id: str, user: UserModel = Depends(get_current_user)):
     raise HTTPException(status_code=404, detail=f"Lead {id} not found")
 
 
+def _normalize_lead_fields(lead: LeadModel) -> bool:
+    """
+    Maps the lead's state to its canonical name and lowercases its email.
+    Returns False when the state is not a known one.
+    """
+    for state, state_variations in mappings.state_mappings.items():
+        if lead.state and lead.state.lower() in state_variations:
+            lead.state = state
+            break
+    else:
+        return False
+    if lead.email:
+        lead.email = lead.email.lower()
+    return True
+
+
 @router.post(
     "",
     response_description="Add new lead",
@@ -257,25 +312,56 @@ async def create_lead(lead: LeadModel = Body(...), user: UserModel = Depends(get
     """
     if not user.is_admin():
         raise HTTPException(status_code=404, detail="User can't create leads")
-    for state, state_variations in mappings.state_mappings.items():
-        if lead.state.lower() in state_variations:
-            lead.state = state
-            break
-    else:
+    if not _normalize_lead_fields(lead):
         raise HTTPException(status_code=400, detail=f"Invalid state {lead.state}")
-    lead.email = lead.email.lower()
     new_lead = await lead_controller.create_lead(lead)
     return {"id": str(new_lead.inserted_id)}
 
 
+@router.post(
+    "/bulk",
+    response_description="Add new leads in bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model_by_alias=False
+)
+async def create_leads_bulk(leads: List[LeadModel] = Body(...), user: UserModel = Depends(get_current_user)):
+    """
+    Insert many lead records at once.
+
+    Leads with an unknown state are rejected and reported by their position in the request.
+    Every other lead is inserted, flagged as invalid when it fails validation or is a duplicate.
+    """
+    if not user.is_admin():
+        raise HTTPException(status_code=404, detail="User can't create leads")
+    if not leads:
+        raise HTTPException(status_code=400, detail="Leads are required")
+    leads_to_create = []
+    rejected = []
+    for index, lead in enumerate(leads):
+        if not _normalize_lead_fields(lead):
+            rejected.append({"index": index, "reason": f"Invalid state {lead.state}"})
+            continue
+        leads_to_create.append(lead)
+    result = await lead_controller.create_leads_bulk(leads_to_create)
+    return {**result, "rejected": rejected}
+
+
 @router.get(
     "",
     response_description="Get all leads",
     response_model_by_alias=False
 )
-async def list_leads(page: int = 1, limit: int = 10, sort: str = "created_time=DESC", filter: str = None, user: UserModel = Depends(get_current_user)):
+async def list_leads(
+    page: int = 1,
+    limit: int = 10,
+    sort: str = "created_time=DESC",
+    filter: str = None,
+    cursor: str = None,
+    user: UserModel = Depends(get_current_user)
+):
     """
     List all of the lead data in the database within the specified page and limit.
+    Pass the returned next_cursor as cursor to get the following page without skipping; page is then ignored.
     """
     try:
         filter = _parse_filter(filter)
@@ -286,8 +372,15 @@ async def list_leads(page: int = 1, limit: int = 10, sort: str = "created_time=D
         sort = _build_sort_tuple(sort)
         filter = _handle_user_filters(filter, user)
 
-        leads, total = await lead_controller.get_all_leads(page=page, limit=limit, sort=sort, filter=filter)
-        return {"data": list(lead.to_json() for lead in LeadCollection(data=leads).data), "total": total}
+        leads, total, next_cursor = await lead_controller.get_all_leads(
+            page=page, limit=limit, sort=sort, filter=filter, cursor=cursor
+        )
+        return RawJSONResponse({
+            "data": leads,
+            "total": total.count,
+            "total_capped": total.capped,
+            "next_cursor": next_cursor
+        })
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
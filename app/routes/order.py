@@ -1,5 +1,4 @@
 import ast
-import asyncio
 from typing import List
 import bson
 
@@ -155,7 +154,7 @@ async def show_orders(ids: List[str] = Body(...), user: UserModel = Depends(get_
             if not user.campaigns:
                 raise HTTPException(status_code=404, detail="User does not have access to this order")
         orders = await order_controller.get_many_orders(ids=ids, user=user)
-        data = await asyncio.gather(*(order.to_json() for order in OrderCollection(data=orders).data))
+        data = await OrderModel.bulk_to_json(OrderCollection(data=orders).data)
         return {"data": data}
     except order_controller.OrderNotFoundError:
         raise HTTPException(status_code=404, detail=f"Order {ids} not found")
@@ -167,9 +166,17 @@ async def show_orders(ids: List[str] = Body(...), user: UserModel = Depends(get_
     response_description="Get all orders",
     response_model_by_alias=False
 )
-async def list_orders(page: int = 1, limit: int = 10, sort: str = "date=DESC" , filter: str = None, user: UserModel = Depends(get_current_user)):
+async def list_orders(
+    page: int = 1,
+    limit: int = 10,
+    sort: str = "date=DESC",
+    filter: str = None,
+    cursor: str = None,
+    user: UserModel = Depends(get_current_user)
+):
     """
     List all of the order data in the database within the specified page and limit.
+    Pass the returned next_cursor as cursor to get the following page without skipping; page is then ignored.
     """
     if sort.split('=')[1] not in ["ASC", "DESC"]:
         raise HTTPException(status_code=400, detail="Invalid sort parameter")
@@ -198,11 +205,15 @@ async def list_orders(page: int = 1, limit: int = 10, sort: str = "date=DESC" ,
                 elif isinstance(filter["agent_id"], list):
                     filter["agent_id"] = {"$in": [bson.ObjectId(agent) for agent in filter["agent_id"]]}
         sort = [sort.split('=')[0], 1 if sort.split('=')[1] == "ASC" else -1]
-        orders, total = await order_controller.get_all_orders(page=page, limit=limit, sort=sort, filter=filter)
-        data = await asyncio.gather(*(order.to_json() for order in OrderCollection(data=orders).data))
+        orders, total, next_cursor = await order_controller.get_all_orders(
+            page=page, limit=limit, sort=sort, filter=filter, cursor=cursor
+        )
+        data = await OrderModel.bulk_to_json(OrderCollection(data=orders).data)
         return {
             "data": data,
-            "total": total
+            "total": total.count,
+            "total_capped": total.capped,
+            "next_cursor": next_cursor
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
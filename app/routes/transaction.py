@@ -1,7 +1,7 @@
 import asyncio
 import logging
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
-from app.resources import user_connections
+from fastapi import APIRouter, WebSocket, status
+from app.controllers import balance_stream
 from app.models.user import UserModel
 from app.auth.jwt_bearer import get_current_user
 
@@ -29,6 +29,11 @@ async def get_current_user_from_websocket(websocket: WebSocket) -> UserModel:
     return user
 
 
+async def _wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
 @router.websocket("/ws/get-current-credit")
 async def get_current_credit(websocket: WebSocket):
     user = await get_current_user_from_websocket(websocket)
@@ -37,16 +42,18 @@ async def get_current_credit(websocket: WebSocket):
         return
     await websocket.accept()
     user_id = str(user.id)
-    user_connections[user_id].append(websocket)
+    queue = balance_stream.subscribe(user_id)
     logger.info(f"User {user_id} connected via WebSocket")
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    sender = asyncio.create_task(balance_stream.send_updates(websocket, queue))
     try:
-        while True:
-            await asyncio.sleep(1)  # Keep the connection alive
-    except WebSocketDisconnect:
-        logger.info(f"WebSocketDisconnect for user {user_id}")
+        done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        if receiver in done:
+            logger.info(f"WebSocketDisconnect for user {user_id}")
     except Exception as e:
         logger.error(f"Exception in WebSocket for user {user_id}: {e}")
     finally:
-        if websocket in user_connections[user_id]:
-            user_connections[user_id].remove(websocket)
-            logger.info(f"Removed websocket for user {user_id}")
+        receiver.cancel()
+        sender.cancel()
+        balance_stream.unsubscribe(user_id, queue)
+        logger.info(f"Removed websocket for user {user_id}")
@@ -0,0 +1,18 @@
+from app.db import Database
+from app.controllers.order import reconcile_completed_leads
+
+
+async def add_completed_counters_to_orders():
+    order_collection = Database().get_db()["order"]
+    try:
+        order_ids = await order_collection.distinct("_id", {})
+        corrected = await reconcile_completed_leads(order_ids)
+        print(f"Completed lead counters set on {corrected} orders")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print("Completed lead counters update completed")
+
+
+async def main():
+    await add_completed_counters_to_orders()
@@ -0,0 +1,37 @@
+from pymongo import UpdateOne
+
+from app.db import Database
+from app.controllers.dedup import normalize_phone
+
+
+BATCH_SIZE = 1000
+
+
+async def add_phone_normalized_to_leads():
+    lead_collection = Database().get_db()["lead"]
+    try:
+        updated = 0
+        updates = []
+        cursor = lead_collection.find(
+            {"phone": {"$nin": [None, ""]}, "phone_normalized": {"$exists": False}},
+            {"phone": 1},
+            batch_size=BATCH_SIZE
+        )
+        async for lead in cursor:
+            updates.append(UpdateOne({"_id": lead["_id"]}, {"$set": {"phone_normalized": normalize_phone(lead["phone"])}}))
+            if len(updates) == BATCH_SIZE:
+                result = await lead_collection.bulk_write(updates, ordered=False)
+                updated += result.modified_count
+                updates = []
+        if updates:
+            result = await lead_collection.bulk_write(updates, ordered=False)
+            updated += result.modified_count
+        print(f"Normalized phone added to {updated} leads")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print("Normalized phone update completed")
+
+
+async def main():
+    await add_phone_normalized_to_leads()
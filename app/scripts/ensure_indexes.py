@@ -0,0 +1,21 @@
+from app.tools.indexes import ensure_indexes as ensure_declared_indexes, find_collection_scans
+
+
+async def ensure_indexes():
+    try:
+        created = await ensure_declared_indexes()
+        for collection_name, index_names in created.items():
+            print(f"Indexes on {collection_name}: {index_names}")
+        collection_scans = await find_collection_scans()
+        for query in collection_scans:
+            print(f"COLLSCAN on {query['collection']} for '{query['name']}': {query['filter']} -> {query['stages']}")
+        if not collection_scans:
+            print("All canonical queries use an index")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print("Index check completed")
+
+
+async def main():
+    await ensure_indexes()
@@ -0,0 +1,19 @@
+from app.db import Database
+from app.controllers.dedup import rebuild_campaign_index
+
+
+async def rebuild_dedup_index():
+    campaign_collection = Database().get_db()["campaign"]
+    try:
+        campaign_ids = await campaign_collection.distinct("_id", {})
+        for campaign_id in campaign_ids:
+            indexed = await rebuild_campaign_index(campaign_id)
+            print(f"Indexed {indexed} leads for campaign {campaign_id}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print("Dedup index rebuild completed")
+
+
+async def main():
+    await rebuild_dedup_index()
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from app.controllers.rollup import get_history_start, rebuild_rollups as rebuild_daily_rollups
+
+
+async def rebuild_rollups(start: datetime = None, end: datetime = None):
+    try:
+        start = start or await get_history_start()
+        if start is None:
+            print("No leads found, there are no rollups to rebuild")
+            return
+        rows = await rebuild_daily_rollups(start, end)
+        print(f"Rebuilt {rows} daily rollup rows from {start} to {end or 'today'}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print("Rollup rebuild completed")
+
+
+async def main():
+    await rebuild_rollups()
@@ -15,9 +15,14 @@ test_settings = TestSettings()
 
 
 @pytest.fixture(scope="module")
-def test_client():
+def test_database():
     Database._instance = None
     Database(settings=test_settings)
+    yield Database.get_db()
+    Database._instance.client.close()
+
+
+@pytest.fixture(scope="module")
+def test_client(test_database):
     client = TestClient(app)
     yield client
-    Database._instance.client.close()
@@ -1,2 +1,3 @@
 from .factories import *  # noqa
 from .models import *  # noqa
+from .resources import *  # noqa
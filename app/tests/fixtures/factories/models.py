@@ -4,9 +4,11 @@ from faker import Faker
 from app.models.agent import AgentModel
 from app.models.lead import LeadModel
 from app.models.campaign import CampaignModel
+from app.models.order import OrderModel
 from app.controllers.agent import get_agent_collection
 from app.controllers.lead import get_lead_collection
 from app.controllers.campaign import get_campaign_collection
+from app.controllers.order import get_order_collection
 
 
 fake = Faker()
@@ -91,8 +93,20 @@ async def campaign_factory():
     yield create_campaign
 
 
+@pytest.fixture
+async def order_factory():
+    collection = get_order_collection()
+
+    async def create_order(**kwargs):
+        order = OrderModel(**{"status": "open", "order_total": 100, "type": "standard", **kwargs})
+        inserted_order = await collection.insert_one(order.model_dump(by_alias=True, exclude={"id"}))
+        return inserted_order
+
+    yield create_order
+
+
 @pytest.fixture(autouse=True)
-async def clean_database():
-    collections = [get_agent_collection(), get_lead_collection(), get_campaign_collection()]
+async def clean_database(test_database):
+    collections = [get_agent_collection(), get_lead_collection(), get_campaign_collection(), get_order_collection()]
     for collection in collections:
         await collection.delete_many({})
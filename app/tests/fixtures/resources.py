@@ -0,0 +1,29 @@
+import fakeredis
+import pytest
+from rq import Queue
+
+import app.background_jobs.job as job_background_jobs
+import app.background_jobs.lead as lead_background_jobs
+import app.background_jobs.order as order_background_jobs
+import app.background_jobs.rollup as rollup_background_jobs
+import app.background_jobs.user as user_background_jobs
+import app.controllers.balance_stream as balance_stream
+import app.controllers.dedup as dedup_controller
+import app.controllers.distribution as distribution_controller
+import app.controllers.ledger as ledger_controller
+import app.tools.cache as cache
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    connection = fakeredis.FakeRedis(server=server)
+    queue = Queue(connection=connection)
+    for module in (lead_background_jobs, cache):
+        monkeypatch.setattr(module, "redis", connection)
+    for module in (balance_stream, cache, dedup_controller, distribution_controller, ledger_controller):
+        monkeypatch.setattr(module, "async_redis", fakeredis.FakeAsyncRedis(server=server))
+    for module in (job_background_jobs, lead_background_jobs, order_background_jobs, rollup_background_jobs, user_background_jobs):
+        monkeypatch.setattr(module, "rq", queue)
+    yield connection
+    connection.flushall()
@@ -0,0 +1,39 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+
+import app.controllers.agent as agent_controller
+import app.controllers.user as user_controller
+from app.tools import constants
+
+
+@pytest.fixture
+async def user_collection(test_database):
+    collection = user_controller.get_user_collection()
+    yield collection
+    await collection.delete_many({})
+
+
+async def test__get_agent_metrics__returns_the_latest_active_agents_without_credentials__when_more_are_subscribed(user_collection):
+    campaign_id = ObjectId()
+    now = datetime.datetime.utcnow()
+    await user_collection.insert_many([
+        {
+            "name": f"Agent {index}",
+            "email": f"agent{index}@example.com",
+            "password": "hashed",
+            "region": "US",
+            "campaigns": [campaign_id],
+            "has_subscription": True,
+            "created_time": now - datetime.timedelta(minutes=index)
+        }
+        for index in range(constants.DASHBOARD_LATEST_AGENTS + 2)
+    ])
+
+    metrics = await agent_controller.get_agent_metrics([campaign_id])
+
+    assert metrics["active_agents_total"] == constants.DASHBOARD_LATEST_AGENTS + 2
+    assert [agent["name"] for agent in metrics["active_agents"]] == [f"Agent {index}" for index in range(constants.DASHBOARD_LATEST_AGENTS)]
+    assert metrics["active_agents"][0]["campaigns"] == [str(campaign_id)]
+    assert all("password" not in agent for agent in metrics["active_agents"])
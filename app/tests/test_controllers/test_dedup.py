@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+
+import app.controllers.dedup as dedup_controller
+import app.controllers.lead as lead_controller
+from app.models.lead import LeadModel
+from app.scripts.add_phone_normalized_to_leads import add_phone_normalized_to_leads
+from app.tools import constants
+from app.tools.validators import validate_duplicate
+
+
+@pytest.fixture
+async def campaign_id(test_database, campaign_factory):
+    campaign = await campaign_factory(name="Dedup", admin_id=ObjectId(), duplication_cutoff_days=10)
+    yield campaign.inserted_id
+    await lead_controller.get_lead_collection().delete_many({"campaign_id": campaign.inserted_id})
+
+
+async def _insert_lead(campaign_id, phone, days_ago=0):
+    created_time = datetime.datetime.utcnow() - datetime.timedelta(days=days_ago)
+    await lead_controller.get_lead_collection().insert_one(
+        lead_controller._with_normalized_phone({"campaign_id": campaign_id, "phone": phone, "created_time": created_time})
+    )
+
+
+def _lead(campaign_id, phone):
+    return LeadModel(
+        first_name="Test", last_name="Lead", email="test@example.com", state="FL", origin="facebook", campaign_id=campaign_id, phone=phone
+    )
+
+
+def test__normalize_phone__drops_formatting_and_the_country_code():
+    assert dedup_controller.normalize_phone("+1 (305) 555-1234") == "3055551234"
+    assert dedup_controller.normalize_phone("305.555.1234") == "3055551234"
+    assert dedup_controller.normalize_phone("  ") is None
+
+
+async def test__find_duplicate_leads__matches_formatted_phones__when_falling_back_to_mongo(fake_redis, campaign_id):
+    await _insert_lead(campaign_id, "(305) 555-1234")
+    await _insert_lead(campaign_id, "305 555 7777", days_ago=20)
+    leads = [
+        _lead(campaign_id, "+1 305-555-1234"),
+        _lead(campaign_id, "3055559999"),
+        _lead(campaign_id, "305 555 9999"),
+        _lead(campaign_id, "3055557777"),
+    ]
+
+    assert await lead_controller.find_duplicate_leads(leads) == {0, 2}
+
+
+async def test__find_duplicate_leads__agrees_with_the_mongo_fallback__when_the_index_is_built(fake_redis, campaign_id):
+    await _insert_lead(campaign_id, "(305) 555-1234")
+    await _insert_lead(campaign_id, "305 555 7777", days_ago=20)
+    await dedup_controller.rebuild_campaign_index(campaign_id)
+    leads = [_lead(campaign_id, "+1 305-555-1234"), _lead(campaign_id, "3055557777")]
+
+    assert await lead_controller.find_duplicate_leads(leads) == {0}
+    assert fake_redis.ttl(f"dedup:{campaign_id}:ready") > constants.DEDUP_INDEX_REFRESH
+
+
+async def test__find_duplicate_leads__returns_nothing__when_the_campaign_has_no_duplication_window(fake_redis, campaign_factory):
+    campaign = await campaign_factory(name="No window", admin_id=ObjectId(), duplication_cutoff_days=0)
+    await _insert_lead(campaign.inserted_id, "3055551234")
+    leads = [_lead(campaign.inserted_id, "3055551234"), _lead(campaign.inserted_id, "305-555-1234")]
+
+    assert await lead_controller.find_duplicate_leads(leads) == set()
+
+
+async def test__create_leads_bulk__accepts_a_lead__when_an_earlier_lead_with_the_same_phone_was_rejected(fake_redis, campaign_id):
+    rejected_lead = _lead(campaign_id, "3055551234")
+    rejected_lead.email = None
+    leads = [rejected_lead, _lead(campaign_id, "305-555-1234"), _lead(campaign_id, "(305) 555-1234")]
+
+    await lead_controller.create_leads_bulk(leads)
+
+    assert [lead.custom_fields["invalid"] for lead in leads] == ["yes", "no", "yes"]
+    assert leads[0].custom_fields["rejection_reasons"] == ["Missing phone or email"]
+    assert leads[2].custom_fields["rejection_reasons"] == ["Duplicate lead"]
+
+
+async def test__validate_duplicate__matches_a_formatted_phone__when_the_index_is_not_built(fake_redis, campaign_id):
+    await _insert_lead(campaign_id, "305-555-1234")
+
+    assert await validate_duplicate(_lead(campaign_id, "13055551234"), str(campaign_id))
+    assert not await validate_duplicate(_lead(campaign_id, "3055550000"), str(campaign_id))
+
+
+async def test__get_latest_created_time__schedules_a_rebuild__when_the_ready_flag_is_about_to_expire(fake_redis, campaign_id):
+    await dedup_controller.rebuild_campaign_index(campaign_id)
+    fake_redis.expire(f"dedup:{campaign_id}:ready", constants.DEDUP_INDEX_REFRESH - 1)
+
+    assert await dedup_controller.get_latest_created_time(campaign_id, "phone", "3055551234") is None
+    assert fake_redis.exists(f"dedup:{campaign_id}:rebuilding")
+    assert len(fake_redis.keys("rq:job:*")) == 1
+
+
+async def test__invalidate_campaign_index__sends_lookups_to_mongo_until_rebuilt(fake_redis, campaign_id):
+    await dedup_controller.rebuild_campaign_index(campaign_id)
+
+    await dedup_controller.invalidate_campaign_index(campaign_id)
+
+    with pytest.raises(dedup_controller.DedupIndexUnavailableError):
+        await dedup_controller.get_latest_created_time(campaign_id, "phone", "3055551234")
+    assert fake_redis.exists(f"dedup:{campaign_id}:rebuilding")
+
+
+async def test__update_campaign_window__rebuilds_the_index__only_when_the_window_grows(fake_redis, campaign_id):
+    await dedup_controller.rebuild_campaign_index(campaign_id)
+
+    await dedup_controller.update_campaign_window(campaign_id, previous_cutoff_days=20, cutoff_days=45)
+    assert not fake_redis.exists(f"dedup:{campaign_id}:ready")
+
+    await dedup_controller.rebuild_campaign_index(campaign_id)
+    await dedup_controller.update_campaign_window(campaign_id, previous_cutoff_days=60, cutoff_days=45)
+    assert fake_redis.exists(f"dedup:{campaign_id}:ready")
+
+
+async def test__add_phone_normalized_to_leads__backfills_leads_the_fallback_could_not_find(fake_redis, campaign_id):
+    await lead_controller.get_lead_collection().insert_one(
+        {"campaign_id": campaign_id, "phone": "(305) 555-1234", "created_time": datetime.datetime.utcnow()}
+    )
+    assert not await validate_duplicate(_lead(campaign_id, "3055551234"), str(campaign_id))
+
+    await add_phone_normalized_to_leads()
+
+    assert await validate_duplicate(_lead(campaign_id, "3055551234"), str(campaign_id))
@@ -0,0 +1,71 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import app.controllers.distribution as distribution_controller
+
+
+@pytest.fixture
+def agents():
+    return sorted((SimpleNamespace(id=ObjectId()) for _ in range(3)), key=lambda agent: str(agent.id))
+
+
+async def test__choose_agent__picks_one_of_the_candidates_without_touching_redis__when_distribution_is_random(fake_redis, agents):
+    campaign_id = ObjectId()
+
+    picks = [await distribution_controller.choose_agent(agents, distribution_controller.RANDOM, campaign_id=campaign_id) for _ in range(20)]
+
+    assert all(agent in agents for agent in picks)
+    assert fake_redis.keys("distribution:*") == []
+
+
+async def test__choose_agent__gives_every_agent_one_turn__when_agents_are_listed_once_per_order(fake_redis, agents):
+    first, second, third = agents
+    campaign_id = ObjectId()
+    candidates = [third, first, first, first, second]
+
+    picks = [await distribution_controller.choose_agent(candidates, distribution_controller.ROUND_ROBIN, campaign_id=campaign_id) for _ in range(6)]
+
+    assert picks == [first, second, third, first, second, third]
+
+
+async def test__choose_agent__keeps_separate_cursors__for_fresh_and_second_chance_pools(fake_redis, agents):
+    campaign_id = ObjectId()
+
+    fresh = await distribution_controller.choose_agent(agents, distribution_controller.ROUND_ROBIN, campaign_id=campaign_id)
+    second_chance = await distribution_controller.choose_agent(
+        agents, distribution_controller.ROUND_ROBIN, campaign_id=campaign_id, is_second_chance=True
+    )
+
+    assert fresh == second_chance == agents[0]
+
+
+async def test__choose_agent__follows_the_weights__when_distribution_is_weighted(fake_redis, agents):
+    first, second, third = agents
+    campaign_id = ObjectId()
+    weights = {str(first.id): 3, str(second.id): 1, str(third.id): 0}
+
+    picks = [
+        await distribution_controller.choose_agent(
+            [first, first, second, third], distribution_controller.WEIGHTED, campaign_id=campaign_id, weights=weights
+        )
+        for _ in range(10)
+    ]
+
+    # Agents without remaining capacity still get the minimum weight of 1
+    assert Counter(agent.id for agent in picks) == {first.id: 6, second.id: 2, third.id: 2}
+
+
+async def test__choose_agent__picks_at_random__when_redis_is_not_initialized(monkeypatch, agents):
+    monkeypatch.setattr(distribution_controller, "async_redis", None)
+
+    agent = await distribution_controller.choose_agent(agents, distribution_controller.ROUND_ROBIN, campaign_id=ObjectId())
+
+    assert agent in agents
+
+
+async def test__choose_agent__raises_value_error__when_the_distribution_type_is_unknown(agents):
+    with pytest.raises(ValueError):
+        await distribution_controller.choose_agent(agents, "first_come", campaign_id=ObjectId())
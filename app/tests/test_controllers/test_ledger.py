@@ -0,0 +1,86 @@
+import datetime
+
+import pytest
+from bson import ObjectId, json_util
+
+import app.controllers.ledger as ledger_controller
+from app.controllers.transaction import get_transaction_collection
+from app.models.transaction import TransactionModel
+
+
+@pytest.fixture
+async def ledger(test_database, fake_redis, monkeypatch):
+    monkeypatch.setattr(ledger_controller, "_group_ready", False)
+    await get_transaction_collection().delete_many({})
+    yield ledger_controller
+    await get_transaction_collection().delete_many({})
+
+
+def _debit(amount=-10):
+    return TransactionModel(
+        amount=amount,
+        date=datetime.datetime.utcnow(),
+        type="debit",
+        user_id=ObjectId(),
+        campaign_id=ObjectId()
+    )
+
+
+async def test__flush__writes_every_queued_transaction__when_entries_are_appended(ledger):
+    results = [await ledger.append(_debit()) for _ in range(3)]
+
+    flushed = await ledger.flush()
+
+    assert flushed == 3
+    stored_ids = await get_transaction_collection().distinct("_id")
+    assert set(stored_ids) == {result.inserted_id for result in results}
+    assert await ledger.async_redis.xlen(ledger.STREAM_KEY) == 0
+
+
+async def test__flush__acknowledges_a_replayed_entry__when_the_transaction_was_already_written(ledger):
+    result = await ledger.append(_debit())
+    document = json_util.loads((await ledger.async_redis.xrange(ledger.STREAM_KEY))[0][1][b"transaction"])
+    await get_transaction_collection().insert_one(document)
+
+    flushed = await ledger.flush()
+
+    assert flushed == 1
+    assert await get_transaction_collection().count_documents({"_id": result.inserted_id}) == 1
+    assert await ledger.async_redis.xlen(ledger.STREAM_KEY) == 0
+
+
+async def test__flush__moves_an_entry_to_the_dead_letter_stream__when_it_can_not_be_decoded(ledger):
+    await ledger.async_redis.xadd(ledger.STREAM_KEY, {"transaction": "not json"})
+    result = await ledger.append(_debit())
+
+    flushed = await ledger.flush()
+
+    assert flushed == 2
+    assert await get_transaction_collection().count_documents({"_id": result.inserted_id}) == 1
+    dead_letters = await ledger.async_redis.xrange(ledger.DEAD_LETTER_KEY)
+    assert [fields[b"transaction"] for _, fields in dead_letters] == [b"not json"]
+
+
+async def test__flush__keeps_writing_new_entries__while_a_failing_entry_is_retried(ledger, monkeypatch):
+    poison = await ledger.append(_debit(amount=-1))
+    write = ledger._write
+
+    async def write_all_but_poison(documents):
+        failed = {index for index, document in enumerate(documents) if document["_id"] == poison.inserted_id}
+        written = [document for document in documents if document["_id"] != poison.inserted_id]
+        if written:
+            await write(written)
+        return failed
+
+    monkeypatch.setattr(ledger, "_write", write_all_but_poison)
+
+    for _ in range(1, ledger.MAX_DELIVERIES):
+        new_transaction = await ledger.append(_debit())
+        assert await ledger.flush() == 1
+        assert await get_transaction_collection().count_documents({"_id": new_transaction.inserted_id}) == 1
+        assert await ledger.async_redis.xlen(ledger.DEAD_LETTER_KEY) == 0
+
+    assert await ledger.flush() == 1
+    assert await ledger.async_redis.xlen(ledger.DEAD_LETTER_KEY) == 1
+    assert await ledger.async_redis.xlen(ledger.STREAM_KEY) == 0
+    assert await ledger.flush() == 0
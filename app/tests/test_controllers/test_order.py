@@ -0,0 +1,149 @@
+import pytest
+from bson import ObjectId
+from faker import Faker
+
+import app.controllers.lead as lead_controller
+import app.controllers.order as order_controller
+from app.models.lead import UpdateLeadModel
+from app.models.order import OrderModel, OrderPriorityDetails
+
+
+fake = Faker()
+
+
+@pytest.fixture
+def campaign_id():
+    return ObjectId()
+
+
+@pytest.fixture
+def agent_id():
+    return ObjectId()
+
+
+async def _insert_lead(campaign_id, **fields):
+    lead = {"first_name": fake.first_name(), "last_name": fake.last_name(), "campaign_id": campaign_id, **fields}
+    result = await lead_controller.get_lead_collection().insert_one(lead)
+    return result.inserted_id
+
+
+async def _counters(order_id):
+    order = await order_controller.get_order_collection().find_one({"_id": order_id})
+    return order["fresh_completed"], order["second_chance_completed"]
+
+
+async def test__increment_completed_leads__adds_to_the_fresh_or_second_chance_counter(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=5, second_chance_lead_amount=5)
+
+    await order_controller.increment_completed_leads(order.inserted_id, 2)
+    await order_controller.increment_completed_leads(order.inserted_id, is_second_chance=True)
+    await order_controller.increment_completed_leads(order.inserted_id, -1)
+
+    assert await _counters(order.inserted_id) == (1, 1)
+
+
+async def test__update_lead__moves_the_completed_lead__when_its_order_changes(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    old_order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=5, fresh_completed=1)
+    new_order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=5)
+    lead_id = await _insert_lead(campaign_id, lead_order_id=old_order.inserted_id)
+
+    updated_lead = await lead_controller.update_lead(str(lead_id), UpdateLeadModel(lead_order_id=new_order.inserted_id))
+
+    assert updated_lead["lead_order_id"] == new_order.inserted_id
+    assert await _counters(old_order.inserted_id) == (0, 0)
+    assert await _counters(new_order.inserted_id) == (1, 0)
+
+
+async def test__update_lead__keeps_the_counters__when_the_order_is_unchanged(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=5, fresh_completed=1)
+    lead_id = await _insert_lead(campaign_id, lead_order_id=order.inserted_id)
+
+    await lead_controller.update_lead(str(lead_id), UpdateLeadModel(lead_order_id=order.inserted_id, first_name="Updated"))
+
+    assert await _counters(order.inserted_id) == (1, 0)
+
+
+async def test__delete_leads__takes_the_deleted_leads_off_their_orders(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(
+        campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=5, second_chance_lead_amount=5,
+        fresh_completed=2, second_chance_completed=1
+    )
+    fresh_lead_id = await _insert_lead(campaign_id, lead_order_id=order.inserted_id)
+    kept_lead_id = await _insert_lead(campaign_id, lead_order_id=order.inserted_id)
+    second_chance_lead_id = await _insert_lead(campaign_id, second_chance_lead_order_id=order.inserted_id)
+
+    await lead_controller.delete_leads([str(fresh_lead_id), str(second_chance_lead_id)])
+
+    assert await _counters(order.inserted_id) == (1, 0)
+    await lead_controller.delete_lead(str(kept_lead_id))
+    assert await _counters(order.inserted_id) == (0, 0)
+
+
+async def test__reconcile_completed_leads__corrects_counters_that_drifted(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=5, fresh_completed=4)
+    await _insert_lead(campaign_id, lead_order_id=order.inserted_id)
+    await _insert_lead(campaign_id, second_chance_lead_order_id=order.inserted_id)
+
+    corrected = await order_controller.reconcile_completed_leads()
+
+    assert corrected == 1
+    assert await _counters(order.inserted_id) == (1, 1)
+
+
+async def _order_model(order_id):
+    return OrderModel(**await order_controller.get_order_collection().find_one({"_id": order_id}))
+
+
+async def test__check_order_amounts_and_close__closes_the_order__when_both_counters_reach_their_amounts(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(
+        campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=2, second_chance_lead_amount=1,
+        fresh_completed=2, second_chance_completed=1
+    )
+    order_model = await _order_model(order.inserted_id)
+
+    assert await order_controller.check_order_amounts_and_close(order_model)
+
+    stored_order = await _order_model(order.inserted_id)
+    assert stored_order.status == order_model.status == "closed"
+    assert stored_order.completed_date is not None
+
+
+async def test__check_order_amounts_and_close__keeps_the_order_open__when_a_counter_is_short(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(
+        campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=2, second_chance_lead_amount=1,
+        fresh_completed=2, second_chance_completed=0
+    )
+    order_model = await _order_model(order.inserted_id)
+
+    assert not await order_controller.check_order_amounts_and_close(order_model)
+
+    assert (await _order_model(order.inserted_id)).status == order_model.status == "open"
+
+
+async def test__check_order_amounts_and_close__closes_only_once__when_called_again_for_a_closed_order(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=1, fresh_completed=1)
+    first_copy, second_copy = await _order_model(order.inserted_id), await _order_model(order.inserted_id)
+
+    assert await order_controller.check_order_amounts_and_close(first_copy)
+    assert not await order_controller.check_order_amounts_and_close(second_copy)
+
+
+async def test__check_order_amounts_and_close__closes_the_order__when_a_counter_without_leads_ordered_is_missing(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=1, fresh_completed=1)
+    await order_controller.get_order_collection().update_one({"_id": order.inserted_id}, {"$unset": {"second_chance_completed": ""}})
+
+    assert await order_controller.check_order_amounts_and_close(await _order_model(order.inserted_id))
+
+
+async def test__check_order_amounts_and_close__cancels_the_prioritization__when_it_closes_a_prioritized_order(test_database, fake_redis, order_factory, campaign_id, agent_id):
+    order = await order_factory(
+        campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=1, fresh_completed=1,
+        priority=OrderPriorityDetails(duration=60, active=True)
+    )
+    order_model = await _order_model(order.inserted_id)
+
+    assert await order_controller.check_order_amounts_and_close(order_model)
+
+    stored_order = await _order_model(order.inserted_id)
+    assert not stored_order.priority.active and not order_model.priority.active
+    assert stored_order.past_prioritizations[-1].active
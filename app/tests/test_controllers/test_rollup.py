@@ -0,0 +1,85 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import app.controllers.rollup as rollup_controller
+from app.controllers.lead import get_lead_collection
+from app.controllers.transaction import get_transaction_collection
+from app.controllers.user import get_user_collection
+
+
+@pytest.fixture
+async def rollups(test_database):
+    collections = (rollup_controller.get_rollup_collection(), get_lead_collection(), get_transaction_collection(), get_user_collection())
+    for collection in collections:
+        await collection.delete_many({})
+    yield rollup_controller
+    for collection in collections:
+        await collection.delete_many({})
+
+
+async def _stored_rollups():
+    rows = await rollup_controller.get_rollup_collection().find({}, {"_id": 0}).to_list(None)
+    return {
+        (row["date"], row["campaign_id"], row["agent_id"]): {metric: row.get(metric, 0) for metric in rollup_controller.METRICS}
+        for row in rows
+    }
+
+
+async def test__rebuild_rollups__matches_the_incremental_rollups__for_the_same_sales(rollups):
+    now = datetime.datetime.utcnow()
+    campaign_id, agent_id, user_id = ObjectId(), ObjectId(), ObjectId()
+    await get_user_collection().insert_one({"_id": user_id, "agent_id": agent_id})
+    leads = [
+        # Sold fresh and flagged second chance afterwards, still a fresh sale of the day
+        {"buyer_id": agent_id, "lead_sold_time": now, "is_second_chance": True},
+        {"buyer_id": agent_id, "lead_sold_time": now, "is_second_chance": False},
+        {"second_chance_buyer_id": agent_id, "second_chance_lead_sold_time": now, "is_second_chance": True},
+        {"is_second_chance": False},
+    ]
+    await get_lead_collection().insert_many([{"campaign_id": campaign_id, "created_time": now, **lead} for lead in leads])
+    await get_transaction_collection().insert_many([
+        {"type": "debit", "amount": -20, "date": now, "user_id": user_id, "campaign_id": campaign_id, "lead_id": [ObjectId(), ObjectId()]},
+        {"type": "debit", "amount": -5, "date": now, "user_id": user_id, "campaign_id": campaign_id, "lead_id": ObjectId()},
+        {"type": "debit", "amount": -50, "date": now, "user_id": user_id, "campaign_id": campaign_id, "description": "Manual adjustment"},
+        {"type": "credit", "amount": 10, "date": now, "user_id": user_id, "campaign_id": campaign_id, "notes": "Refund"},
+    ])
+
+    await rollups.record_leads_created([SimpleNamespace(created_time=now, campaign_id=campaign_id)] * len(leads))
+    await rollups.record_sales(campaign_id, agent_id, 2, 20)
+    await rollups.record_sales(campaign_id, agent_id, 1, 5, is_second_chance=True)
+    await rollups.record_refund(campaign_id, agent_id, 10)
+    incremental = await _stored_rollups()
+
+    written = await rollups.rebuild_rollups(start=now, end=now + datetime.timedelta(days=1))
+
+    assert written == 2
+    assert await _stored_rollups() == incremental
+    assert incremental[(rollups.to_day(now), campaign_id, agent_id)] == {
+        "leads_created": 0, "fresh_sold": 2, "second_chance_sold": 1, "revenue": 25, "refunds": 10
+    }
+
+
+async def test__backfill_rollups__builds_rows_from_the_oldest_lead__when_there_are_no_rollups(rollups):
+    now = datetime.datetime.utcnow()
+    campaign_id = ObjectId()
+    await get_lead_collection().insert_many([
+        {"campaign_id": campaign_id, "created_time": now - datetime.timedelta(days=400)},
+        {"campaign_id": campaign_id, "created_time": now},
+    ])
+
+    assert await rollups.backfill_rollups() == 2
+    stored = await _stored_rollups()
+    assert stored[(rollups.to_day(now - datetime.timedelta(days=400)), campaign_id, None)]["leads_created"] == 1
+    assert stored[(rollups.to_day(now), campaign_id, None)]["leads_created"] == 1
+
+
+async def test__backfill_rollups__writes_nothing__when_rollups_already_exist(rollups):
+    now = datetime.datetime.utcnow()
+    await get_lead_collection().insert_one({"campaign_id": ObjectId(), "created_time": now - datetime.timedelta(days=30)})
+    await rollups.record_leads_created([SimpleNamespace(created_time=now, campaign_id=ObjectId())])
+
+    assert await rollups.backfill_rollups() == 0
+    assert len(await _stored_rollups()) == 1
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+from faker import Faker
+
+import app.controllers.routing as routing_controller
+
+
+fake = Faker()
+
+
+@pytest.fixture
+def campaign_id():
+    return ObjectId()
+
+
+@pytest.fixture
+def create_agent(agent_factory, campaign_id):
+    async def create(states):
+        agent = await agent_factory(
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            email=fake.email(),
+            phone=fake.msisdn(),
+            states_with_license=states,
+            campaigns=[campaign_id]
+        )
+        return agent.inserted_id
+
+    return create
+
+
+async def test__build_campaign_index__groups_agents_with_capacity_by_state(test_database, fake_redis, create_agent, order_factory, campaign_id):
+    florida_agent = await create_agent(["FL"])
+    georgia_agent = await create_agent(["GA", "FL"])
+    filled_agent = await create_agent(["FL"])
+    await order_factory(campaign_id=campaign_id, agent_id=florida_agent, fresh_lead_amount=5, fresh_completed=2)
+    await order_factory(campaign_id=campaign_id, agent_id=georgia_agent, second_chance_lead_amount=3)
+    await order_factory(campaign_id=campaign_id, agent_id=filled_agent, fresh_lead_amount=2, fresh_completed=2)
+    await order_factory(campaign_id=campaign_id, agent_id=filled_agent, fresh_lead_amount=2, status="closed")
+
+    index = await routing_controller.build_campaign_index(campaign_id)
+
+    assert [entry.agent.id for entry in index.candidates("FL", is_second_chance=False)] == [florida_agent]
+    assert [entry.agent.id for entry in index.candidates("FL", is_second_chance=True)] == [georgia_agent]
+    assert index.candidates("GA", is_second_chance=False) == []
+    assert index.entries[str(florida_agent)].fresh_remaining == 3
+
+
+async def test__weighted_candidates__lists_an_agent_once_per_open_order(test_database, fake_redis, create_agent, order_factory, campaign_id):
+    busy_agent = await create_agent(["FL"])
+    other_agent = await create_agent(["FL"])
+    now = datetime.datetime.utcnow()
+    for days in range(3):
+        await order_factory(campaign_id=campaign_id, agent_id=busy_agent, fresh_lead_amount=1, date=now - datetime.timedelta(days=days + 1))
+    await order_factory(campaign_id=campaign_id, agent_id=other_agent, fresh_lead_amount=5, date=now)
+
+    index = await routing_controller.build_campaign_index(campaign_id)
+
+    agents = [agent.id for agent in index.weighted_candidates("FL", is_second_chance=False)]
+    assert agents == [busy_agent] * 3 + [other_agent]
+
+
+async def test__weighted_candidates__only_lists_prioritized_orders__when_prioritized_only(test_database, fake_redis, create_agent, order_factory, campaign_id):
+    prioritized_agent = await create_agent(["FL"])
+    other_agent = await create_agent(["FL"])
+    await order_factory(campaign_id=campaign_id, agent_id=prioritized_agent, fresh_lead_amount=5, priority={"active": True})
+    await order_factory(campaign_id=campaign_id, agent_id=other_agent, fresh_lead_amount=5)
+
+    index = await routing_controller.build_campaign_index(campaign_id)
+
+    agents = [agent.id for agent in index.weighted_candidates("FL", is_second_chance=False, prioritized_only=True)]
+    assert agents == [prioritized_agent]
+
+
+async def test__record_assignment__drops_the_index__when_an_agent_runs_out_of_capacity(test_database, fake_redis, create_agent, order_factory, campaign_id):
+    agent_id = await create_agent(["FL"])
+    await order_factory(campaign_id=campaign_id, agent_id=agent_id, fresh_lead_amount=2)
+    index = await routing_controller.get_campaign_index(campaign_id)
+
+    routing_controller.record_assignment(campaign_id, agent_id)
+    assert index.entries[str(agent_id)].fresh_remaining == 1
+    assert await routing_controller.get_campaign_index(campaign_id) is index
+
+    routing_controller.record_assignment(campaign_id, agent_id)
+    assert await routing_controller.get_campaign_index(campaign_id) is not index
@@ -0,0 +1,19 @@
+import pytest
+from bson import ObjectId
+
+import app.controllers.user as user_controller
+
+
+@pytest.fixture
+async def user_collection(test_database):
+    collection = user_controller.get_user_collection()
+    yield collection
+    await collection.delete_many({})
+
+
+async def test__update_user_balance__adds_the_campaign__when_the_user_has_no_balance_for_it(user_collection):
+    campaign_id = ObjectId()
+    user = await user_collection.insert_one({"name": "Agent", "balance": []})
+
+    assert await user_controller.update_user_balance(user.inserted_id, campaign_id, 25) == 25
+    assert await user_controller.update_user_balance(user.inserted_id, campaign_id, -5) == 20
@@ -1,6 +1,13 @@
 import pytest
+from bson import ObjectId
 from faker import Faker
 
+import app.background_jobs.lead as lead_background_jobs
+from app.auth.jwt_bearer import get_current_user
+from app.controllers.lead import get_lead_collection
+from app.models.user import UserModel
+from main import app, token_listener
+
 
 fake = Faker()
 
@@ -221,3 +228,37 @@ async def test__update_lead_from_ghl_route__returns_400_empty_lead__when_wrong_f
     inserted_lead = await lead_factory(**lead)
     response = test_client.put(f"/api/lead/ghl/{inserted_lead.inserted_id}", json={"country": fake.country()})
     assert response.status_code == 400
+
+
+async def test__create_leads_bulk_route__enqueues_every_lead__when_more_than_one_lead_is_sent(test_client, fake_redis, monkeypatch):
+    admin = UserModel(name=fake.name(), email=fake.email(), password=fake.password(), region="US", permissions=["admin"])
+    app.dependency_overrides[token_listener] = lambda: "token"
+    app.dependency_overrides[get_current_user] = lambda: admin
+    campaign_id = str(ObjectId())
+    leads = [
+        {
+            "first_name": fake.first_name(),
+            "last_name": fake.last_name(),
+            "email": fake.email(),
+            "phone": f"305555{index:04d}",
+            "state": "Florida",
+            "origin": "facebook",
+            "campaign_id": campaign_id,
+            "custom_fields": {}
+        }
+        for index in range(3)
+    ]
+
+    try:
+        response = test_client.post("/api/lead/bulk", json=leads)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 201
+    inserted_ids = response.json()["inserted_ids"]
+    assert len(inserted_ids) == 3
+    queue = lead_background_jobs.rq
+    assert queue.count == 3
+    assert len(queue.scheduled_job_registry.get_job_ids()) == 3
+    stored_leads = await get_lead_collection().find({"_id": {"$in": [ObjectId(lead_id) for lead_id in inserted_ids]}}).to_list(None)
+    assert all(lead["second_chance_task_id"] in queue.scheduled_job_registry.get_job_ids() for lead in stored_leads)
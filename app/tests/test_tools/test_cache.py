@@ -0,0 +1,30 @@
+from app.tools.cache import SharedCache
+
+
+async def test__get_or_load__loads_once__while_the_entry_is_current(fake_redis):
+    cache = SharedCache("test")
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert await cache.get_or_load("key", loader) == 1
+    assert await cache.get_or_load("key", loader) == 1
+    assert len(loads) == 1
+
+
+async def test__get_or_load__reloads__when_another_process_invalidates_the_key(fake_redis):
+    cache = SharedCache("test")
+    other_process_cache = SharedCache("test")
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return len(loads)
+
+    await cache.get_or_load("key", loader)
+    other_process_cache.invalidate("key")
+
+    assert await cache.get_or_load("key", loader) == 2
+    assert cache.peek("key") == 2
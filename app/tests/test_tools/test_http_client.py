@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.integrations import http_client
+
+
+URL = "https://crm.example.com/contacts"
+
+
+@pytest.fixture
+async def crm(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "crm_base_backoff", 0)
+    monkeypatch.setattr(http_client.settings, "crm_max_attempts", 3)
+    requests = []
+    responses = []
+
+    def handler(request):
+        requests.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    http_client._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    yield requests, responses
+    http_client._clients.pop(asyncio.get_running_loop(), None)
+
+
+async def test__post_with_retry__retries__when_the_connection_fails(crm):
+    requests, responses = crm
+    responses += [httpx.ConnectError("refused"), httpx.Response(201, json={"id": 1})]
+
+    response, attempts, error = await http_client.post_with_retry(URL, json={})
+
+    assert response.status_code == 201
+    assert attempts == 2
+    assert error is None
+
+
+async def test__post_with_retry__does_not_retry__when_the_read_times_out(crm):
+    requests, responses = crm
+    responses += [httpx.ReadTimeout("timed out"), httpx.Response(201)]
+
+    response, attempts, error = await http_client.post_with_retry(URL, json={})
+
+    assert response is None
+    assert attempts == 1
+    assert error.startswith("ReadTimeout")
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize("status_code", [500, 502, 504])
+async def test__post_with_retry__does_not_retry__when_the_server_errors(crm, status_code):
+    requests, responses = crm
+    responses += [httpx.Response(status_code), httpx.Response(201)]
+
+    response, attempts, error = await http_client.post_with_retry(URL, json={})
+
+    assert response.status_code == status_code
+    assert attempts == 1
+    assert error == f"HTTP {status_code}: "
+
+
+async def test__post_with_retry__waits_for_retry_after__when_throttled(crm, monkeypatch):
+    requests, responses = crm
+    responses += [httpx.Response(429, headers={"Retry-After": "3"}), httpx.Response(200)]
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", sleep)
+
+    response, attempts, error = await http_client.post_with_retry(URL, json={})
+
+    assert response.status_code == 200
+    assert attempts == 2
+    assert delays == [3]
@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.controllers.lead import get_lead_collection
+from app.tools import pagination
+
+
+@pytest.fixture
+async def lead_collection(test_database):
+    collection = get_lead_collection()
+    created_time = datetime.datetime(2024, 5, 3)
+    # Ties and missing values on the sort field, both as null and as an absent key
+    await collection.insert_many(
+        [{"state": "FL", "created_time": created_time} for _ in range(3)]
+        + [{"state": None, "created_time": created_time + datetime.timedelta(days=1)} for _ in range(2)]
+        + [{"created_time": created_time - datetime.timedelta(days=1)} for _ in range(2)]
+        + [{"state": "CA", "created_time": created_time} for _ in range(2)]
+    )
+    yield collection
+    await collection.delete_many({})
+
+
+async def _walk_pages(collection, sort, limit):
+    ids, cursor = [], None
+    while True:
+        query = pagination.apply_cursor({}, cursor, sort)
+        page = await collection.find(query).sort(pagination.sort_with_tiebreaker(sort)).limit(limit).to_list(limit)
+        ids += [document["_id"] for document in page]
+        cursor = pagination.next_cursor(page, limit, sort)
+        if cursor is None:
+            return ids
+
+
+def test__decode_cursor__returns_the_encoded_sort_value_and_id():
+    document = {"_id": ObjectId(), "created_time": datetime.datetime(2024, 5, 3, 13, 4, 5)}
+
+    cursor = pagination.encode_cursor(document, ("created_time", -1))
+
+    assert pagination.decode_cursor(cursor) == (document["created_time"], document["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm90IGpzb24=", "e30="])
+def test__decode_cursor__raises_invalid_cursor__when_the_cursor_is_malformed(cursor):
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor(cursor)
+
+
+def test__next_cursor__returns_none__when_the_page_is_not_full():
+    assert pagination.next_cursor([{"_id": ObjectId(), "state": "FL"}], 2, ("state", 1)) is None
+
+
+@pytest.mark.parametrize("sort", [("state", 1), ("state", -1), ("created_time", 1), ("created_time", -1), ("_id", -1)])
+@pytest.mark.parametrize("limit", [1, 2, 4])
+async def test__keyset_pages__return_every_document_once_in_sort_order__when_sort_values_tie_or_are_null(lead_collection, sort, limit):
+    expected = [document["_id"] for document in await lead_collection.find().sort(pagination.sort_with_tiebreaker(sort)).to_list(None)]
+
+    assert await _walk_pages(lead_collection, sort, limit) == expected
@@ -0,0 +1,40 @@
+import datetime
+
+import orjson
+import pytest
+from bson import ObjectId
+
+from app.models.lead import LeadModel
+from app.tools.serializers import RawJSONResponse
+
+
+def _lead_document(**fields):
+    return {
+        "_id": ObjectId(),
+        "first_name": "Jane",
+        "last_name": "Doe",
+        "email": "jane@example.com",
+        "phone": "3055551234",
+        "state": "FL",
+        "origin": "facebook",
+        "campaign_id": ObjectId(),
+        "buyer_id": ObjectId(),
+        "created_time": datetime.datetime(2024, 5, 3, 13, 4, 5, 123000),
+        **fields
+    }
+
+
+@pytest.mark.parametrize("fields", [
+    {},
+    {"custom_fields": None},
+    {"custom_fields": {"age": float("nan"), "source": "web"}},
+    {"first_name": " Jane ", "last_name": "Doe  ", "email": " jane@example.com", "phone": 3055551234},
+    {"last_name": ""},
+])
+def test__raw_json__renders_like_to_json__for_the_same_document(fields):
+    document = _lead_document(**fields)
+
+    raw = RawJSONResponse(LeadModel.raw_json(dict(document))).body
+    validated = RawJSONResponse(LeadModel(**dict(document)).to_json()).body
+
+    assert orjson.loads(raw) == orjson.loads(validated)
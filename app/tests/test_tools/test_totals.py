@@ -0,0 +1,31 @@
+import pytest
+
+import app.tools.totals as totals
+from app.controllers.lead import get_lead_collection
+
+
+@pytest.fixture
+async def lead_collection(test_database, monkeypatch):
+    monkeypatch.setattr(totals, "_totals", {})
+    collection = get_lead_collection()
+    await collection.insert_many([{"state": "FL"} for _ in range(3)])
+    yield collection
+    await collection.delete_many({})
+
+
+async def test__count_documents__flags_the_total_as_capped__when_the_filtered_count_reaches_the_cap(lead_collection, monkeypatch):
+    monkeypatch.setattr(totals.settings, "list_total_cap", 2)
+
+    assert await totals.count_documents(lead_collection, {"state": "FL"}) == totals.ListTotal(2, capped=True)
+
+
+async def test__count_documents__does_not_flag_an_estimated_count__even_above_the_cap(lead_collection, monkeypatch):
+    monkeypatch.setattr(totals.settings, "list_total_cap", 2)
+
+    assert await totals.count_documents(lead_collection) == totals.ListTotal(3, capped=False)
+
+
+async def test__count_documents__does_not_flag_the_total__when_the_count_is_under_the_cap(lead_collection, monkeypatch):
+    monkeypatch.setattr(totals.settings, "list_total_cap", 5)
+
+    assert await totals.count_documents(lead_collection, {"state": "FL"}) == totals.ListTotal(3, capped=False)
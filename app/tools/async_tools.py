@@ -1,5 +1,30 @@
 import asyncio
+import threading
+
+
+_runtime_loop = None
+
+
+def start_runtime_loop():
+    """
+    Starts the long-lived event loop used by the persistent worker runtime.
+    Coroutine jobs submitted through run_async then share this loop, and with it the Motor connection pool.
+    """
+    global _runtime_loop
+    if _runtime_loop is None:
+        _runtime_loop = asyncio.new_event_loop()
+        threading.Thread(target=_runtime_loop.run_forever, name="async-runtime", daemon=True).start()
+    return _runtime_loop
 
 
 def run_async(func, *args, **kwargs):
-    asyncio.run(func(*args, **kwargs))
+    if _runtime_loop is None:
+        asyncio.run(func(*args, **kwargs))
+        return
+    future = asyncio.run_coroutine_threadsafe(func(*args, **kwargs), _runtime_loop)
+    try:
+        future.result()
+    except BaseException:
+        # The job timed out or failed in the calling thread; make sure the coroutine stops too.
+        future.cancel()
+        raise
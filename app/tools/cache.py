@@ -0,0 +1,80 @@
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import cachetools
+from redis.exceptions import RedisError
+
+from app.resources import async_redis, redis
+
+
+logger = logging.getLogger(__name__)
+
+
+LOCAL_VERSION = ("local",)
+
+
+class SharedCache:
+    """
+    Process-local TTL/LRU cache whose entries are invalidated across API and worker processes.
+
+    Every entry is stored together with the Redis version counters that were current when it was
+    loaded. Invalidating a key (or the whole namespace) bumps those counters, so every process
+    drops its stale copy on the next lookup. If Redis cannot be reached nothing is cached.
+    Lookups read the counters with the async client; invalidation is a single INCR and stays
+    synchronous so it can be called from any write path.
+    """
+    def __init__(self, namespace: str, maxsize: int = 1024, ttl: float = 300):
+        self.namespace = namespace
+        self._entries = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _version_keys(self, key: Hashable):
+        return [f"cache:{self.namespace}:version", f"cache:{self.namespace}:{key}:version"]
+
+    async def version(self, key: Hashable) -> Optional[tuple]:
+        if async_redis is None:
+            return LOCAL_VERSION
+        try:
+            return tuple(await async_redis.mget(self._version_keys(key)))
+        except RedisError as e:
+            logger.warning(f"Could not read {self.namespace} cache version for {key}: {e}")
+            return None
+
+    def get(self, key: Hashable, version: Optional[tuple]) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or version is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def peek(self, key: Hashable) -> Any:
+        """
+        Returns this process' copy of an entry without checking it is still current.
+        """
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any, version: Optional[tuple]):
+        if version is None:
+            return
+        self._entries[key] = (version, value)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        version = await self.version(key)
+        value = self.get(key, version)
+        if value is None:
+            value = await loader()
+            self.set(key, value, version)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._entries.clear()
+            version_key = f"cache:{self.namespace}:version"
+        else:
+            self._entries.pop(key, None)
+            version_key = f"cache:{self.namespace}:{key}:version"
+        if redis is None:
+            return
+        try:
+            redis.incr(version_key)
+        except RedisError as e:
+            logger.warning(f"Could not invalidate {self.namespace} cache for {key or 'all keys'}: {e}")
@@ -8,6 +8,28 @@ DAILY_LEAD_LIMIT = 3
 
 DEFAULT_LEAD_LIMIT = 7
 
+ROUTING_INDEX_TTL = 5 * 60
+
+CAMPAIGN_CACHE_TTL = 10 * 60
+
+PUBLIC_DUPLICATE_WINDOW_DAYS = 30
+
+DEDUP_REBUILD_LOCK_TTL = 10 * 60
+
+DEDUP_INDEX_TTL = 24 * 60 * 60
+
+DEDUP_INDEX_REFRESH = 60 * 60
+
+LIST_TOTAL_CACHE_TTL = 30
+
+DASHBOARD_CACHE_TTL = 60
+
+DASHBOARD_LATEST_AGENTS = 10
+
+ROLLUP_REBUILD_HOUR = 3
+
+COMPLETED_LEADS_RECONCILE_HOUR = 4
+
 # Campaigns that are currently using GHL and LB for distribution
 OG_CAMPAIGNS = [
     "6668b634a88f8e5a8dde197e",  # Capital
@@ -0,0 +1,122 @@
+import logging
+
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo.errors import OperationFailure
+from typing import Any, Dict, Iterator, List
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_collection_indexes() -> Dict[str, tuple]:
+    """
+    Maps every collection to its collection getter and the indexes its controller declares.
+    """
+    from app.controllers import lead, order, rollup, transaction, user
+    return {
+        "lead": (lead.get_lead_collection, lead.INDEXES),
+        "order": (order.get_order_collection, order.INDEXES),
+        "daily_rollup": (rollup.get_rollup_collection, rollup.INDEXES),
+        "transaction": (transaction.get_transaction_collection, transaction.INDEXES),
+        "user": (user.get_user_collection, user.INDEXES),
+    }
+
+
+def get_canonical_queries() -> List[Dict[str, Any]]:
+    """
+    The hot queries of the controllers, with placeholder values, whose plans must use an index.
+    """
+    sample_id = ObjectId()
+    today = datetime.combine(datetime.utcnow(), datetime.min.time())
+    return [
+        {"collection": "lead", "name": "leads of an order", "filter": {"lead_order_id": sample_id}},
+        {"collection": "lead", "name": "second chance leads of an order", "filter": {"second_chance_lead_order_id": sample_id}},
+        {
+            "collection": "lead",
+            "name": "duplicate check by phone",
+            "filter": {"phone": "5555555555", "campaign_id": sample_id},
+            "sort": [("created_time", -1)]
+        },
+        {
+            "collection": "lead",
+            "name": "duplicate check by normalized phone",
+            "filter": {"campaign_id": sample_id, "phone_normalized": {"$in": ["5555555555"]}, "created_time": {"$gte": today}}
+        },
+        {
+            "collection": "lead",
+            "name": "daily cap count",
+            "filter": {"buyer_id": sample_id, "campaign_id": sample_id, "created_time": {"$gte": today, "$lt": today + timedelta(days=1)}}
+        },
+        {"collection": "lead", "name": "duplicate check by email", "filter": {"email": "janedoe@mail.com"}},
+        {
+            "collection": "lead",
+            "name": "dedup index rebuild",
+            "filter": {"campaign_id": sample_id, "created_time": {"$gte": today - timedelta(days=30)}}
+        },
+        {
+            "collection": "order",
+            "name": "oldest open order of an agent in a campaign",
+            "filter": {"agent_id": sample_id, "campaign_id": sample_id, "status": "open"},
+            "sort": [("date", 1)]
+        },
+        {
+            "collection": "order",
+            "name": "open orders of a campaign",
+            "filter": {"campaign_id": sample_id, "status": "open"},
+            "sort": [("date", 1)]
+        },
+        {
+            "collection": "daily_rollup",
+            "name": "dashboard rollups",
+            "filter": {"date": {"$gte": today - timedelta(days=62), "$lte": today}, "campaign_id": {"$in": [sample_id]}}
+        },
+        {"collection": "transaction", "name": "transactions of a user", "filter": {"user_id": sample_id}, "sort": [("date", -1)]},
+        {"collection": "user", "name": "user by email", "filter": {"email": "janedoe@mail.com"}},
+        {"collection": "user", "name": "user by agent", "filter": {"agent_id": sample_id}},
+    ]
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """
+    Creates the declared indexes of every collection. Indexes that already exist are left untouched,
+    so this is safe to run on every startup.
+    """
+    created = {}
+    for collection_name, (get_collection, indexes) in get_collection_indexes().items():
+        try:
+            created[collection_name] = await get_collection().create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Error creating indexes on {collection_name}: {e}")
+    logger.info(f"Ensured indexes: {created}")
+    return created
+
+
+def _plan_stages(plan: Any) -> Iterator[str]:
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+async def find_collection_scans() -> List[Dict[str, Any]]:
+    """
+    Explains every canonical query and returns the ones whose winning plan scans the whole collection.
+    """
+    collection_indexes = get_collection_indexes()
+    collection_scans = []
+    for query in get_canonical_queries():
+        get_collection, _ = collection_indexes[query["collection"]]
+        cursor = get_collection().find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        explanation = await cursor.limit(1).explain()
+        stages = list(_plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {})))
+        if "COLLSCAN" in stages:
+            logger.warning(f"Query '{query['name']}' on {query['collection']} does a COLLSCAN: {stages}")
+            collection_scans.append({**query, "stages": stages})
+    return collection_scans
@@ -0,0 +1,77 @@
+import base64
+import binascii
+
+from bson import json_util
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Cursor values decode to naive UTC datetimes like the ones stored and read everywhere else
+CURSOR_JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def sort_with_tiebreaker(sort: Tuple[str, int]) -> List[Tuple[str, int]]:
+    """
+    Adds _id as a tie-breaker so documents with equal sort values always come back in the same order.
+    """
+    sort_field, sort_order = sort
+    if sort_field == "_id":
+        return [(sort_field, sort_order)]
+    return [(sort_field, sort_order), ("_id", sort_order)]
+
+
+def encode_cursor(document: Dict[str, Any], sort: Tuple[str, int]) -> str:
+    payload = json_util.dumps({"value": document.get(sort[0]), "id": document["_id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(cursor.encode()), json_options=CURSOR_JSON_OPTIONS)
+        return payload["value"], payload["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError(f"Invalid cursor {cursor}")
+
+
+def keyset_filter(cursor: str, sort: Tuple[str, int]) -> Dict[str, Any]:
+    """
+    Matches the documents that come after the cursor in the given sort order, using the sort field and _id.
+    Documents without a value for the sort field sort first ascending and last descending.
+    """
+    sort_field, sort_order = sort
+    value, last_id = decode_cursor(cursor)
+    operator = "$gt" if sort_order == 1 else "$lt"
+    if sort_field == "_id":
+        return {"_id": {operator: last_id}}
+    if value is None:
+        after_cursor = [{sort_field: None, "_id": {operator: last_id}}]
+        if sort_order == 1:
+            after_cursor.append({sort_field: {"$ne": None}})
+        return {"$or": after_cursor}
+    after_cursor = [
+        {sort_field: {operator: value}},
+        {sort_field: value, "_id": {operator: last_id}}
+    ]
+    if sort_order == -1:
+        after_cursor.append({sort_field: None})
+    return {"$or": after_cursor}
+
+
+def apply_cursor(filter: Optional[Dict[str, Any]], cursor: Optional[str], sort: Tuple[str, int]) -> Dict[str, Any]:
+    if not cursor:
+        return filter or {}
+    if not filter:
+        return keyset_filter(cursor, sort)
+    return {"$and": [filter, keyset_filter(cursor, sort)]}
+
+
+def next_cursor(documents: List[Dict[str, Any]], limit: int, sort: Tuple[str, int]) -> Optional[str]:
+    """
+    Returns the cursor of the page after documents, or None when this was the last page.
+    """
+    if not documents or len(documents) < limit:
+        return None
+    return encode_cursor(documents[-1], sort)
@@ -0,0 +1,56 @@
+import functools
+import math
+from typing import Any, Dict, Optional, Tuple, Type
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class RawJSONResponse(ORJSONResponse):
+    """
+    Renders raw Mongo documents with orjson, turning ObjectIds into strings while encoding.
+    Routes returning documents from the raw serializers below use it to skip FastAPI's jsonable_encoder.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@functools.lru_cache(maxsize=None)
+def model_fields(model: Type[BaseModel]) -> Tuple[Tuple[str, str, Any], ...]:
+    """
+    The (output name, document key, default) of every field of a model, with factory defaults as None.
+    """
+    fields = []
+    for name, field in model.model_fields.items():
+        default = None if field.is_required() or field.default_factory else field.default
+        fields.append((name, field.alias or name, default))
+    return tuple(fields)
+
+
+@functools.lru_cache(maxsize=None)
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    return {key: 1 for _, key, _ in model_fields(model)}
+
+
+def raw_model_json(document: Dict[str, Any], model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Picks the fields of a model from a Mongo document with their defaults, without validating it.
+    ObjectIds are left in place for RawJSONResponse to encode.
+    """
+    return {name: document.get(key, default) for name, key, default in model_fields(model)}
+
+
+def scrub_nan(values: Optional[dict]) -> Optional[dict]:
+    if not values:
+        return values
+    return {key: "" if isinstance(value, float) and math.isnan(value) else value for key, value in values.items()}
@@ -0,0 +1,47 @@
+import logging
+
+import cachetools
+from bson import json_util
+from motor.core import AgnosticCollection
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.tools import constants
+from settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_totals = cachetools.TTLCache(maxsize=1024, ttl=constants.LIST_TOTAL_CACHE_TTL)
+
+
+class ListTotal(NamedTuple):
+    count: int
+    # True when counting stopped at LIST_TOTAL_CAP, so count is a lower bound
+    capped: bool = False
+
+
+def _cache_key(collection: AgnosticCollection, filter: Dict[str, Any], cap: Optional[int]) -> tuple:
+    return collection.name, json_util.dumps(filter, sort_keys=True), cap
+
+
+async def count_documents(collection: AgnosticCollection, filter: Optional[Dict[str, Any]] = None) -> ListTotal:
+    """
+    Returns the number of documents matching filter for list totals, cached for a few seconds per filter.
+    An empty filter uses the collection's estimated count. When LIST_TOTAL_CAP is set, filtered counts
+    stop there and are flagged as capped once they reach it.
+    """
+    if not filter:
+        return ListTotal(await collection.estimated_document_count())
+    cap = settings.list_total_cap or None
+    key = _cache_key(collection, filter, cap)
+    if key in _totals:
+        return _totals[key]
+    if cap:
+        count = await collection.count_documents(filter, limit=cap)
+        total = ListTotal(count, capped=count >= cap)
+    else:
+        total = ListTotal(await collection.count_documents(filter))
+    _totals[key] = total
+    return total
@@ -14,18 +14,14 @@ def validate_phone_number(phone_number):
 
 
 async def validate_duplicate(lead: LeadModel, campaign_id: str):
-    from app.controllers.lead import get_lead_by_field, LeadNotFoundError
     from app.controllers.campaign import get_one_campaign
+    from app.controllers import dedup as dedup_controller
 
     campaign: CampaignModel = await get_one_campaign(campaign_id)
+    duplication_max_date = datetime.datetime.utcnow() - datetime.timedelta(days=campaign.duplication_cutoff_days or 0)
     try:
-        existing_lead: dict = await get_lead_by_field(phone=lead.phone, campaign_id=campaign_id)
-        existing_lead = LeadModel(**existing_lead)
-        if existing_lead:
-            duplication_max_date = datetime.datetime.utcnow() - datetime.timedelta(days=campaign.duplication_cutoff_days)
-            if existing_lead.created_time >= duplication_max_date:
-                return True
-            return False
-    except LeadNotFoundError:
-        return False
-    return False
+        latest_created_time = await dedup_controller.get_latest_created_time(campaign_id, "phone", lead.phone)
+    except dedup_controller.DedupIndexUnavailableError:
+        latest_created_times = await dedup_controller.find_latest_created_times(campaign_id, "phone", [lead.phone], duplication_max_date)
+        latest_created_time = latest_created_times.get(dedup_controller.normalize_phone(lead.phone))
+    return latest_created_time is not None and latest_created_time >= duplication_max_date
@@ -10,6 +10,10 @@ from app.routes.lead import public_lead_router
 from settings import get_settings
 
 import app.controllers.user as user_controller
+import app.controllers.balance_stream as balance_stream
+import app.controllers.ledger as ledger_controller
+import app.background_jobs.order as order_background_jobs
+import app.background_jobs.rollup as rollup_background_jobs
 
 # import google.cloud.logging
 
@@ -59,7 +63,13 @@ async def health_check():
 
 @app.on_event("startup")
 async def startup_event():
+    asyncio.create_task(balance_stream.run_fan_out())
     asyncio.create_task(user_controller.user_change_stream_listener())
+    rollup_background_jobs.schedule_rollup_backfill()
+    rollup_background_jobs.schedule_rollup_rebuild()
+    order_background_jobs.schedule_completed_leads_reconciliation()
+    if settings.ledger_enabled:
+        asyncio.create_task(ledger_controller.run_flusher())
 
 
 @app.on_event("shutdown")
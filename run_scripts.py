@@ -1,6 +1,12 @@
 import app.scripts.add_priority_field_to_orders as add_priority_field_to_orders_script
+import app.scripts.ensure_indexes as ensure_indexes_script
 import asyncio
 
 
+async def main():
+    await add_priority_field_to_orders_script.main()
+    await ensure_indexes_script.main()
+
+
 if __name__ == "__main__":
-    asyncio.run(add_priority_field_to_orders_script.main())
+    asyncio.run(main())
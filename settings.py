@@ -26,6 +26,17 @@ class Settings(BaseSettings):
     stripe_self_account_payment_endpoint_secret: Optional[str] = os.environ.get("STRIPE_SELF_ACCOUNT_PAYMENT_ENDPOINT_SECRET") or None
     stripe_cancel_subscription_endpoint_secret: Optional[str] = os.environ.get("STRIPE_CANCEL_SUBSCRIPTION_ENDPOINT_SECRET") or None
     stripe_cancel_subscription_endpoint_secret_self_account: Optional[str] = os.environ.get("STRIPE_CANCEL_SUBSCRIPTION_ENDPOINT_SECRET_SELF_ACCOUNT") or None
+    crm_max_connections: int = int(os.environ.get("CRM_MAX_CONNECTIONS", 100))
+    crm_max_connections_per_host: int = int(os.environ.get("CRM_MAX_CONNECTIONS_PER_HOST", 10))
+    crm_timeout: float = float(os.environ.get("CRM_TIMEOUT", 10))
+    crm_max_attempts: int = int(os.environ.get("CRM_MAX_ATTEMPTS", 3))
+    crm_base_backoff: float = float(os.environ.get("CRM_BASE_BACKOFF", 0.5))
+    crm_max_backoff: float = float(os.environ.get("CRM_MAX_BACKOFF", 8))
+    ledger_enabled: bool = os.environ.get("LEDGER_ENABLED", "false").lower() == "true"
+    ledger_max_latency: float = float(os.environ.get("LEDGER_MAX_LATENCY", 2))
+    list_total_cap: int = int(os.environ.get("LIST_TOTAL_CAP", 0))
+    fresh_distribution_type: str = os.environ.get("FRESH_DISTRIBUTION_TYPE", "random")
+    second_chance_distribution_type: str = os.environ.get("SECOND_CHANCE_DISTRIBUTION_TYPE", "round_robin")
 
 
 class RedisSettings(BaseSettings):
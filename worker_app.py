@@ -1,15 +1,44 @@
 import logging
 import os
+import signal
 import threading
+import time
 from fastapi import FastAPI
 import uvicorn
 import redis
-from rq import Worker
+from rq import Worker, SimpleWorker
+from rq.timeouts import TimerDeathPenalty
+from rq.worker import StopRequested
+
+from app.tools.async_tools import start_runtime_loop
 
 
 logger = logging.getLogger(__name__)
 app = FastAPI()
 
+# How long an idle worker blocks on the queue before checking whether it was asked to stop
+STOP_CHECK_INTERVAL = 5
+
+
+class AsyncRuntimeWorker(SimpleWorker):
+    """
+    Executes jobs in-process so coroutine jobs run on the shared runtime loop and keep the Motor pool warm.
+    Several of these run on threads of the same process; their number is the job concurrency limit.
+    """
+    death_penalty_class = TimerDeathPenalty
+
+    def _install_signal_handlers(self):
+        # Signals can only be handled on the main thread, see run_async_runtime
+        pass
+
+    def dequeue_job_and_maintain_ttl(self, timeout, max_idle_time=None):
+        # Wait for jobs in short slices so an idle worker leaves its work loop, and runs rq's teardown, once stopped
+        while not self._stop_requested:
+            result = super().dequeue_job_and_maintain_ttl(STOP_CHECK_INTERVAL, max_idle_time=STOP_CHECK_INTERVAL)
+            if result is not None:
+                return result
+        raise StopRequested()
+
 
 @app.get("/")
 def health_check():
@@ -21,6 +50,44 @@ def start_api():
     uvicorn.run(app, host='0.0.0.0', port=port)
 
 
+def run_async_runtime(conn: redis.Redis, concurrency: int, shutdown_timeout: float):
+    start_runtime_loop()
+    workers = [AsyncRuntimeWorker(['default'], connection=conn) for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=worker.work,
+            kwargs={"with_scheduler": index == 0},
+            name=f"rq-worker-{index}",
+            daemon=True
+        )
+        for index, worker in enumerate(workers)
+    ]
+    stop_requested = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping workers after their current jobs")
+        for worker in workers:
+            worker._stop_requested = True
+        stop_requested.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    for thread in threads:
+        thread.start()
+    logger.info(f"Started async runtime with {concurrency} concurrent workers")
+
+    while not stop_requested.wait(timeout=1):
+        if not any(thread.is_alive() for thread in threads):
+            return
+    # Each worker finishes its current job, then unregisters itself and stops the scheduler on its way out
+    deadline = time.monotonic() + shutdown_timeout
+    for thread in threads:
+        thread.join(timeout=max(deadline - time.monotonic(), 0))
+    still_running = [thread.name for thread in threads if thread.is_alive()]
+    if still_running:
+        logger.warning(f"Workers {still_running} did not stop within {shutdown_timeout}s, exiting anyway")
+
+
 if __name__ == "__main__":
     api_thread = threading.Thread(target=start_api)
     api_thread.start()
@@ -29,6 +96,9 @@ if __name__ == "__main__":
     redis_port = os.getenv('REDIS_PORT', 6379)
     redis_password = os.getenv('REDIS_PASSWORD', None)
     redis_url = f'redis://{redis_server}:{redis_port}'
+    worker_mode = os.getenv('WORKER_MODE', 'fork')
+    worker_concurrency = int(os.getenv('WORKER_CONCURRENCY', 8))
+    worker_shutdown_timeout = float(os.getenv('WORKER_SHUTDOWN_TIMEOUT', 30))
     try:
         conn = redis.Redis(
             host=redis_server,
@@ -39,5 +109,8 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"Failed to connect to Redis at {redis_url}")
         raise e
+    if worker_mode == 'async':
+        run_async_runtime(conn, worker_concurrency, worker_shutdown_timeout)
+        os._exit(0)
     worker = Worker(['default'], connection=conn)
     worker.work(with_scheduler=True)